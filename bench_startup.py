@@ -0,0 +1,109 @@
+"""
+Import-time benchmark for the Streamlit app.
+
+Each module is imported in a fresh interpreter, the way a cold container start sees it.
+The script fails if a page pulls in one of the heavy pipeline dependencies, or if an
+import exceeds --budget seconds, so start-up regressions are caught before they ship.
+
+    python bench_startup.py                 # table of median import times
+    python bench_startup.py --budget 2.0    # also fail on any import slower than 2s
+    python bench_startup.py --detail src.streamlit_app.page_modules.pipeline_runs
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Imported when the app renders a page; none of these may load the heavy modules below
+PAGE_MODULES = [
+    "src.streamlit_app.page_modules.pipeline_creator",
+    "src.streamlit_app.page_modules.pipeline_list",
+    "src.streamlit_app.page_modules.pipeline_runs",
+    "src.streamlit_app.page_modules.pipeline_editor",
+    "src.streamlit_app.page_modules.monitoring_dashboard",
+    "src.streamlit_app.page_modules.settings",
+    "src.streamlit_app.page_modules.metadata_config",
+    "src.streamlit_app.page_modules.docs",
+]
+# Only needed once a run starts; measured for reference
+RUN_MODULES = ["src.pipelines.dlt_pipeline"]
+HEAVY_MODULES = ["dlt", "sqlalchemy", "boto3", "cryptography"]
+
+MEASURE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module, repeat):
+    """Median import time of `module` over `repeat` fresh interpreters, plus heavy modules it loaded."""
+    times, heavy = [], []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", MEASURE.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=PROJECT_ROOT, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            return None, [], result.stderr.strip().splitlines()[-1]
+        sample = json.loads(result.stdout.strip().splitlines()[-1])
+        times.append(sample["seconds"])
+        heavy = sample["heavy"]
+    return statistics.median(times), heavy, None
+
+
+def detail(module, top=15):
+    """Print the slowest imports below `module` from python -X importtime."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), name.strip()))
+    for cumulative_us, self_us, name in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative_us / 1e6:8.3f}s cumulative {self_us / 1e6:8.3f}s self  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold import times of the app's modules.")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per module")
+    parser.add_argument("--budget", type=float, help="Fail if a page import takes longer than this many seconds")
+    parser.add_argument("--detail", metavar="MODULE", help="Show the slowest imports under MODULE and exit")
+    args = parser.parse_args()
+
+    if args.detail:
+        detail(args.detail)
+        return 0
+
+    failures = []
+    print(f"{'module':<55} {'seconds':>8}  heavy imports")
+    for module in PAGE_MODULES + RUN_MODULES:
+        seconds, heavy, error = measure(module, args.repeat)
+        if error:
+            print(f"{module:<55} {'error':>8}  {error}")
+            failures.append(f"{module} failed to import: {error}")
+            continue
+        print(f"{module:<55} {seconds:8.3f}  {', '.join(heavy) or '-'}")
+        if module in PAGE_MODULES:
+            if heavy:
+                failures.append(f"{module} imports {', '.join(heavy)} at start-up")
+            if args.budget is not None and seconds > args.budget:
+                failures.append(f"{module} took {seconds:.3f}s (budget {args.budget}s)")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
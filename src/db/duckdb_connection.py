@@ -2,13 +2,24 @@ import duckdb
 import os
 import importlib
 from pathlib import Path
+from src.db.query_cache import note_write, clear as clear_query_cache
 
 # Define database path
 DB_PATH = Path(__file__).parent.parent.parent / "data" / "EZMoveIt.duckdb"
+_migrated = False  # the schema is checked once per process, not on every Streamlit rerun
 
 
 def get_connection():
     """Get a connection to the DuckDB database."""
+    # Workers on other machines reach the database through the queue service
+    if os.environ.get("EZMOVEIT_QUEUE_URL"):
+        from src.db.remote_connection import RemoteConnection
+        return RemoteConnection(os.environ["EZMOVEIT_QUEUE_URL"])
+    return get_local_connection()
+
+
+def get_local_connection():
+    """Open the DuckDB file itself, even in worker mode."""
     # Ensure the data directory exists
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
     return duckdb.connect(str(DB_PATH))
@@ -25,6 +36,7 @@ def execute_query(query, params=None, fetch=False):
         
         # Explicitly commit changes to ensure they're persisted
         conn.commit()
+        note_write(query)
         
         if fetch:
             return result.fetchall()
@@ -33,6 +45,33 @@ def execute_query(query, params=None, fetch=False):
         conn.close()
 
 
+def migrate_database():
+    """
+    Bring an existing database up to the current schema without dropping anything.
+    Runs that finished before run rollups existed are rolled up once their column is added.
+    """
+    global _migrated
+    if _migrated:
+        return
+    from src.db.schema import apply_schema
+    conn = get_local_connection()
+    try:
+        had_rollups = conn.execute(
+            """
+            SELECT COUNT(*) FROM information_schema.columns
+            WHERE table_name = 'pipeline_runs' AND column_name = 'rolled_up'
+            """
+        ).fetchone()[0] > 0
+        apply_schema(conn)
+    finally:
+        conn.close()
+    clear_query_cache()
+    if not had_rollups:
+        from src.pipelines.rollups import rebuild_rollups
+        rebuild_rollups()
+    _migrated = True
+
+
 def reinitialize_database():
     """Drop and recreate the entire database by calling duckdb_init."""
     try:
@@ -41,6 +80,7 @@ def reinitialize_database():
         
         # Force reload to ensure we're getting the latest version
         importlib.reload(duckdb_init)
+        clear_query_cache()
         
         print("Database reinitialized successfully!")
         return True
@@ -0,0 +1,88 @@
+import functools
+import re
+from collections import OrderedDict
+import threading
+import time
+
+DEFAULT_TTL = 30  # seconds; bounds staleness from writes made by other processes
+MAX_ENTRIES = 1000  # least recently used results are evicted beyond this
+
+# Tables named by INSERT/UPDATE/DELETE statements, for targeted invalidation
+WRITE_PATTERN = re.compile(
+    r"^\s*(?:INSERT\s+(?:OR\s+\w+\s+)?INTO|UPDATE|DELETE\s+FROM)\s+(\w+)",
+    re.IGNORECASE
+)
+
+_versions = {}
+_entries = OrderedDict()  # in least to most recently used order
+_last_sweep = 0.0
+_lock = threading.Lock()
+
+
+def bump(*tables):
+    """Invalidate every cached result that depends on any of `tables`."""
+    with _lock:
+        for table in tables:
+            _versions[table.lower()] = _versions.get(table.lower(), 0) + 1
+
+
+def note_write(query):
+    """Bump the version of the table a write statement modifies; reads are ignored."""
+    match = WRITE_PATTERN.match(query)
+    if match:
+        bump(match.group(1))
+
+
+def _snapshot(tables):
+    return tuple(_versions.get(table, 0) for table in tables)
+
+
+def _prune(now):
+    """Drop expired results at most once per DEFAULT_TTL, then the least recently used beyond MAX_ENTRIES."""
+    global _last_sweep
+    if now - _last_sweep >= DEFAULT_TTL:
+        for key in [k for k, entry in _entries.items() if entry[1] <= now]:
+            del _entries[key]
+        _last_sweep = now
+    while len(_entries) > MAX_ENTRIES:
+        _entries.popitem(last=False)
+
+
+def cached(*tables, ttl=DEFAULT_TTL):
+    """
+    Cache a read function's result per argument list until `ttl` expires or a write in
+    this process touches one of `tables`. Results are returned as shallow copies so
+    callers can modify them freely.
+    """
+    tables = tuple(table.lower() for table in tables)
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (f"{func.__module__}.{func.__qualname__}", repr(args), repr(sorted(kwargs.items())))
+            now = time.time()
+            with _lock:
+                entry = _entries.get(key)
+                if entry and entry[1] > now and entry[2] == _snapshot(tables):
+                    _entries.move_to_end(key)
+                    value = entry[0]
+                    return value.copy() if hasattr(value, "copy") else value
+                versions = _snapshot(tables)
+            value = func(*args, **kwargs)
+            with _lock:
+                _entries[key] = (value, now + ttl, versions)
+                _entries.move_to_end(key)
+                _prune(now)
+            return value.copy() if hasattr(value, "copy") else value
+
+        wrapper.clear = lambda: clear(f"{func.__module__}.{func.__qualname__}")
+        return wrapper
+
+    return decorator
+
+
+def clear(name=None):
+    """Drop cached results, of one function or all of them."""
+    with _lock:
+        for key in [k for k in _entries if name is None or k[0] == name]:
+            del _entries[key]
@@ -0,0 +1,128 @@
+import base64
+import os
+from datetime import date, datetime
+from decimal import Decimal
+import requests
+
+QUEUE_URL_ENV = "EZMOVEIT_QUEUE_URL"      # set on workers to route state DB access to the queue service
+QUEUE_TOKEN_ENV = "EZMOVEIT_QUEUE_TOKEN"  # shared secret between the queue service and its workers
+REQUEST_TIMEOUT = 60
+
+
+def encode_value(value):
+    """Make a query parameter or result value JSON-safe without losing its type."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {"__bytes__": base64.b64encode(bytes(value)).decode()}
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, date):
+        return {"__date__": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"__decimal__": str(value)}
+    if isinstance(value, (list, tuple)):
+        return [encode_value(v) for v in value]
+    return value
+
+
+def decode_value(value):
+    if isinstance(value, dict):
+        if "__bytes__" in value:
+            return base64.b64decode(value["__bytes__"])
+        if "__datetime__" in value:
+            return datetime.fromisoformat(value["__datetime__"])
+        if "__date__" in value:
+            return date.fromisoformat(value["__date__"])
+        if "__decimal__" in value:
+            return Decimal(value["__decimal__"])
+    if isinstance(value, list):
+        return [decode_value(v) for v in value]
+    return value
+
+
+def call_service(path, payload, url=None):
+    """POST a JSON payload to the queue service and return the decoded JSON response."""
+    url = (url or os.environ[QUEUE_URL_ENV]).rstrip("/")
+    response = requests.post(
+        f"{url}{path}",
+        json=payload,
+        headers={"Authorization": f"Bearer {os.environ.get(QUEUE_TOKEN_ENV, '')}"},
+        timeout=REQUEST_TIMEOUT
+    )
+    if response.status_code >= 400:
+        # Surface the service's error message rather than a bare HTTP status
+        try:
+            message = response.json().get("error")
+        except ValueError:
+            message = response.text
+        raise RuntimeError(f"Queue service {path} failed ({response.status_code}): {message}")
+    return response.json()
+
+
+class RemoteResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchmany(self, size=1):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+
+class BatchedResult:
+    """Result of a statement queued in a batch; it has not run yet, so it has no rows to read."""
+
+    def fetchall(self):
+        raise RuntimeError("Cannot read results inside a remote transaction; batches are write-only")
+
+    fetchone = fetchall
+
+
+class RemoteConnection:
+    """
+    Stand-in for a DuckDB connection on worker machines. Statements are executed by the
+    queue service, which owns the DuckDB file; statements between BEGIN and COMMIT are
+    sent as one batch and run in a single transaction there. Batches are write-only:
+    reading a result (SELECT, RETURNING) between BEGIN and COMMIT raises.
+    """
+
+    def __init__(self, url):
+        self.url = url
+        self.batch = None
+
+    def execute(self, query, params=None):
+        keyword = query.strip().split(None, 1)[0].upper() if query.strip() else ""
+        if keyword == "BEGIN":
+            self.batch = []
+            return RemoteResult([])
+        if keyword == "COMMIT":
+            return self.commit()
+        if keyword == "ROLLBACK":
+            self.batch = None
+            return RemoteResult([])
+        if self.batch is not None:
+            self.batch.append({"query": query, "params": encode_value(params), "many": False})
+            return BatchedResult()
+        result = call_service("/query", {"query": query, "params": encode_value(params)}, self.url)
+        return RemoteResult([tuple(decode_value(row)) for row in result["rows"]])
+
+    def executemany(self, query, rows):
+        statement = {"query": query, "params": encode_value(list(rows)), "many": True}
+        if self.batch is not None:
+            self.batch.append(statement)
+            return BatchedResult()
+        call_service("/batch", {"statements": [statement]}, self.url)
+        return RemoteResult([])
+
+    def commit(self):
+        if self.batch:
+            call_service("/batch", {"statements": self.batch}, self.url)
+        self.batch = None
+        return RemoteResult([])
+
+    def close(self):
+        self.batch = None
@@ -0,0 +1,362 @@
+# Schema of the state database. duckdb_init drops and recreates it; migrate_database applies it
+# to an existing file, creating missing tables and adding columns introduced since it was created.
+
+TABLES = [
+    # Create pipelines table with additional fields (no foreign keys)
+    """
+CREATE TABLE IF NOT EXISTS pipelines (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    source_url TEXT NOT NULL,
+    target_table TEXT NOT NULL,
+    dataset_name TEXT NOT NULL,
+    schedule TEXT,
+    last_run_status TEXT,
+    source_config TEXT,
+    snowflake_target TEXT,
+    last_run_log TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    api_key TEXT,
+    headers TEXT,
+    total_runs INTEGER DEFAULT 0,
+    successful_runs INTEGER DEFAULT 0,
+    failed_runs INTEGER DEFAULT 0,
+    last_successful_run TIMESTAMP,
+    last_failed_run TIMESTAMP,
+    metadata_selection TEXT,
+    priority INTEGER DEFAULT 5,
+    owner_group TEXT DEFAULT 'default'
+);
+""",
+
+    # Create pipeline_runs table with new columns for progress tracking (no foreign keys)
+    """
+CREATE TABLE IF NOT EXISTS pipeline_runs (
+    id INTEGER PRIMARY KEY,
+    pipeline_id INTEGER NOT NULL,
+    pipeline_name TEXT NOT NULL,
+    start_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    end_time TIMESTAMP,
+    status TEXT NOT NULL,
+    duration FLOAT,
+    rows_processed INTEGER,
+    error_message TEXT,
+    extract_status TEXT,
+    normalize_status TEXT,
+    load_status TEXT,
+    extract_start_time TIMESTAMP,
+    extract_end_time TIMESTAMP,
+    normalize_start_time TIMESTAMP,
+    normalize_end_time TIMESTAMP,
+    load_start_time TIMESTAMP,
+    load_end_time TIMESTAMP,
+    -- New columns for progress tracking
+    total_rows INTEGER,
+    total_chunks INTEGER,
+    processed_chunks INTEGER DEFAULT 0,
+    processed_rows INTEGER DEFAULT 0,
+    current_chunk INTEGER DEFAULT 0,
+    estimated_completion TIMESTAMP,
+    resumed_from INTEGER,
+    cancel_requested BOOLEAN DEFAULT FALSE,
+    rolled_up BOOLEAN DEFAULT FALSE
+    -- Removed foreign key constraint
+);
+""",
+
+    # Create pipeline_logs table (no foreign keys)
+    """
+CREATE TABLE IF NOT EXISTS pipeline_logs (
+    id INTEGER PRIMARY KEY,
+    pipeline_id INTEGER NOT NULL,
+    run_id INTEGER,
+    event TEXT NOT NULL,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    duration FLOAT,
+    log_message TEXT,
+    pipeline_name TEXT,
+    source_url TEXT,
+    target_table TEXT,
+    dataset_name TEXT,
+    stage TEXT,
+    start_time TIMESTAMP,
+    end_time TIMESTAMP,
+    row_counts TEXT,
+    full_trace_json TEXT,
+    rows_loaded BIGINT
+    -- Removed foreign key constraints
+);
+""",
+
+    """
+CREATE TABLE IF NOT EXISTS pipeline_log_relations (
+    id INTEGER PRIMARY KEY,
+    pipeline_id INTEGER NOT NULL
+    -- Removed foreign key constraint
+);
+""",
+
+    """
+CREATE TABLE IF NOT EXISTS scheduled_jobs (
+    id INTEGER PRIMARY KEY,
+    pipeline_name TEXT NOT NULL,
+    schedule INTEGER NOT NULL, 
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+""",
+
+    """
+CREATE TABLE IF NOT EXISTS scheduled_pipelines (
+    id INTEGER PRIMARY KEY,
+    pipeline_name TEXT UNIQUE NOT NULL,
+    interval_minutes INTEGER NOT NULL
+);
+""",
+
+    """
+CREATE TABLE IF NOT EXISTS METADATA_CONFIG
+(
+  ID INTEGER,
+SOURCE_TYPE VARCHAR,
+DRIVER_TYPE VARCHAR,
+LOGICAL_NAME VARCHAR,
+HOSTNAME VARCHAR,
+PORT DECIMAL(4, 0),
+DATABASE_NAME VARCHAR,
+SCHEMA_NAME VARCHAR,
+TABLE_NAME VARCHAR,
+SOURCE_URL VARCHAR,
+ENDPOINT VARCHAR,
+LOAD_TYPE VARCHAR,
+PRIMARY_KEY VARCHAR,
+DELTA_COLUMN VARCHAR,
+DELTA_VALUE VARCHAR,
+SOURCE_JSON VARCHAR,
+LAST_LOAD_DT TIMESTAMP,
+COLUMN_LIST VARCHAR,
+WHERE_CLAUSE VARCHAR
+);
+""",
+
+    # Cached source table reflection, keyed by host, database, schema and table
+    """
+CREATE TABLE IF NOT EXISTS reflection_cache (
+    hostname TEXT NOT NULL,
+    database_name TEXT NOT NULL,
+    schema_name TEXT NOT NULL,
+    table_name TEXT NOT NULL,
+    table_metadata BLOB NOT NULL,
+    ddl_timestamp TEXT,
+    reflected_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (hostname, database_name, schema_name, table_name)
+);
+""",
+
+    # Chunk sizes learned by adaptive chunking, reused as the starting size on the next run
+    """
+CREATE TABLE IF NOT EXISTS learned_chunk_sizes (
+    hostname TEXT NOT NULL,
+    database_name TEXT NOT NULL,
+    schema_name TEXT NOT NULL,
+    table_name TEXT NOT NULL,
+    chunk_size INTEGER NOT NULL,
+    bytes_per_row DOUBLE,
+    rows_per_second DOUBLE,
+    updated_at TIMESTAMP,
+    PRIMARY KEY (hostname, database_name, schema_name, table_name)
+);
+""",
+
+    # Last SQL Server change tracking version loaded per table (CDC load type)
+    """
+CREATE TABLE IF NOT EXISTS change_tracking_versions (
+    hostname TEXT NOT NULL,
+    database_name TEXT NOT NULL,
+    schema_name TEXT NOT NULL,
+    table_name TEXT NOT NULL,
+    sync_version BIGINT NOT NULL,
+    updated_at TIMESTAMP,
+    PRIMARY KEY (hostname, database_name, schema_name, table_name)
+);
+""",
+
+    # Per-row hashes of the last successful load (DIFF load type), keyed by JSON-encoded primary key
+    """
+CREATE TABLE IF NOT EXISTS row_hash_index (
+    hostname TEXT NOT NULL,
+    database_name TEXT NOT NULL,
+    schema_name TEXT NOT NULL,
+    table_name TEXT NOT NULL,
+    key_json VARCHAR NOT NULL,
+    row_hash VARCHAR NOT NULL
+);
+""",
+
+    # Hashes read by a run, promoted to row_hash_index once its load succeeds
+    """
+CREATE TABLE IF NOT EXISTS row_hash_staging (
+    run_id INTEGER,
+    hostname TEXT NOT NULL,
+    database_name TEXT NOT NULL,
+    schema_name TEXT NOT NULL,
+    table_name TEXT NOT NULL,
+    key_json VARCHAR NOT NULL,
+    row_hash VARCHAR NOT NULL
+);
+""",
+
+    # Checkpoints of time-windowed backfills; completed windows are skipped when a backfill is rerun
+    """
+CREATE TABLE IF NOT EXISTS backfill_windows (
+    pipeline_name TEXT NOT NULL,
+    table_name TEXT NOT NULL,
+    window_start TEXT NOT NULL,
+    window_end TEXT NOT NULL,
+    run_id INTEGER,
+    status TEXT NOT NULL,
+    rows_loaded BIGINT,
+    error_message TEXT,
+    updated_at TIMESTAMP,
+    PRIMARY KEY (pipeline_name, table_name, window_start, window_end)
+);
+""",
+
+    # Last committed resume point of checkpointed runs, advanced after each loaded segment
+    """
+CREATE TABLE IF NOT EXISTS run_checkpoints (
+    run_id INTEGER PRIMARY KEY,
+    pipeline_name TEXT NOT NULL,
+    table_name TEXT,
+    checkpoint_column TEXT NOT NULL,
+    checkpoint_value TEXT,
+    processed_chunks INTEGER DEFAULT 0,
+    processed_rows BIGINT DEFAULT 0,
+    load_packages INTEGER DEFAULT 0,
+    updated_at TIMESTAMP
+);
+""",
+
+    # Dependency edges: a pipeline runs once every pipeline it depends on has succeeded
+    """
+CREATE TABLE IF NOT EXISTS pipeline_dependencies (
+    pipeline_id INTEGER NOT NULL,
+    depends_on_id INTEGER NOT NULL,
+    created_at TIMESTAMP,
+    PRIMARY KEY (pipeline_id, depends_on_id)
+);
+""",
+
+    # One row per DAG execution, with the chain of runs that determined its duration
+    """
+CREATE TABLE IF NOT EXISTS dag_runs (
+    id INTEGER PRIMARY KEY,
+    start_time TIMESTAMP,
+    end_time TIMESTAMP,
+    status TEXT NOT NULL,
+    duration FLOAT,
+    critical_path TEXT,
+    critical_path_seconds FLOAT,
+    node_timings TEXT
+);
+""",
+
+    # Runs waiting for or held by a dispatcher, ranked by priority, fair share and age
+    """
+CREATE TABLE IF NOT EXISTS run_queue (
+    id INTEGER PRIMARY KEY,
+    pipeline_id INTEGER NOT NULL,
+    pipeline_name TEXT NOT NULL,
+    dataset_name TEXT,
+    target_table TEXT,
+    priority INTEGER NOT NULL,
+    owner_group TEXT NOT NULL,
+    status TEXT NOT NULL,
+    trigger TEXT,
+    resume_from INTEGER,
+    worker_id TEXT,
+    run_id INTEGER,
+    enqueued_at TIMESTAMP,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP,
+    lease_expires_at TIMESTAMP  -- set for runs claimed by remote workers; renewed by their heartbeats
+);
+""",
+
+    # Fair-share weight per owner group; groups without a row have weight 1
+    """
+CREATE TABLE IF NOT EXISTS queue_groups (
+    group_name TEXT PRIMARY KEY,
+    weight DOUBLE NOT NULL
+);
+""",
+
+    # Per-pipeline run lease; expires unless its holder keeps renewing the heartbeat
+    """
+CREATE TABLE IF NOT EXISTS pipeline_locks (
+    pipeline_name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    acquired_at TIMESTAMP,
+    heartbeat_at TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL
+);
+""",
+
+    # Hourly and daily run metrics per pipeline, updated as each run finishes
+    """
+CREATE TABLE IF NOT EXISTS run_rollups (
+    grain TEXT NOT NULL,
+    pipeline_name TEXT NOT NULL,
+    bucket_start TIMESTAMP NOT NULL,
+    runs INTEGER,
+    successes INTEGER,
+    failures INTEGER,
+    cancellations INTEGER,
+    extract_failures INTEGER,
+    normalize_failures INTEGER,
+    load_failures INTEGER,
+    rows_sum BIGINT,
+    duration_count INTEGER,
+    duration_sum DOUBLE,
+    duration_sq_sum DOUBLE,
+    duration_min DOUBLE,
+    duration_max DOUBLE,
+    duration_histogram INTEGER[],
+    PRIMARY KEY (grain, pipeline_name, bucket_start)
+);
+""",
+]
+
+# Columns added to tables after their first release, as (table, column, type and default)
+ADDED_COLUMNS = [
+    ("pipelines", "priority", "INTEGER DEFAULT 5"),
+    ("pipelines", "owner_group", "TEXT DEFAULT 'default'"),
+    ("pipeline_runs", "resumed_from", "INTEGER"),
+    ("pipeline_runs", "cancel_requested", "BOOLEAN DEFAULT FALSE"),
+    ("pipeline_runs", "rolled_up", "BOOLEAN DEFAULT FALSE"),
+    ("pipeline_logs", "rows_loaded", "BIGINT"),
+    ("METADATA_CONFIG", "COLUMN_LIST", "VARCHAR"),
+    ("METADATA_CONFIG", "WHERE_CLAUSE", "VARCHAR"),
+]
+
+INDEXES = [
+    # Create indexes for better query performance
+    "CREATE INDEX IF NOT EXISTS idx_pipeline_runs_pipeline_id ON pipeline_runs(pipeline_id);",
+    "CREATE INDEX IF NOT EXISTS idx_pipeline_runs_status ON pipeline_runs(status);",
+    "CREATE INDEX IF NOT EXISTS idx_pipeline_runs_start_time ON pipeline_runs(start_time);",
+    # Keyset pagination of run history on (start_time, id), overall and per pipeline
+    "CREATE INDEX IF NOT EXISTS idx_pipeline_runs_start_time_id ON pipeline_runs(start_time, id);",
+    "CREATE INDEX IF NOT EXISTS idx_pipeline_runs_name_start_time_id ON pipeline_runs(pipeline_name, start_time, id);",
+    "CREATE INDEX IF NOT EXISTS idx_pipeline_logs_run_id ON pipeline_logs(run_id);",
+    "CREATE INDEX IF NOT EXISTS idx_pipeline_logs_event ON pipeline_logs(event);",
+]
+
+
+def apply_schema(con):
+    """Create missing tables, columns and indexes; existing data is left untouched."""
+    for ddl in TABLES:
+        con.execute(ddl)
+    for table, column, column_type in ADDED_COLUMNS:
+        con.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {column_type}")
+    for index in INDEXES:
+        con.execute(index)
@@ -0,0 +1,248 @@
+import argparse
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+import dlt
+import pendulum
+from dlt.sources.sql_database import sql_table
+
+from src.db.duckdb_connection import execute_query, migrate_database
+from src.sources.database_source import (
+    load_db_config, build_connection_string, make_filter_adapter, get_included_columns,
+    make_streaming_adapter, get_table_metadata, parse_column_list
+)
+from src.sources.engine_registry import get_engine, pool_settings_from_config
+from src.pipelines.dlt_pipeline import load_creds_from_env, set_env_vars
+from src.pipelines.locks import pipeline_lock
+from src.pipelines.rollups import record_run_rollup
+
+WINDOW_UNITS = {"day": "days", "week": "weeks", "month": "months"}
+DEFAULT_CONCURRENCY = 4
+
+# Each concurrent window gets its own dlt working directory so their load packages never collide.
+# Windows extract and normalize in parallel, but only one loads at a time: they merge into the
+# same destination tables through the same <dataset>_staging tables.
+BACKFILL_DIR = os.path.join(os.path.expanduser("~"), ".dlt", "backfill")
+
+
+def split_windows(start, end=None, window="day"):
+    """
+    Split [start, end) into consecutive windows of one day, week or month. Without an
+    `end`, only the windows that have fully elapsed are returned, so the last one keeps
+    the same checkpoint key on every rerun instead of ending at a moving now.
+    """
+    unit = WINDOW_UNITS.get(window)
+    if not unit:
+        raise ValueError(f"Unsupported backfill window `{window}`; use one of {list(WINDOW_UNITS)}")
+    limit = end or pendulum.now()
+    windows = []
+    window_start = start
+    while window_start < limit:
+        window_end = window_start.add(**{unit: 1})
+        if window_end > limit:
+            if end is None:
+                break
+            window_end = end
+        windows.append((window_start, window_end))
+        window_start = window_end
+    return windows
+
+
+def get_completed_windows(pipeline_name, table_name):
+    """Return the (start, end) ISO strings of windows already loaded for a table."""
+    result = execute_query(
+        """
+        SELECT window_start, window_end FROM backfill_windows
+        WHERE pipeline_name = ? AND table_name = ? AND status = 'completed'
+        """,
+        params=(pipeline_name, table_name),
+        fetch=True
+    )
+    return {(row[0], row[1]) for row in result}
+
+
+def record_window(pipeline_name, table_name, window_start, window_end, run_id, status,
+                  rows_loaded=None, error_message=None):
+    """Checkpoint the state of one window so a crashed backfill resumes after it."""
+    execute_query(
+        """
+        INSERT OR REPLACE INTO backfill_windows (
+            pipeline_name, table_name, window_start, window_end, run_id,
+            status, rows_loaded, error_message, updated_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        params=(
+            pipeline_name, table_name, window_start, window_end, run_id,
+            status, rows_loaded, error_message, datetime.now()
+        )
+    )
+
+
+def window_resource(engine, db_config, table_name, window_start, window_end):
+    """Build a resource reading only rows whose delta column falls inside one window."""
+    schema_name = db_config.get("schema")
+    chunk_size = db_config.get("chunk_size", 50000)
+    metadata = get_table_metadata(engine, db_config, schema_name, [table_name])
+    res = sql_table(
+        engine,
+        table=table_name,
+        schema=schema_name,
+        metadata=metadata,
+        chunk_size=chunk_size,
+        included_columns=get_included_columns(engine, db_config, schema_name, table_name, metadata),
+        query_adapter_callback=make_filter_adapter(db_config),
+        engine_adapter_callback=make_streaming_adapter(db_config, chunk_size),
+        # end_value bounds the query, so each window is a stateless range scan
+        incremental=dlt.sources.incremental(
+            db_config["delta_column"], initial_value=window_start, end_value=window_end
+        )
+    )
+    primary_key = parse_column_list(db_config.get("primary_key"))
+    if primary_key:
+        res.apply_hints(primary_key=primary_key)
+    return res
+
+
+def run_window(pipeline_name, dataset_name, engine, db_config, table_name, window, run_id, slots, load_lock):
+    """Extract and normalize one window, then load it under `load_lock`; returns the number of rows loaded."""
+    window_start, window_end = window
+    start_key, end_key = window_start.isoformat(), window_end.isoformat()
+    slot = slots.get()
+    try:
+        record_window(pipeline_name, table_name, start_key, end_key, run_id, "running")
+        pipeline = dlt.pipeline(
+            pipeline_name=pipeline_name,
+            pipelines_dir=os.path.join(BACKFILL_DIR, f"slot_{slot}"),
+            destination="snowflake",
+            dataset_name=dataset_name
+        )
+        write_disposition = "merge" if db_config.get("primary_key") else "append"
+        pipeline.extract(
+            window_resource(engine, db_config, table_name, window_start, window_end),
+            write_disposition=write_disposition
+        )
+        row_counts = pipeline.normalize().row_counts
+        with load_lock:
+            pipeline.load()
+        rows_loaded = sum(count for table, count in row_counts.items() if not table.startswith("_dlt_"))
+        record_window(pipeline_name, table_name, start_key, end_key, run_id, "completed", rows_loaded)
+        logging.info(f"Backfill window {start_key} -> {end_key} of `{table_name}` loaded {rows_loaded} rows.")
+        return rows_loaded
+    except Exception as e:
+        record_window(pipeline_name, table_name, start_key, end_key, run_id, "failed", error_message=str(e))
+        raise
+    finally:
+        slots.put(slot)
+
+
+def run_backfill(creds, pipeline_name, dataset_name, window="day", concurrency=DEFAULT_CONCURRENCY,
+                 start=None, end=None):
+    """
+    Backfill an incremental database pipeline from its `delta_value` (or `start`) up to the
+    last fully elapsed window (or `end`), one window per query, running up to `concurrency`
+    windows at a time. Completed windows are checkpointed in backfill_windows and skipped when rerun.
+    """
+    db_config = load_db_config(pipeline_name)
+    if not db_config.get("delta_column"):
+        logging.error(f"❌ Backfill needs a delta column in the config of `{pipeline_name}`!")
+        return None
+    tables = [db_config["table"]] if db_config.get("mode", "sql_table") == "sql_table" else db_config.get("tables")
+    if not tables or not all(tables):
+        logging.error("❌ Backfill requires explicit table names!")
+        return None
+
+    range_start = pendulum.parse(start or db_config.get("delta_value") or "1900-01-01")
+    windows = split_windows(range_start, pendulum.parse(end) if end else None, window)
+    if not windows:
+        logging.info(f"No complete {window} window to backfill for `{pipeline_name}` yet.")
+        return 0
+    set_env_vars(creds, pipeline_name)
+
+    # Held for the whole backfill so no scheduled or manual run loads the same tables meanwhile
+    with pipeline_lock(pipeline_name) as acquired:
+        if not acquired:
+            logging.error(f"❌ `{pipeline_name}` is running; retry the backfill once it finishes.")
+            return None
+        pipeline_result = execute_query("SELECT id FROM pipelines WHERE name = ?", (pipeline_name,), fetch=True)
+        pipeline_id = pipeline_result[0][0] if pipeline_result else None
+        run_id = execute_query("SELECT COALESCE(MAX(id), 0) + 1 FROM pipeline_runs", fetch=True)[0][0]
+        execute_query(
+            """
+            INSERT INTO pipeline_runs (
+                id, pipeline_id, pipeline_name, start_time, status,
+                extract_status, normalize_status, load_status
+            ) VALUES (?, ?, ?, CURRENT_TIMESTAMP, 'running', 'running', 'pending', 'pending')
+            """,
+            (run_id, pipeline_id, pipeline_name)
+        )
+
+        started = time.time()
+        total_rows, errors, jobs = 0, [], []
+        try:
+            engine = get_engine(build_connection_string(db_config), **pool_settings_from_config(db_config))
+            for table_name in tables:
+                completed = get_completed_windows(pipeline_name, table_name)
+                pending = [w for w in windows if (w[0].isoformat(), w[1].isoformat()) not in completed]
+                logging.info(
+                    f"Backfilling `{table_name}`: {len(windows)} {window} windows, "
+                    f"{len(windows) - len(pending)} already completed."
+                )
+                jobs.extend((table_name, w) for w in pending)
+
+            slots, load_lock = queue.Queue(), threading.Lock()
+            for slot in range(concurrency):
+                slots.put(slot)
+
+            with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="backfill") as executor:
+                futures = {
+                    executor.submit(run_window, pipeline_name, dataset_name, engine, db_config, table_name, w, run_id, slots, load_lock): (table_name, w)
+                    for table_name, w in jobs
+                }
+                for future in as_completed(futures):
+                    table_name, (window_start, window_end) = futures[future]
+                    try:
+                        total_rows += future.result()
+                    except Exception as e:
+                        errors.append(f"{table_name} {window_start.isoformat()}: {str(e)}")
+                        logging.error(f"❌ Backfill window {window_start.isoformat()} of `{table_name}` failed: {str(e)}")
+        except Exception as e:
+            errors.append(str(e))
+            logging.error(f"❌ Backfill of `{pipeline_name}` failed: {str(e)}")
+
+        duration = round(time.time() - started, 2)
+        status = "failed" if errors else "completed"
+        execute_query(
+            """
+            UPDATE pipeline_runs
+            SET status = ?, end_time = CURRENT_TIMESTAMP, duration = ?, rows_processed = ?,
+                extract_status = ?, load_status = ?, error_message = ?
+            WHERE id = ?
+            """,
+            (status, duration, total_rows, status, status, "\n".join(errors) or None, run_id)
+        )
+        record_run_rollup(run_id)
+        logging.info(
+            f"Backfill of `{pipeline_name}` {status} in {duration} seconds: {len(jobs) - len(errors)} of "
+            f"{len(jobs)} windows loaded, {total_rows} rows. Rerun to retry failed windows."
+        )
+        return total_rows
+
+
+if __name__ == "__main__":
+    # Snowflake credentials are read from the SNOWFLAKE_* environment variables
+    parser = argparse.ArgumentParser(description="Backfill an incremental pipeline in parallel time windows.")
+    parser.add_argument("pipeline_name")
+    parser.add_argument("dataset_name")
+    parser.add_argument("--window", choices=list(WINDOW_UNITS), default="day")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--start", help="Start of the range, defaults to the config's delta_value")
+    parser.add_argument("--end", help="End of the range, defaults to the end of the last complete window")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    migrate_database()
+    run_backfill(load_creds_from_env(), args.pipeline_name, args.dataset_name, args.window, args.concurrency,
+                 args.start, args.end)
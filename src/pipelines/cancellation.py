@@ -0,0 +1,66 @@
+import logging
+import threading
+import time
+from src.db.duckdb_connection import execute_query
+
+CANCEL_POLL_SECONDS = 5  # how often a run re-reads its cancel flag from the database
+
+
+class RunCancelled(Exception):
+    """Raised between chunks once a cancel has been requested for the run."""
+
+
+# Runs executing in this process, so a cancel from the same process is seen immediately
+_runs = {}
+_runs_lock = threading.Lock()
+
+
+def register_run(run_id):
+    with _runs_lock:
+        _runs[run_id] = {"event": threading.Event(), "checked_at": time.time()}
+
+
+def unregister_run(run_id):
+    with _runs_lock:
+        _runs.pop(run_id, None)
+
+
+def cancel_run(run_id):
+    """
+    Request cancellation of a running run. The flag is stored on the run so workers in
+    other processes see it too; the run stops at its next chunk boundary.
+    """
+    execute_query(
+        "UPDATE pipeline_runs SET cancel_requested = TRUE WHERE id = ? AND end_time IS NULL",
+        (run_id,)
+    )
+    with _runs_lock:
+        entry = _runs.get(run_id)
+    if entry:
+        entry["event"].set()
+    logging.info(f"Cancellation requested for run {run_id}.")
+
+
+def is_cancelled(run_id):
+    """Return True once a cancel has been requested; the database is polled at most every few seconds."""
+    if run_id is None:
+        return False
+    with _runs_lock:
+        entry = _runs.get(run_id)
+    if entry:
+        if entry["event"].is_set():
+            return True
+        if time.time() - entry["checked_at"] < CANCEL_POLL_SECONDS:
+            return False
+        entry["checked_at"] = time.time()
+    result = execute_query("SELECT cancel_requested FROM pipeline_runs WHERE id = ?", (run_id,), fetch=True)
+    cancelled = bool(result and result[0][0])
+    if cancelled and entry:
+        entry["event"].set()
+    return cancelled
+
+
+def check_cancelled(run_id):
+    """Raise RunCancelled if the run has been asked to stop."""
+    if is_cancelled(run_id):
+        raise RunCancelled(f"Run {run_id} was cancelled")
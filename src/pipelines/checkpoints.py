@@ -0,0 +1,134 @@
+import json
+import logging
+from datetime import datetime
+from itertools import islice
+import dlt
+from src.db.duckdb_connection import execute_query
+from src.db.remote_connection import encode_value, decode_value
+from src.sources.database_source import get_checkpoint_column
+from src.pipelines.cancellation import check_cancelled
+
+
+def get_checkpoint(run_id):
+    """Return the last committed resume point of a run, or None."""
+    result = execute_query(
+        """
+        SELECT pipeline_name, table_name, checkpoint_column, checkpoint_value,
+               processed_chunks, processed_rows, load_packages
+        FROM run_checkpoints WHERE run_id = ?
+        """,
+        params=(run_id,),
+        fetch=True
+    )
+    if not result:
+        return None
+    pipeline_name, table_name, column, value, chunks, rows, packages = result[0]
+    return {
+        "pipeline_name": pipeline_name,
+        "table_name": table_name,
+        "column": column,
+        "value": decode_value(json.loads(value)) if value is not None else None,
+        "chunks": chunks or 0,
+        "rows": rows or 0,
+        "packages": packages or 0,
+    }
+
+
+def save_checkpoint(run_id, checkpoint):
+    """Persist a run's resume point; only called once the data before it is loaded."""
+    execute_query(
+        """
+        INSERT OR REPLACE INTO run_checkpoints (
+            run_id, pipeline_name, table_name, checkpoint_column, checkpoint_value,
+            processed_chunks, processed_rows, load_packages, updated_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        params=(
+            run_id, checkpoint["pipeline_name"], checkpoint["table_name"], checkpoint["column"],
+            # Tagged with its type so a datetime or decimal resume point binds as one again
+            json.dumps(encode_value(checkpoint["value"]), default=str) if checkpoint["value"] is not None else None,
+            checkpoint["chunks"], checkpoint["rows"], checkpoint["packages"], datetime.now()
+        )
+    )
+
+
+def prepare_checkpoint(run_id, pipeline_name, table_name, db_config, resume_from=None):
+    """
+    Set up checkpointing for a run. When resuming, the previous run's resume point is
+    copied to this run and handed to the source as `resume_value`.
+    Returns the checkpoint dict, or None when the run is not checkpointed.
+    """
+    column = get_checkpoint_column(db_config)
+    if not column:
+        if resume_from:
+            logging.warning(f"Pipeline `{pipeline_name}` has no checkpoint column; resuming from scratch.")
+        return None
+
+    checkpoint = {
+        "pipeline_name": pipeline_name,
+        "table_name": table_name,
+        "column": column,
+        "value": None,
+        "chunks": 0,
+        "rows": 0,
+        "packages": 0,
+    }
+    previous = get_checkpoint(resume_from) if resume_from else None
+    if previous and previous["column"] == column:
+        checkpoint.update({k: previous[k] for k in ("value", "chunks", "rows", "packages")})
+        db_config["resume_value"] = previous["value"]
+        logging.info(
+            f"Resuming run {resume_from} of `{pipeline_name}` after {previous['rows']} rows "
+            f"({column} = {previous['value']})."
+        )
+    elif resume_from:
+        logging.warning(f"No usable checkpoint for run {resume_from}; resuming from scratch.")
+    save_checkpoint(run_id, checkpoint)
+    return checkpoint
+
+
+def run_in_segments(pipeline, chunks, checkpoint, run_id, write_disposition, segment_chunks):
+    """
+    Load `chunks` in segments of `segment_chunks` chunks, each its own extract/normalize/load,
+    and commit the last loaded checkpoint value after every segment so a failed run can
+    resume from it. Returns the number of rows loaded by this run.
+    """
+    column = checkpoint["column"]
+    # Keep the resource name of an unsegmented run so the destination table does not change
+    resource_name = getattr(chunks, "__name__", checkpoint["table_name"])
+    chunks = iter(chunks)
+    loaded_rows = 0
+
+    while True:
+        # Cancelling between segments keeps every committed segment loaded
+        check_cancelled(run_id)
+        segment = {"chunks": 0, "rows": 0, "value": None}
+
+        def segment_rows():
+            for chunk in islice(chunks, segment_chunks):
+                segment["chunks"] += 1
+                segment["rows"] += len(chunk)
+                last_row = chunk[-1]
+                key = column if column in last_row else next(
+                    (k for k in last_row if k.lower() == column.lower()), column
+                )
+                segment["value"] = last_row.get(key, segment["value"])
+                yield chunk
+
+        pipeline.run(dlt.resource(segment_rows(), name=resource_name), write_disposition=write_disposition)
+        if not segment["chunks"]:
+            break
+
+        checkpoint["value"] = segment["value"]
+        checkpoint["chunks"] += segment["chunks"]
+        checkpoint["rows"] += segment["rows"]
+        checkpoint["packages"] += 1
+        save_checkpoint(run_id, checkpoint)
+        loaded_rows += segment["rows"]
+        logging.info(
+            f"Checkpoint committed after {checkpoint['rows']} rows ({column} = {checkpoint['value']})."
+        )
+        # Earlier segments are already in the destination; later ones must not replace them
+        if write_disposition == "replace":
+            write_disposition = "append"
+    return loaded_rows
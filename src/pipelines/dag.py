@@ -0,0 +1,217 @@
+import argparse
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+from src.db.duckdb_connection import execute_query, get_connection, migrate_database
+from src.pipelines.run_queue import enqueue_run, ensure_dispatcher, wait_for_queued_run
+
+DEFAULT_MAX_WORKERS = 4
+
+
+def get_dependencies():
+    """Return {pipeline_id: set of upstream pipeline ids} for every dependency edge."""
+    edges = {}
+    for pipeline_id, depends_on_id in execute_query(
+        "SELECT pipeline_id, depends_on_id FROM pipeline_dependencies", fetch=True
+    ):
+        edges.setdefault(pipeline_id, set()).add(depends_on_id)
+    return edges
+
+
+def find_cycle(edges):
+    """Return a list of pipeline ids forming a cycle, or None if the graph is a DAG."""
+    visiting, done = set(), set()
+
+    def visit(node, path):
+        visiting.add(node)
+        path.append(node)
+        for upstream in edges.get(node, ()):
+            if upstream in visiting:
+                return path[path.index(upstream):] + [upstream]
+            if upstream not in done:
+                cycle = visit(upstream, path)
+                if cycle:
+                    return cycle
+        visiting.discard(node)
+        done.add(node)
+        path.pop()
+        return None
+
+    for node in list(edges):
+        if node not in done:
+            cycle = visit(node, [])
+            if cycle:
+                return cycle
+    return None
+
+
+def set_dependencies(pipeline_id, upstream_ids):
+    """Replace the upstream pipelines of a pipeline, refusing changes that create a cycle."""
+    edges = get_dependencies()
+    edges[pipeline_id] = set(upstream_ids)
+    cycle = find_cycle(edges)
+    if cycle:
+        raise ValueError(f"Dependency cycle between pipelines {cycle}")
+
+    conn = get_connection()
+    try:
+        conn.execute("BEGIN TRANSACTION")
+        conn.execute("DELETE FROM pipeline_dependencies WHERE pipeline_id = ?", (pipeline_id,))
+        if upstream_ids:
+            conn.executemany(
+                "INSERT INTO pipeline_dependencies (pipeline_id, depends_on_id, created_at) VALUES (?, ?, ?)",
+                [(pipeline_id, upstream_id, datetime.now()) for upstream_id in upstream_ids]
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def select_subgraph(edges, roots):
+    """Return the roots plus every pipeline downstream of them."""
+    downstream = {}
+    for node, upstreams in edges.items():
+        for upstream in upstreams:
+            downstream.setdefault(upstream, set()).add(node)
+    selected, stack = set(), list(roots)
+    while stack:
+        node = stack.pop()
+        if node not in selected:
+            selected.add(node)
+            stack.extend(downstream.get(node, ()))
+    return selected
+
+
+def critical_path(edges, timings):
+    """
+    Return (path, seconds) of the chain of runs that determined the DAG's finish time:
+    starting from the last run to finish, repeatedly step to the upstream that finished last.
+    """
+    finished = {node: t for node, t in timings.items() if t.get("end")}
+    if not finished:
+        return [], 0.0
+    node = max(finished, key=lambda n: finished[n]["end"])
+    path = [node]
+    while True:
+        upstreams = [u for u in edges.get(node, ()) if u in finished]
+        if not upstreams:
+            break
+        node = max(upstreams, key=lambda n: finished[n]["end"])
+        path.append(node)
+    path.reverse()
+    seconds = sum(finished[n]["end"] - finished[n]["start"] for n in path)
+    return path, round(seconds, 2)
+
+
+def run_dag(creds, pipeline_names=None, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Run pipelines in dependency order: each starts as soon as all of its upstreams in the
+    run have succeeded, independent branches run in parallel up to `max_workers`, and
+    everything downstream of a failure is skipped. `pipeline_names` limits the run to those
+    pipelines and their descendants; by default every pipeline runs.
+    """
+    pipelines = {
+        row[0]: {"name": row[1], "dataset_name": row[2], "target_table": row[3]}
+        for row in execute_query("SELECT id, name, dataset_name, target_table FROM pipelines", fetch=True)
+    }
+    edges = get_dependencies()
+    if pipeline_names:
+        roots = [pid for pid, p in pipelines.items() if p["name"] in pipeline_names]
+        selected = select_subgraph(edges, roots)
+    else:
+        selected = set(pipelines)
+    # Upstreams outside the run are treated as already satisfied
+    pending = {pid: {u for u in edges.get(pid, ()) if u in selected} for pid in selected}
+
+    dag_run_id = execute_query("SELECT COALESCE(MAX(id), 0) + 1 FROM dag_runs", fetch=True)[0][0]
+    execute_query(
+        "INSERT INTO dag_runs (id, start_time, status) VALUES (?, CURRENT_TIMESTAMP, 'running')",
+        (dag_run_id,)
+    )
+    logging.info(f"DAG run {dag_run_id}: {len(selected)} pipelines, up to {max_workers} in parallel.")
+
+    # Nodes go through the run queue, so they are ranked like every other run
+    ensure_dispatcher(creds, max_workers)
+
+    def run_node(pid):
+        queue_id = enqueue_run(pipelines[pid]["name"], trigger="dag")
+        return True if wait_for_queued_run(queue_id) == "completed" else None
+
+    started = time.time()
+    timings, status = {}, {}
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dag") as executor:
+        while pending or running:
+            for pid in [p for p, ups in pending.items() if not ups]:
+                del pending[pid]
+                timings[pid] = {"start": time.time()}
+                running[executor.submit(run_node, pid)] = pid
+                logging.info(f"DAG run {dag_run_id}: starting `{pipelines[pid]['name']}`.")
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                pid = running.pop(future)
+                timings[pid]["end"] = time.time()
+                try:
+                    succeeded = future.result() is not None
+                except Exception as e:
+                    logging.error(f"❌ DAG run {dag_run_id}: `{pipelines[pid]['name']}` raised {str(e)}")
+                    succeeded = False
+                status[pid] = "completed" if succeeded else "failed"
+                if succeeded:
+                    for ups in pending.values():
+                        ups.discard(pid)
+                else:
+                    for downstream in select_subgraph(edges, [pid]) - {pid}:
+                        if downstream in pending:
+                            del pending[downstream]
+                            status[downstream] = "skipped"
+                    logging.error(f"❌ DAG run {dag_run_id}: `{pipelines[pid]['name']}` failed; skipping its downstream pipelines.")
+
+    path, path_seconds = critical_path(edges, timings)
+    duration = round(time.time() - started, 2)
+    overall = "completed" if all(s == "completed" for s in status.values()) else "failed"
+    node_timings = {
+        pipelines[pid]["name"]: {
+            "status": status.get(pid),
+            "seconds": round(t["end"] - t["start"], 2) if t.get("end") else None
+        }
+        for pid, t in timings.items()
+    }
+    node_timings.update({pipelines[pid]["name"]: {"status": "skipped", "seconds": None}
+                         for pid, s in status.items() if s == "skipped"})
+    critical_names = [pipelines[pid]["name"] for pid in path]
+    execute_query(
+        """
+        UPDATE dag_runs
+        SET end_time = CURRENT_TIMESTAMP, status = ?, duration = ?,
+            critical_path = ?, critical_path_seconds = ?, node_timings = ?
+        WHERE id = ?
+        """,
+        (overall, duration, json.dumps(critical_names), path_seconds, json.dumps(node_timings), dag_run_id)
+    )
+    logging.info(
+        f"DAG run {dag_run_id} {overall} in {duration} seconds. "
+        f"Critical path ({path_seconds}s): {' -> '.join(critical_names)}"
+    )
+    return {"id": dag_run_id, "status": overall, "duration": duration,
+            "critical_path": critical_names, "critical_path_seconds": path_seconds,
+            "pipelines": node_timings}
+
+
+if __name__ == "__main__":
+    # Snowflake credentials are read from the SNOWFLAKE_* environment variables
+    parser = argparse.ArgumentParser(description="Run pipelines in dependency order.")
+    parser.add_argument("pipelines", nargs="*", help="Run only these pipelines and their downstreams")
+    parser.add_argument("--max-workers", type=int, default=DEFAULT_MAX_WORKERS)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    migrate_database()
+    from src.pipelines.dlt_pipeline import load_creds_from_env
+    run_dag(load_creds_from_env(), args.pipelines or None, args.max_workers)
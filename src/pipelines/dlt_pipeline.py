@@ -12,6 +12,14 @@ from cryptography.hazmat.backends import default_backend
 from src.sources.api_source import fetch_data_from_api, load_api_config, get_api_resource
 from src.sources.database_source import fetch_data_from_database, load_db_config
 from src.sources.storage_source import fetch_data_from_s3
+from src.sources.change_tracking import commit_sync_versions, discard_sync_versions
+from src.sources.diff_load import commit_hash_index, discard_hash_index
+from src.pipelines.checkpoints import prepare_checkpoint, run_in_segments
+from src.pipelines.cancellation import register_run, unregister_run, is_cancelled, check_cancelled
+from src.pipelines.locks import pipeline_lock
+from src.pipelines.run_queue import CoalescedRun, attach_run, enqueue_run, ensure_dispatcher
+from src.pipelines.rollups import record_run_rollup
+from src.pipelines.progress import publish as publish_progress
 from src.db.duckdb_connection import execute_query
 # from config.slack_config import load_slack_config
 
@@ -118,7 +126,15 @@ def load_snowflake_credentials():
         return {}
 
 
-def log_pipeline_execution(pipeline_name: str, table_name: str, dataset_name: str, source_url: str, event: str, log_message: str, start_time: datetime = None, end_time: datetime = None, trace = None):
+def load_creds_from_env():
+    """Snowflake credentials for headless runs, read from the SNOWFLAKE_* environment variables."""
+    return {
+        key: os.environ.get(f"SNOWFLAKE_{key.upper()}", "")
+        for key in ("username", "password", "host", "role", "database", "authenticator", "private_key")
+    }
+
+
+def log_pipeline_execution(pipeline_name: str, table_name: str, dataset_name: str, source_url: str, event: str, log_message: str, start_time: datetime = None, end_time: datetime = None, trace = None, rows_loaded: int = None):
     """Log pipeline execution events to the database."""
     try:
         # Get pipeline ID
@@ -153,17 +169,17 @@ def log_pipeline_execution(pipeline_name: str, table_name: str, dataset_name: st
                 id, pipeline_id, run_id, event, timestamp, duration,
                 log_message, pipeline_name, source_url, target_table,
                 dataset_name, stage, start_time, end_time, row_counts,
-                full_trace_json
+                full_trace_json, rows_loaded
             ) VALUES (
                 (SELECT COALESCE(MAX(id), 0) + 1 FROM pipeline_logs),
-                ?, ?, ?, CURRENT_TIMESTAMP, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
+                ?, ?, ?, CURRENT_TIMESTAMP, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
             )
             """,
             (
                 pipeline_id, run_id, event, duration, log_message,
                 pipeline_name, source_url, table_name, dataset_name,
                 event, start_time, end_time, row_counts,
-                json.dumps(trace.__dict__) if trace else None
+                json.dumps(trace.__dict__) if trace else None, rows_loaded
             )
         )
         
@@ -201,7 +217,8 @@ def log_pipeline_execution(pipeline_name: str, table_name: str, dataset_name: st
         logging.error(f"Failed to log pipeline execution: {str(e)}")
 
 
-def run_pipeline(pipeline_name: str, dataset_name: str, table_name: str, run_id: int = None):
+def run_pipeline(pipeline_name: str, dataset_name: str, table_name: str, run_id: int = None, resume_from: int = None,
+                 queue_id: int = None):
     start_time = time.time()
     result = execute_query(
         "SELECT id, source_url, metadata_selection FROM pipelines WHERE name = ?",
@@ -231,15 +248,28 @@ def run_pipeline(pipeline_name: str, dataset_name: str, table_name: str, run_id:
         """
         INSERT INTO pipeline_runs (
             id, pipeline_id, pipeline_name, start_time, status,
-            extract_status, normalize_status, load_status
-        ) VALUES (?, ?, ?, CURRENT_TIMESTAMP, 'running', 'pending', 'pending', 'pending')
+            extract_status, normalize_status, load_status, resumed_from
+        ) VALUES (?, ?, ?, CURRENT_TIMESTAMP, 'running', 'pending', 'pending', 'pending', ?)
         """,
-        (run_id, pipeline_id, pipeline_name)
+        (run_id, pipeline_id, pipeline_name, resume_from)
+    )
+    # Queued runs record which pipeline run they started
+    if queue_id is not None:
+        attach_run(queue_id, run_id)
+    # Lets a cancel issued from this process reach the run without waiting for a database poll
+    register_run(run_id)
+    # Live progress for the UI goes through the in-process bus rather than DuckDB polling
+    publish_progress(
+        run_id, pipeline_name=pipeline_name, status="running", started_at=time.time(),
+        extract_status="pending", normalize_status="pending", load_status="pending"
     )
 
     # If this is a metadata-driven pipeline, update the source_config dynamically
+    source_config = None
+    checkpoint = None
     if metadata_selection:
         logging.info(f"Metadata-driven pipeline detected. Selection criteria: {metadata_selection}")
+        source_config = load_db_config(pipeline_name)
         
         # Determine how to fetch metadata based on selection type
         if metadata_selection["type"] == "explicit":
@@ -253,7 +283,8 @@ def run_pipeline(pipeline_name: str, dataset_name: str, table_name: str, run_id:
             SELECT 
                 id, source_type, driver_type, logical_name, hostname, port,
                 database_name, schema_name, table_name, source_url, endpoint,
-                load_type, primary_key, delta_column, delta_value
+                load_type, primary_key, delta_column, delta_value,
+                column_list, where_clause
             FROM metadata_config
             WHERE id IN ({id_placeholders})
             """
@@ -266,7 +297,8 @@ def run_pipeline(pipeline_name: str, dataset_name: str, table_name: str, run_id:
             
             query_parts = ["SELECT id, source_type, driver_type, logical_name, hostname, port, "
                           "database_name, schema_name, table_name, source_url, endpoint, "
-                          "load_type, primary_key, delta_column, delta_value "
+                          "load_type, primary_key, delta_column, delta_value, "
+                          "column_list, where_clause "
                           "FROM metadata_config WHERE 1=1"]
             params = []
             
@@ -327,7 +359,9 @@ def run_pipeline(pipeline_name: str, dataset_name: str, table_name: str, run_id:
                     "table_name": record[8],
                     "primary_key": record[12],
                     "delta_column": record[13],
-                    "delta_value": record[14]
+                    "delta_value": record[14],
+                    "columns": record[15],
+                    "where": record[16]
                 })
             
             # Log all found source groups
@@ -351,23 +385,38 @@ def run_pipeline(pipeline_name: str, dataset_name: str, table_name: str, run_id:
                         "schema": primary_source["schema_name"],
                         "incremental_type": load_type.upper(),
                         "use_parallel": True,
-                        "chunk_size": source_config.get("chunk_size", 100000)
+                        "chunk_size": source_config.get("chunk_size", 100000),
+                        "adaptive_chunking": source_config.get("adaptive_chunking", True),
+                        "stream_results": source_config.get("stream_results", True),
+                        "fetch_size": source_config.get("fetch_size", 10000),
+                        "checkpoint_chunks": source_config.get("checkpoint_chunks", 0)
                     })
                     
                     if source_config["mode"] == "sql_table":
                         # Single table mode
                         source_config["table"] = primary_source["tables"][0]["table_name"]
-                        if load_type.lower() == "incremental":
+                        source_config["columns"] = primary_source["tables"][0]["columns"]
+                        source_config["where"] = primary_source["tables"][0]["where"]
+                        if load_type.lower() in ("incremental", "cdc", "diff"):
                             source_config["primary_key"] = primary_source["tables"][0]["primary_key"]
                             source_config["delta_column"] = primary_source["tables"][0]["delta_column"]
                             source_config["delta_value"] = primary_source["tables"][0]["delta_value"]
                     else:
                         # Multiple tables mode - IMPORTANT: This is the key change
                         source_config["tables"] = [t["table_name"] for t in primary_source["tables"]]
+                        source_config["table_filters"] = {
+                            t["table_name"]: {"columns": t["columns"], "where": t["where"]}
+                            for t in primary_source["tables"]
+                            if t["columns"] or t["where"]
+                        }
                         
                         # For incremental loads in multi-table mode
-                        if load_type.lower() == "incremental" and primary_source["tables"]:
+                        if load_type.lower() in ("incremental", "cdc", "diff") and primary_source["tables"]:
                             source_config["primary_key"] = primary_source["tables"][0]["primary_key"]
+                            # Each table merges on its own key; primary_key is only the fallback
+                            source_config["table_primary_keys"] = {
+                                t["table_name"]: t["primary_key"] for t in primary_source["tables"] if t["primary_key"]
+                            }
                             source_config["delta_column"] = primary_source["tables"][0]["delta_column"]
                             source_config["delta_value"] = primary_source["tables"][0]["delta_value"]
                     
@@ -386,6 +435,7 @@ def run_pipeline(pipeline_name: str, dataset_name: str, table_name: str, run_id:
                     source_url_lower = source_url.lower()
                     logging.info(f"Updated source URL from metadata: {source_url}")
 
+    error_message = "No data fetched"
     # If the source URL is an API endpoint (http), load API configuration
     if source_url_lower.startswith("http"):
         logging.info('Loading API configuration...')
@@ -394,11 +444,11 @@ def run_pipeline(pipeline_name: str, dataset_name: str, table_name: str, run_id:
         incremental_type = api_config.get("incremental_type", "FULL").upper()
         if incremental_type == "INCREMENTAL":
             # Build the resource with incremental hints using get_api_resource.
-            data_resource = get_api_resource(pipeline_name, table_name, source_url)
+            data_resource = get_api_resource(pipeline_name, table_name, source_url, run_id)
         else:
             @dlt.resource(name=table_name, write_disposition="replace")
             def api_data_resource():
-                data = fetch_data_from_api(source_url, pipeline_name)
+                data = fetch_data_from_api(source_url, pipeline_name, run_id)
                 yield from data
             data_resource = api_data_resource
 
@@ -411,14 +461,19 @@ def run_pipeline(pipeline_name: str, dataset_name: str, table_name: str, run_id:
         ("postgres", "mysql", "bigquery", "redshift", "mssql", "microsoft_sqlserver", "oracle")
     ):
         logging.info('Loading database configuration...')
-        db_config = load_db_config(pipeline_name)
+        # Metadata-driven pipelines use the config resolved above; others load it from file
+        db_config = source_config or load_db_config(pipeline_name)
         # Log performance settings
         logging.info(f"Performance settings: parallel={db_config.get('use_parallel', True)}, "
                     f"chunk_size={db_config.get('chunk_size', 100000)}")
-        data_to_run = fetch_data_from_database(pipeline_name, run_id)
+        # Checkpointed runs load in segments and record the last loaded key after each one
+        checkpoint = prepare_checkpoint(run_id, pipeline_name, table_name, db_config, resume_from)
+        data_to_run = fetch_data_from_database(pipeline_name, run_id, db_config=db_config)
     else:
-        logging.error(f"Unsupported source type for URL: {source_url}")
-        return None
+        # Fails the run below like an empty fetch, so it is not left running
+        error_message = f"Unsupported source type for URL: {source_url}"
+        logging.error(error_message)
+        data_to_run = None
 
     if not data_to_run:
         # Update run status to failed
@@ -426,13 +481,16 @@ def run_pipeline(pipeline_name: str, dataset_name: str, table_name: str, run_id:
             """
             UPDATE pipeline_runs 
             SET status = 'failed', 
-                error_message = 'No data fetched',
+                error_message = ?,
                 end_time = CURRENT_TIMESTAMP
             WHERE id = ?
             """,
-            (run_id,)
+            (error_message, run_id)
         )
-        log_pipeline_execution(pipeline_name, table_name, dataset_name, source_url, "error", "No data fetched")
+        publish_progress(run_id, status="failed", error_message=error_message)
+        log_pipeline_execution(pipeline_name, table_name, dataset_name, source_url, "error", error_message)
+        unregister_run(run_id)
+        record_run_rollup(run_id)
         return None
 
     # Determine write disposition based on config incremental_type:
@@ -442,7 +500,9 @@ def run_pipeline(pipeline_name: str, dataset_name: str, table_name: str, run_id:
         incremental_type = db_config.get("incremental_type", "FULL").upper()
         if incremental_type == "FULL":
             write_disposition = "replace"
-        else:  # "INCREMENTAL"
+        elif incremental_type == "CDC":
+            write_disposition = None  # Merge, or replace on snapshot runs; set per resource
+        else:  # "INCREMENTAL" or "DIFF"
             write_disposition = "merge"
 
     pipeline = dlt.pipeline(
@@ -462,8 +522,20 @@ def run_pipeline(pipeline_name: str, dataset_name: str, table_name: str, run_id:
             "UPDATE pipeline_runs SET extract_status = 'running', extract_start_time = CURRENT_TIMESTAMP WHERE id = ?",
             (run_id,)
         )
+        publish_progress(run_id, extract_status="running")
         
-        if write_disposition:
+        segmented_rows = None
+        if checkpoint:
+            if resume_from:
+                # Packages of the failed segment are past the checkpoint and get extracted again
+                pipeline.drop_pending_packages()
+                if checkpoint["rows"] and write_disposition == "replace":
+                    write_disposition = "append"
+            segmented_rows = run_in_segments(
+                pipeline, data_to_run, checkpoint, run_id, write_disposition,
+                db_config.get("checkpoint_chunks")
+            )
+        elif write_disposition:
             pipeline.run(data_to_run, write_disposition=write_disposition)
         else:
             pipeline.run(data_to_run)
@@ -474,7 +546,9 @@ def run_pipeline(pipeline_name: str, dataset_name: str, table_name: str, run_id:
             "UPDATE pipeline_runs SET extract_status = 'completed', extract_end_time = CURRENT_TIMESTAMP, normalize_status = 'running', normalize_start_time = CURRENT_TIMESTAMP WHERE id = ?",
             (run_id,)
         )
+        publish_progress(run_id, extract_status="completed", normalize_status="running")
         
+        check_cancelled(run_id)
         pipeline.run([pipeline.last_trace], table_name="_trace")
 
         # Update load progress
@@ -483,12 +557,16 @@ def run_pipeline(pipeline_name: str, dataset_name: str, table_name: str, run_id:
             "UPDATE pipeline_runs SET normalize_status = 'completed', normalize_end_time = CURRENT_TIMESTAMP, load_status = 'running', load_start_time = CURRENT_TIMESTAMP WHERE id = ?",
             (run_id,)
         )
+        publish_progress(run_id, normalize_status="completed", load_status="running")
 
         end_time = datetime.now()
         duration = round((end_time - start_time).total_seconds(), 2)
         trace = pipeline.last_trace
         row_counts = trace.last_normalize_info.row_counts if trace and trace.last_normalize_info else {}
         total_rows = sum(count for table, count in row_counts.items() if not table.startswith("_dlt_"))
+        if segmented_rows is not None:
+            # The trace only covers the last segment
+            total_rows = segmented_rows
         
         # Calculate rows per second
         rows_per_second = round(total_rows / duration, 2) if duration > 0 else 0
@@ -509,6 +587,7 @@ def run_pipeline(pipeline_name: str, dataset_name: str, table_name: str, run_id:
             """,
             (duration, total_rows, run_id)
         )
+        publish_progress(run_id, status="completed", load_status="completed", duration=duration, rows_processed=total_rows)
         
         # Update pipeline status
         execute_query(
@@ -516,6 +595,12 @@ def run_pipeline(pipeline_name: str, dataset_name: str, table_name: str, run_id:
             (pipeline_id,)
         )
         
+        # The load succeeded, so CDC and DIFF tables can advance their sync state
+        commit_sync_versions(run_id)
+        commit_hash_index(run_id)
+        unregister_run(run_id)
+        record_run_rollup(run_id)
+        
         logging.info(f"Pipeline `{pipeline_name}` completed in {duration} seconds! Rows Loaded: {total_rows}")
         logging.info("Extract Info: %s", pipeline.last_trace.last_extract_info)
         logging.info("Normalize Info: %s", pipeline.last_trace.last_normalize_info)
@@ -533,13 +618,52 @@ def run_pipeline(pipeline_name: str, dataset_name: str, table_name: str, run_id:
         log_pipeline_execution(
             pipeline_name, table_name, dataset_name, source_url,
             "completed", f"Completed in {duration} seconds. Rows Loaded: {total_rows}\nResource Details: {per_resource_details}",
-            start_time=start_time, end_time=end_time, trace=trace
+            start_time=start_time, end_time=end_time, trace=trace, rows_loaded=total_rows
         )
         send_slack_message(f"Pipeline `{pipeline_name}` completed in {duration} seconds. Rows Loaded: {total_rows}.")
         return total_rows
     except Exception as e:
         end_time = datetime.now()
         duration = round((end_time - start_time).total_seconds(), 2)
+        
+        if is_cancelled(run_id):
+            # Drop the interrupted packages so a later run never loads half an extraction
+            pipeline.drop_pending_packages()
+            # Segments loaded before the cancel stay in the destination and count as processed
+            loaded_rows = checkpoint["rows"] if checkpoint else None
+            execute_query(
+                """
+                UPDATE pipeline_runs 
+                SET status = 'cancelled',
+                    end_time = CURRENT_TIMESTAMP,
+                    duration = ?,
+                    rows_processed = COALESCE(?, processed_rows),
+                    error_message = 'Cancelled by user',
+                    extract_status = CASE WHEN extract_status = 'completed' THEN extract_status ELSE 'cancelled' END,
+                    normalize_status = CASE WHEN normalize_status = 'completed' THEN normalize_status ELSE 'cancelled' END,
+                    load_status = 'cancelled',
+                    load_end_time = CURRENT_TIMESTAMP
+                WHERE id = ?
+                """,
+                (duration, loaded_rows, run_id)
+            )
+            publish_progress(run_id, status="cancelled", duration=duration, rows_processed=loaded_rows)
+            execute_query(
+                "UPDATE pipelines SET last_run_status = 'cancelled' WHERE id = ?",
+                (pipeline_id,)
+            )
+            discard_sync_versions(run_id)
+            discard_hash_index(run_id)
+            unregister_run(run_id)
+            record_run_rollup(run_id)
+            log_pipeline_execution(
+                pipeline_name, table_name, dataset_name, source_url,
+                "cancelled", f"Cancelled after {duration} seconds",
+                start_time=start_time, end_time=end_time
+            )
+            send_slack_message(f"Pipeline `{pipeline_name}` was cancelled after {duration} seconds.")
+            return None
+        
         error_msg = f"Pipeline execution failed in {duration} seconds: {str(e)}"
         logging.error(error_msg)
         
@@ -557,12 +681,17 @@ def run_pipeline(pipeline_name: str, dataset_name: str, table_name: str, run_id:
             """,
             (duration, str(e), run_id)
         )
+        publish_progress(run_id, status="failed", load_status="failed", duration=duration, error_message=str(e))
         
         # Update pipeline status
         execute_query(
             "UPDATE pipelines SET last_run_status = 'failed' WHERE id = ?",
             (pipeline_id,)
         )
+        discard_sync_versions(run_id)
+        discard_hash_index(run_id)
+        unregister_run(run_id)
+        record_run_rollup(run_id)
         
         trace_obj = pipeline.last_trace if hasattr(pipeline, "last_trace") else None
         log_pipeline_execution(
@@ -573,14 +702,27 @@ def run_pipeline(pipeline_name: str, dataset_name: str, table_name: str, run_id:
         send_slack_message(f"Pipeline `{pipeline_name}` failed after {duration} seconds: {str(e)}")
         return None
 
-def run_pipeline_with_creds(pipeline_name: str, dataset_name: str, table_name: str, creds: dict):
-    """Runs a pipeline with the provided Snowflake credentials."""
+def run_pipeline_with_creds(pipeline_name: str, dataset_name: str, table_name: str, creds: dict, resume_from: int = None,
+                            queue_id: int = None):
+    """
+    Runs a pipeline with the provided Snowflake credentials, optionally resuming a failed run.
+    Returns a CoalescedRun instead when the pipeline is already running and a follow-up was queued.
+    """
     try:
         # Set environment variables for the pipeline
         set_env_vars(creds, pipeline_name)
         
-        # Run the pipeline
-        result = run_pipeline(pipeline_name, dataset_name, table_name)
+        # Only one run per pipeline may use its dlt working directory and target tables
+        with pipeline_lock(pipeline_name) as acquired:
+            if not acquired:
+                # Coalesce the trigger into the pipeline's single queued run
+                ensure_dispatcher(creds)
+                queue_id = enqueue_run(pipeline_name, trigger="coalesced", resume_from=resume_from)
+                logging.warning(f"Pipeline `{pipeline_name}` is already running; queued one follow-up run.")
+                return CoalescedRun(queue_id)
+            
+            # Run the pipeline
+            result = run_pipeline(pipeline_name, dataset_name, table_name, resume_from=resume_from, queue_id=queue_id)
         
         return result
     except Exception as e:
@@ -0,0 +1,100 @@
+import logging
+import os
+import socket
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from src.db.duckdb_connection import execute_query
+
+LEASE_SECONDS = 120     # a lock without a heartbeat for this long is free to take over
+HEARTBEAT_SECONDS = 30  # how often a running pipeline renews its lease
+
+
+def new_holder_id():
+    """Identify a lock holder uniquely across hosts and processes."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def acquire_lock(pipeline_name, holder, lease_seconds=LEASE_SECONDS):
+    """Take the per-pipeline lease if it is free or expired; returns True on success."""
+    now = datetime.now()
+    # No transaction needed: the insert only succeeds if no live lease row exists, and
+    # a remote worker connection cannot read RETURNING rows inside a batch
+    execute_query(
+        "DELETE FROM pipeline_locks WHERE pipeline_name = ? AND expires_at < ?",
+        (pipeline_name, now)
+    )
+    acquired = execute_query(
+        """
+        INSERT INTO pipeline_locks (pipeline_name, holder, acquired_at, heartbeat_at, expires_at)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT DO NOTHING
+        RETURNING holder
+        """,
+        (pipeline_name, holder, now, now, now + timedelta(seconds=lease_seconds)),
+        fetch=True
+    )
+    return bool(acquired)
+
+
+def renew_lock(pipeline_name, holder, lease_seconds=LEASE_SECONDS):
+    """Extend a held lease; returns False if the lease was lost to another holder."""
+    now = datetime.now()
+    renewed = execute_query(
+        """
+        UPDATE pipeline_locks SET heartbeat_at = ?, expires_at = ?
+        WHERE pipeline_name = ? AND holder = ?
+        RETURNING holder
+        """,
+        (now, now + timedelta(seconds=lease_seconds), pipeline_name, holder),
+        fetch=True
+    )
+    return bool(renewed)
+
+
+def release_lock(pipeline_name, holder):
+    execute_query(
+        "DELETE FROM pipeline_locks WHERE pipeline_name = ? AND holder = ?",
+        (pipeline_name, holder)
+    )
+
+
+def is_locked(pipeline_name):
+    result = execute_query(
+        "SELECT 1 FROM pipeline_locks WHERE pipeline_name = ? AND expires_at >= ?",
+        (pipeline_name, datetime.now()),
+        fetch=True
+    )
+    return bool(result)
+
+
+@contextmanager
+def pipeline_lock(pipeline_name, holder=None):
+    """
+    Hold the pipeline's lease for the duration of the block, renewing it on a heartbeat
+    thread. Yields False without entering the lease if another run holds it.
+    """
+    holder = holder or new_holder_id()
+    if not acquire_lock(pipeline_name, holder):
+        yield False
+        return
+
+    stop = threading.Event()
+
+    def heartbeat():
+        while not stop.wait(HEARTBEAT_SECONDS):
+            try:
+                if not renew_lock(pipeline_name, holder):
+                    logging.error(f"❌ Lost the run lock of `{pipeline_name}`; another run may start.")
+                    return
+            except Exception as e:
+                logging.warning(f"Could not renew the run lock of `{pipeline_name}`: {str(e)}")
+
+    thread = threading.Thread(target=heartbeat, name=f"lock-{pipeline_name}", daemon=True)
+    thread.start()
+    try:
+        yield True
+    finally:
+        stop.set()
+        release_lock(pipeline_name, holder)
@@ -0,0 +1,43 @@
+import threading
+import time
+
+MAX_FINISHED_RUNS = 200    # finished run states kept for the runs page
+STALE_RUN_SECONDS = 6 * 3600  # states not updated for this long are dropped (e.g. a run that crashed)
+FINAL_STATUSES = ("completed", "failed", "cancelled")
+
+# Latest progress per run in this process, fed by the runner as it goes
+_runs = {}
+_lock = threading.Lock()
+
+
+def publish(run_id, **fields):
+    """
+    Merge `fields` (status, stage statuses, chunk and row counts...) into the run's
+    progress. Never touches the state database.
+    """
+    if run_id is None:
+        return
+    with _lock:
+        state = _runs.setdefault(run_id, {"run_id": run_id})
+        state.update(fields)
+        state["updated_at"] = time.time()
+        _prune()
+
+
+def _prune():
+    cutoff = time.time() - STALE_RUN_SECONDS
+    for run_id in [run_id for run_id, state in _runs.items() if state["updated_at"] < cutoff]:
+        del _runs[run_id]
+    finished = [run_id for run_id, state in _runs.items() if state.get("status") in FINAL_STATUSES]
+    for run_id in sorted(finished)[:-MAX_FINISHED_RUNS]:
+        del _runs[run_id]
+
+
+def latest_run(pipeline_name, since=None):
+    """The most recent run of a pipeline published in this process, optionally started after `since`."""
+    with _lock:
+        states = [
+            s for s in _runs.values()
+            if s.get("pipeline_name") == pipeline_name and (since is None or s.get("started_at", 0) >= since)
+        ]
+        return dict(max(states, key=lambda s: s["run_id"])) if states else None
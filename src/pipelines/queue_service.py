@@ -0,0 +1,166 @@
+import argparse
+import hmac
+import json
+import logging
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.db.duckdb_connection import get_local_connection, migrate_database
+from src.db.query_cache import note_write
+from src.db.remote_connection import QUEUE_TOKEN_ENV, encode_value, decode_value
+from src.pipelines.locks import acquire_lock, renew_lock, release_lock
+from src.pipelines.run_queue import (
+    claim_next_run, finish_run, release_claim, renew_run_lease, reassign_expired_runs
+)
+from src.sources.database_source import load_db_config
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+WORKER_LEASE_SECONDS = 90  # a claimed run whose worker has not heartbeated for this long is requeued
+
+
+def claim(worker_id):
+    """Hand the best queued run to a remote worker, together with its pipeline lock."""
+    reassign_expired_runs()
+    entry = claim_next_run(worker_id)
+    if not entry:
+        return None
+    if not acquire_lock(entry["pipeline_name"], worker_id, WORKER_LEASE_SECONDS):
+        # A local run took the pipeline between ranking and locking; leave the entry queued
+        release_claim(entry["id"])
+        return None
+    renew_run_lease(entry["id"], worker_id, WORKER_LEASE_SECONDS)
+    return entry
+
+
+def heartbeat(worker_id, queue_id, pipeline_name):
+    held, run_id = renew_run_lease(queue_id, worker_id, WORKER_LEASE_SECONDS)
+    if held:
+        held = renew_lock(pipeline_name, worker_id, WORKER_LEASE_SECONDS)
+    return {"held": held, "run_id": run_id}
+
+
+def complete(worker_id, queue_id, pipeline_name, status):
+    held, run_id = renew_run_lease(queue_id, worker_id, WORKER_LEASE_SECONDS)
+    if held:
+        finish_run(queue_id, status, run_id)
+    release_lock(pipeline_name, worker_id)
+    return {"held": held, "run_id": run_id}
+
+
+def run_query(query, params=None):
+    """Run one statement for a worker and return its rows."""
+    conn = get_local_connection()
+    try:
+        rows = conn.execute(query, decode_value(params)).fetchall() if params else conn.execute(query).fetchall()
+        conn.commit()
+        note_write(query)
+        return {"rows": [encode_value(list(row)) for row in rows]}
+    finally:
+        conn.close()
+
+
+def run_batch(statements):
+    """Run a worker's transaction: every statement commits together or not at all."""
+    conn = get_local_connection()
+    try:
+        conn.execute("BEGIN TRANSACTION")
+        for statement in statements:
+            params = decode_value(statement.get("params"))
+            if statement.get("many"):
+                conn.executemany(statement["query"], params)
+            elif params:
+                conn.execute(statement["query"], params)
+            else:
+                conn.execute(statement["query"])
+        conn.execute("COMMIT")
+        for statement in statements:
+            note_write(statement["query"])
+        return {"statements": len(statements)}
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def encode_value_dict(entry):
+    return {key: encode_value(value) for key, value in entry.items()} if entry else None
+
+
+def claim_with_config(worker_id):
+    """A claimed entry plus its pipeline config, so workers need no copy of `config/`."""
+    entry = claim(worker_id)
+    config = load_db_config(entry["pipeline_name"]) if entry else None
+    return {"entry": encode_value_dict(entry), "config": config}
+
+
+ROUTES = {
+    "/claim": lambda body: claim_with_config(body["worker_id"]),
+    "/heartbeat": lambda body: heartbeat(body["worker_id"], body["queue_id"], body["pipeline_name"]),
+    "/complete": lambda body: complete(body["worker_id"], body["queue_id"], body["pipeline_name"], body["status"]),
+    "/query": lambda body: run_query(body["query"], body.get("params")),
+    "/batch": lambda body: run_batch(body["statements"]),
+}
+
+
+class QueueRequestHandler(BaseHTTPRequestHandler):
+    token = ""
+
+    def do_POST(self):
+        route = ROUTES.get(self.path)
+        if route is None:
+            return self._reply(404, {"error": f"Unknown endpoint {self.path}"})
+        supplied = self.headers.get("Authorization", "").removeprefix("Bearer ")
+        if not hmac.compare_digest(supplied, self.token):
+            return self._reply(401, {"error": "Invalid queue token"})
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            self._reply(200, route(body))
+        except Exception as e:
+            logging.error(f"❌ Queue service error on {self.path}: {str(e)}")
+            self._reply(500, {"error": str(e)})
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logging.debug(f"Queue service: {format % args}")
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_queue_service(host=DEFAULT_HOST, port=DEFAULT_PORT, token=None):
+    """
+    Serve the run queue to remote workers from this process, which stays the only writer of
+    the DuckDB file. Idempotent; the server runs on a daemon thread.
+    """
+    global _server
+    token = token if token is not None else os.environ.get(QUEUE_TOKEN_ENV, "")
+    if not token:
+        raise ValueError(f"Set {QUEUE_TOKEN_ENV} before starting the queue service")
+    with _server_lock:
+        if _server is None:
+            handler = type("Handler", (QueueRequestHandler,), {"token": token})
+            _server = ThreadingHTTPServer((host, port), handler)
+            threading.Thread(target=_server.serve_forever, name="queue-service", daemon=True).start()
+            logging.info(f"Run queue service listening on {host}:{port}.")
+    return _server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the run queue to remote workers.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    migrate_database()
+    start_queue_service(args.host, args.port)
+    threading.Event().wait()
@@ -0,0 +1,189 @@
+import argparse
+import logging
+import math
+from datetime import datetime
+from src.db.duckdb_connection import execute_query, get_connection
+from src.db.query_cache import bump
+
+GRAINS = ("hour", "day")
+HISTOGRAM_BUCKETS = 64  # bucket 0 holds runs under a second, bucket k durations in [1.25^(k-1), 1.25^k)
+HISTOGRAM_BASE = 1.25
+
+# SQL for a run's histogram bucket; NULL durations are counted in no bucket
+DURATION_BUCKET_SQL = f"""
+    CASE
+        WHEN duration IS NULL THEN -1
+        WHEN duration < 1 THEN 0
+        ELSE LEAST({HISTOGRAM_BUCKETS - 1}, 1 + floor(ln(duration) / ln({HISTOGRAM_BASE}))::INTEGER)
+    END
+"""
+
+# Counters shared by the incremental upsert and the rebuild
+ROLLUP_COLUMNS = """
+    COUNT(*) AS runs,
+    COUNT(*) FILTER (WHERE status = 'completed') AS successes,
+    COUNT(*) FILTER (WHERE status = 'failed') AS failures,
+    COUNT(*) FILTER (WHERE status = 'cancelled') AS cancellations,
+    COUNT(*) FILTER (WHERE extract_status = 'failed') AS extract_failures,
+    COUNT(*) FILTER (WHERE normalize_status = 'failed') AS normalize_failures,
+    COUNT(*) FILTER (WHERE load_status = 'failed') AS load_failures,
+    COALESCE(SUM(rows_processed), 0) AS rows_sum,
+    COUNT(duration) AS duration_count,
+    COALESCE(SUM(duration), 0) AS duration_sum,
+    COALESCE(SUM(duration * duration), 0) AS duration_sq_sum,
+    MIN(duration) AS duration_min,
+    MAX(duration) AS duration_max
+"""
+
+
+def record_run_rollup(run_id):
+    """
+    Add a finished run to the hourly and daily rollups. Each run is counted once: the
+    upserts and the run's rolled_up flag commit together.
+    """
+    conn = get_connection()
+    try:
+        conn.execute("BEGIN TRANSACTION")
+        for grain in GRAINS:
+            conn.execute(
+                f"""
+                INSERT INTO run_rollups
+                SELECT '{grain}', pipeline_name, date_trunc('{grain}', start_time), {ROLLUP_COLUMNS},
+                       list_transform(range({HISTOGRAM_BUCKETS}), i -> CASE WHEN i = duration_bucket THEN 1 ELSE 0 END)
+                FROM (SELECT *, {DURATION_BUCKET_SQL} AS duration_bucket FROM pipeline_runs) r
+                WHERE id = ? AND end_time IS NOT NULL AND NOT COALESCE(rolled_up, FALSE)
+                GROUP BY pipeline_name, start_time, duration_bucket
+                ON CONFLICT (grain, pipeline_name, bucket_start) DO UPDATE SET
+                    runs = runs + excluded.runs,
+                    successes = successes + excluded.successes,
+                    failures = failures + excluded.failures,
+                    cancellations = cancellations + excluded.cancellations,
+                    extract_failures = extract_failures + excluded.extract_failures,
+                    normalize_failures = normalize_failures + excluded.normalize_failures,
+                    load_failures = load_failures + excluded.load_failures,
+                    rows_sum = rows_sum + excluded.rows_sum,
+                    duration_count = duration_count + excluded.duration_count,
+                    duration_sum = duration_sum + excluded.duration_sum,
+                    duration_sq_sum = duration_sq_sum + excluded.duration_sq_sum,
+                    duration_min = LEAST(duration_min, excluded.duration_min),
+                    duration_max = GREATEST(duration_max, excluded.duration_max),
+                    duration_histogram = list_transform(
+                        list_zip(duration_histogram, excluded.duration_histogram), x -> x[1] + x[2]
+                    )
+                """,
+                (run_id,)
+            )
+        conn.execute(
+            "UPDATE pipeline_runs SET rolled_up = TRUE WHERE id = ? AND end_time IS NOT NULL",
+            (run_id,)
+        )
+        conn.execute("COMMIT")
+        bump("run_rollups")
+    except Exception as e:
+        conn.execute("ROLLBACK")
+        # Metrics must never fail a run; rebuild_rollups() can repair the rollups later
+        logging.warning(f"Could not update run rollups for run {run_id}: {str(e)}")
+    finally:
+        conn.close()
+
+
+def rebuild_rollups():
+    """Recompute every rollup from pipeline_runs, e.g. after upgrading or a failed update."""
+    conn = get_connection()
+    try:
+        conn.execute("BEGIN TRANSACTION")
+        conn.execute("DELETE FROM run_rollups")
+        for grain in GRAINS:
+            histograms = {}
+            for pipeline_name, bucket_start, bucket, count in conn.execute(
+                f"""
+                SELECT pipeline_name, date_trunc('{grain}', start_time), {DURATION_BUCKET_SQL} AS bucket, COUNT(*)
+                FROM pipeline_runs
+                WHERE end_time IS NOT NULL AND duration IS NOT NULL
+                GROUP BY ALL
+                """
+            ).fetchall():
+                histogram = histograms.setdefault((pipeline_name, bucket_start), [0] * HISTOGRAM_BUCKETS)
+                histogram[bucket] = count
+            rows = conn.execute(
+                f"""
+                SELECT '{grain}', pipeline_name, date_trunc('{grain}', start_time) AS bucket_start, {ROLLUP_COLUMNS}
+                FROM pipeline_runs
+                WHERE end_time IS NOT NULL
+                GROUP BY pipeline_name, bucket_start
+                """
+            ).fetchall()
+            if rows:
+                conn.executemany(
+                    f"INSERT INTO run_rollups VALUES ({', '.join(['?'] * 17)})",
+                    [row + (histograms.get((row[1], row[2]), [0] * HISTOGRAM_BUCKETS),) for row in rows]
+                )
+        conn.execute("UPDATE pipeline_runs SET rolled_up = (end_time IS NOT NULL)")
+        conn.execute("COMMIT")
+        bump("run_rollups")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def build_rollup_filters(filters=None, grain="day"):
+    """Return the WHERE clause and parameters for the page filters on run_rollups."""
+    where = "WHERE grain = ?"
+    params = [grain]
+    if filters:
+        if filters.get('pipeline_name'):
+            where += " AND pipeline_name = ?"
+            params.append(filters['pipeline_name'])
+        if filters.get('date_range'):
+            start_date = datetime.combine(filters['date_range'][0], datetime.min.time())
+            end_date = datetime.combine(filters['date_range'][-1], datetime.max.time())
+            where += " AND bucket_start >= ? AND bucket_start <= ?"
+            params.extend([start_date, end_date])
+    return where, tuple(params)
+
+
+def merge_histograms(histograms):
+    merged = [0] * HISTOGRAM_BUCKETS
+    for histogram in histograms:
+        for i, count in enumerate(histogram or ()):
+            merged[i] += count
+    return merged
+
+
+def histogram_quantile(histogram, q):
+    """
+    Estimate a duration quantile from a rollup histogram, interpolating within the bucket.
+    Accurate to one bucket width, i.e. within 25% of the true value.
+    """
+    total = sum(histogram)
+    if not total:
+        return None
+    target = q * total
+    seen = 0
+    for bucket, count in enumerate(histogram):
+        if count and seen + count >= target:
+            low = 0.0 if bucket == 0 else HISTOGRAM_BASE ** (bucket - 1)
+            high = HISTOGRAM_BASE ** bucket if bucket else 1.0
+            return low + (high - low) * (target - seen) / count
+        seen += count
+    return HISTOGRAM_BASE ** (HISTOGRAM_BUCKETS - 1)
+
+
+def duration_std(count, total, sq_total):
+    """Sample standard deviation from a rollup's count, sum and sum of squares."""
+    if not count or count < 2:
+        return None
+    return math.sqrt(max(0.0, (sq_total - total * total / count) / (count - 1)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the run metric rollups.")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute all rollups from pipeline_runs")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    if args.rebuild:
+        rebuild_rollups()
+        count = execute_query("SELECT COUNT(*) FROM run_rollups", fetch=True)[0][0]
+        logging.info(f"Rebuilt {count} rollup rows.")
@@ -0,0 +1,378 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from src.db.duckdb_connection import execute_query, get_connection
+from src.pipelines.rollups import record_run_rollup
+
+DEFAULT_PRIORITY = 5         # 1 (lowest) to 10 (most urgent)
+DEFAULT_GROUP = "default"
+DEFAULT_MAX_CONCURRENT = 4
+AGING_PER_MINUTE = 0.1       # priority points a queued run gains per minute of waiting
+FAIR_SHARE_PENALTY = 2.0     # priority points a group loses per unit of weighted usage
+USAGE_WINDOW_SECONDS = 3600  # recent runtime counted towards a group's usage
+POLL_SECONDS = 2
+LOCAL_LEASE_SECONDS = 60     # a local claim not renewed for this long (e.g. after a crash) is requeued
+COALESCED = "coalesced"     # queue status of a claimed run whose trigger joined a newer queued run
+
+
+class CoalescedRun:
+    """
+    Returned instead of a run result when the pipeline was already running and the
+    trigger was folded into its queued follow-up run `queue_id`.
+    """
+
+    def __init__(self, queue_id):
+        self.queue_id = queue_id
+
+
+def enqueue_run(pipeline_name, trigger="manual", resume_from=None):
+    """
+    Queue a run of a pipeline with its priority and group; returns the queue entry id.
+    A pipeline has at most one queued run, so repeated triggers coalesce into it.
+    """
+    result = execute_query(
+        "SELECT id, dataset_name, target_table, priority, owner_group FROM pipelines WHERE name = ?",
+        (pipeline_name,),
+        fetch=True
+    )
+    if not result:
+        raise ValueError(f"No pipeline named `{pipeline_name}`")
+    pipeline_id, dataset_name, target_table, priority, owner_group = result[0]
+    existing = execute_query(
+        """
+        UPDATE run_queue SET resume_from = COALESCE(?, resume_from)
+        WHERE id = (SELECT MIN(id) FROM run_queue WHERE pipeline_id = ? AND status = 'queued')
+        RETURNING id
+        """,
+        (resume_from, pipeline_id),
+        fetch=True
+    )
+    if existing:
+        logging.info(f"`{pipeline_name}` already has a queued run; {trigger} trigger coalesced into it.")
+        return existing[0][0]
+    queue_id = execute_query("SELECT COALESCE(MAX(id), 0) + 1 FROM run_queue", fetch=True)[0][0]
+    execute_query(
+        """
+        INSERT INTO run_queue (
+            id, pipeline_id, pipeline_name, dataset_name, target_table, priority,
+            owner_group, status, trigger, resume_from, enqueued_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, 'queued', ?, ?, ?)
+        """,
+        (
+            queue_id, pipeline_id, pipeline_name, dataset_name, target_table,
+            priority or DEFAULT_PRIORITY, owner_group or DEFAULT_GROUP,
+            trigger, resume_from, datetime.now()
+        )
+    )
+    logging.info(f"Queued run of `{pipeline_name}` (priority {priority}, group {owner_group}).")
+    return queue_id
+
+
+def get_group_weights():
+    return {name: weight for name, weight in execute_query(
+        "SELECT group_name, weight FROM queue_groups", fetch=True
+    )}
+
+
+def set_group_weight(group_name, weight):
+    execute_query(
+        "INSERT OR REPLACE INTO queue_groups (group_name, weight) VALUES (?, ?)",
+        (group_name, float(weight))
+    )
+
+
+def get_group_usage(now):
+    """
+    Return {group: usage}, where usage counts each running run as 1 plus the group's share
+    of the last hour of dispatched runtime.
+    """
+    window_start = datetime.fromtimestamp(now - USAGE_WINDOW_SECONDS)
+    rows = execute_query(
+        """
+        SELECT owner_group,
+               SUM(CASE WHEN status = 'running' THEN 1 ELSE 0 END) AS running,
+               SUM(date_diff('second', GREATEST(started_at, ?), COALESCE(finished_at, ?))) AS seconds
+        FROM run_queue
+        WHERE started_at IS NOT NULL AND (finished_at IS NULL OR finished_at >= ?)
+        GROUP BY owner_group
+        """,
+        (window_start, datetime.fromtimestamp(now), window_start),
+        fetch=True
+    )
+    return {group: (running or 0) + (seconds or 0) / USAGE_WINDOW_SECONDS for group, running, seconds in rows}
+
+
+def rank_queued_runs(queued, usage, weights, now):
+    """
+    Order queued runs by effective priority: the pipeline's priority, plus aging so long
+    waits are never starved, minus a penalty for groups that used more than their share.
+    """
+    def score(entry):
+        waited_minutes = (now - entry["enqueued_at"].timestamp()) / 60
+        group = entry["owner_group"]
+        weighted_usage = usage.get(group, 0) / max(weights.get(group, 1.0), 0.01)
+        return entry["priority"] + AGING_PER_MINUTE * waited_minutes - FAIR_SHARE_PENALTY * weighted_usage
+
+    return sorted(queued, key=score, reverse=True)
+
+
+def claim_next_run(worker_id):
+    """
+    Atomically mark the best queued run as running for `worker_id` and return it, or None.
+    Safe to call from several dispatchers at once; a lost race moves on to the next candidate.
+    """
+    rows = execute_query(
+        """
+        SELECT id, pipeline_name, dataset_name, target_table, priority, owner_group,
+               enqueued_at, resume_from
+        FROM run_queue
+        WHERE status = 'queued'
+          -- Pipelines holding a live run lock wait until that run finishes
+          AND pipeline_name NOT IN (SELECT pipeline_name FROM pipeline_locks WHERE expires_at >= ?)
+        """,
+        (datetime.now(),),
+        fetch=True
+    )
+    if not rows:
+        return None
+    columns = ["id", "pipeline_name", "dataset_name", "target_table", "priority",
+               "owner_group", "enqueued_at", "resume_from"]
+    queued = [dict(zip(columns, row)) for row in rows]
+    now = time.time()
+    for entry in rank_queued_runs(queued, get_group_usage(now), get_group_weights(), now):
+        claimed = execute_query(
+            """
+            UPDATE run_queue SET status = 'running', worker_id = ?, started_at = ?
+            WHERE id = ? AND status = 'queued'
+            RETURNING id
+            """,
+            (worker_id, datetime.now(), entry["id"]),
+            fetch=True
+        )
+        if claimed:
+            return entry
+    return None
+
+
+def attach_run(queue_id, run_id):
+    """Record the pipeline run a claimed queue entry started."""
+    execute_query("UPDATE run_queue SET run_id = ? WHERE id = ?", (run_id, queue_id))
+
+
+def finish_run(queue_id, status, run_id=None):
+    execute_query(
+        "UPDATE run_queue SET status = ?, run_id = COALESCE(?, run_id), finished_at = ? WHERE id = ?",
+        (status, run_id, datetime.now(), queue_id)
+    )
+
+
+def wait_for_queued_run(queue_id, poll_seconds=POLL_SECONDS):
+    """
+    Block until a queue entry finishes and return its final status. An entry that itself
+    coalesced is followed to the pipeline's next queue entry.
+    """
+    while True:
+        row = execute_query("SELECT pipeline_id, status FROM run_queue WHERE id = ?", (queue_id,), fetch=True)
+        if not row:
+            return "failed"
+        pipeline_id, status = row[0]
+        if status == COALESCED:
+            following = execute_query(
+                "SELECT MIN(id) FROM run_queue WHERE pipeline_id = ? AND id > ?",
+                (pipeline_id, queue_id),
+                fetch=True
+            )[0][0]
+            if following is None:
+                return "failed"
+            queue_id = following
+        elif status not in ("queued", "running"):
+            return status
+        else:
+            time.sleep(poll_seconds)
+
+
+def release_claim(queue_id):
+    """Return a claimed run to the queue untouched."""
+    execute_query(
+        """
+        UPDATE run_queue SET status = 'queued', worker_id = NULL, started_at = NULL, lease_expires_at = NULL
+        WHERE id = ? AND status = 'running'
+        """,
+        (queue_id,)
+    )
+
+
+def renew_run_lease(queue_id, worker_id, lease_seconds):
+    """
+    Extend a remote worker's lease on a claimed run. Returns (held, run_id), with the
+    pipeline run the worker attached; held is False once the run was reassigned.
+    """
+    now = datetime.now()
+    result = execute_query(
+        """
+        UPDATE run_queue SET lease_expires_at = ?
+        WHERE id = ? AND worker_id = ? AND status = 'running'
+        RETURNING run_id
+        """,
+        (now + timedelta(seconds=lease_seconds), queue_id, worker_id),
+        fetch=True
+    )
+    return (True, result[0][0]) if result else (False, None)
+
+
+def reassign_expired_runs():
+    """
+    Put runs whose remote worker stopped heartbeating back in the queue. The orphaned
+    pipeline run is marked failed and the new attempt resumes from its checkpoint.
+    """
+    now = datetime.now()
+    expired = execute_query(
+        """
+        SELECT id, pipeline_name, worker_id, run_id FROM run_queue
+        WHERE status = 'running' AND lease_expires_at < ?
+        """,
+        (now,),
+        fetch=True
+    )
+    for queue_id, pipeline_name, worker_id, run_id in expired:
+        requeued = execute_query(
+            """
+            UPDATE run_queue
+            SET status = 'queued', trigger = 'reassigned', worker_id = NULL, started_at = NULL,
+                lease_expires_at = NULL, run_id = NULL, resume_from = COALESCE(?, resume_from)
+            WHERE id = ? AND status = 'running' AND lease_expires_at < ?
+            RETURNING id
+            """,
+            (run_id, queue_id, now),
+            fetch=True
+        )
+        if not requeued:
+            continue
+        if run_id:
+            execute_query(
+                """
+                UPDATE pipeline_runs SET status = 'failed', end_time = ?,
+                    error_message = 'Worker stopped heartbeating; run reassigned'
+                WHERE id = ? AND end_time IS NULL
+                """,
+                (now, run_id)
+            )
+            record_run_rollup(run_id)
+        execute_query(
+            "DELETE FROM pipeline_locks WHERE pipeline_name = ? AND holder = ?",
+            (pipeline_name, worker_id)
+        )
+        logging.warning(f"Worker `{worker_id}` lost queued run {queue_id} of `{pipeline_name}`; requeued it.")
+    return len(expired)
+
+
+def expire_unleased_claims(worker_prefix):
+    """
+    Expire the claims of `worker_prefix` dispatchers that never took a lease, left running
+    by a process that stopped before claims were leased, so `reassign_expired_runs` requeues them.
+    """
+    execute_query(
+        """
+        UPDATE run_queue SET lease_expires_at = ?
+        WHERE status = 'running' AND lease_expires_at IS NULL AND worker_id LIKE ?
+        """,
+        (datetime.now(), f"{worker_prefix}%")
+    )
+
+
+def get_queue(limit=50):
+    """Queued and running entries, for display."""
+    return execute_query(
+        f"""
+        SELECT id, pipeline_name, owner_group, priority, status, trigger, enqueued_at, started_at
+        FROM run_queue
+        WHERE status IN ('queued', 'running')
+        ORDER BY status DESC, priority DESC, enqueued_at
+        LIMIT {int(limit)}
+        """,
+        fetch=True
+    )
+
+
+class Dispatcher:
+    """
+    Background thread that runs queued pipelines in this process, up to `max_concurrent`
+    at a time, always starting the highest ranked queued run next. Claims are leased like
+    remote workers' claims, so runs left behind by a crashed process go back in the queue.
+    """
+
+    def __init__(self, creds, max_concurrent=DEFAULT_MAX_CONCURRENT):
+        self.creds = creds
+        self.max_concurrent = max_concurrent
+        self.worker_id = f"local-{os.getpid()}-{id(self)}"
+        self.running = set()
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self._loop, name="dispatcher", daemon=True)
+
+    def start(self):
+        expire_unleased_claims("local-")
+        self.thread.start()
+        logging.info(f"Run dispatcher started (max {self.max_concurrent} concurrent runs).")
+
+    def _loop(self):
+        renewed_at = 0
+        while True:
+            try:
+                reassign_expired_runs()
+                if time.time() - renewed_at >= LOCAL_LEASE_SECONDS / 3:
+                    with self.lock:
+                        running = list(self.running)
+                    for queue_id in running:
+                        renew_run_lease(queue_id, self.worker_id, LOCAL_LEASE_SECONDS)
+                    renewed_at = time.time()
+                while len(self.running) < self.max_concurrent:
+                    entry = claim_next_run(self.worker_id)
+                    if not entry:
+                        break
+                    renew_run_lease(entry["id"], self.worker_id, LOCAL_LEASE_SECONDS)
+                    with self.lock:
+                        self.running.add(entry["id"])
+                    threading.Thread(target=self._execute, args=(entry,), daemon=True).start()
+            except Exception as e:
+                logging.error(f"❌ Dispatcher error: {str(e)}")
+            time.sleep(POLL_SECONDS)
+
+    def _execute(self, entry):
+        # Imported here to avoid a circular import with dlt_pipeline
+        from src.pipelines.dlt_pipeline import run_pipeline_with_creds
+        status = "failed"
+        try:
+            result = run_pipeline_with_creds(
+                entry["pipeline_name"], entry["dataset_name"], entry["target_table"],
+                self.creds, resume_from=entry["resume_from"], queue_id=entry["id"]
+            )
+            if isinstance(result, CoalescedRun):
+                # Another run held the lock; the work continues in the newly queued entry
+                status = COALESCED
+            else:
+                status = "completed" if result is not None else "failed"
+        except Exception as e:
+            logging.error(f"❌ Queued run {entry['id']} of `{entry['pipeline_name']}` failed: {str(e)}")
+        finally:
+            # run_pipeline attached its run id to the entry when it started
+            finish_run(entry["id"], status)
+            with self.lock:
+                self.running.discard(entry["id"])
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def ensure_dispatcher(creds, max_concurrent=DEFAULT_MAX_CONCURRENT):
+    """Start the in-process dispatcher on first use; later calls refresh its credentials."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = Dispatcher(creds, max_concurrent)
+            _dispatcher.start()
+        else:
+            _dispatcher.creds = creds
+    return _dispatcher
@@ -0,0 +1,110 @@
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from src.db.remote_connection import QUEUE_URL_ENV, call_service, decode_value
+from src.pipelines.cancellation import cancel_run
+from src.pipelines.locks import new_holder_id
+
+HEARTBEAT_SECONDS = 30  # well inside the service's worker lease
+POLL_SECONDS = 5
+DEFAULT_CONCURRENCY = 2
+CONFIG_DIR = os.path.join(os.path.dirname(__file__), "../../config")
+
+
+def store_config(pipeline_name, config):
+    """Write the config served with a claim where the pipeline sources load it from."""
+    if not config:
+        return
+    os.makedirs(CONFIG_DIR, exist_ok=True)
+    config_path = os.path.join(CONFIG_DIR, f"{pipeline_name.replace(' ', '_').lower()}_config.json")
+    with open(config_path, "w") as f:
+        json.dump(config, f, indent=4)
+
+
+def execute_claimed_run(entry, worker_id, creds):
+    """
+    Run a claimed queue entry while a heartbeat thread keeps its lease. If the service
+    reassigned the run in the meantime, the local run is cancelled at its next chunk.
+    """
+    # Imported here so the worker can start polling before dlt is loaded
+    from src.pipelines.dlt_pipeline import run_pipeline, set_env_vars
+
+    pipeline_name = entry["pipeline_name"]
+    claim = {"worker_id": worker_id, "queue_id": entry["id"], "pipeline_name": pipeline_name}
+    stop = threading.Event()
+
+    def heartbeat():
+        while not stop.wait(HEARTBEAT_SECONDS):
+            try:
+                lease = call_service("/heartbeat", claim)
+            except Exception as e:
+                logging.warning(f"Heartbeat for `{pipeline_name}` failed: {str(e)}")
+                continue
+            if not lease["held"]:
+                logging.error(f"❌ Lease on queued run {entry['id']} of `{pipeline_name}` was lost; cancelling.")
+                if lease["run_id"]:
+                    cancel_run(lease["run_id"])
+                return
+
+    threading.Thread(target=heartbeat, name=f"heartbeat-{pipeline_name}", daemon=True).start()
+    status = "failed"
+    try:
+        set_env_vars(creds, pipeline_name)
+        result = run_pipeline(
+            pipeline_name, entry["dataset_name"], entry["target_table"],
+            resume_from=entry["resume_from"], queue_id=entry["id"]
+        )
+        status = "completed" if result is not None else "failed"
+    except Exception as e:
+        logging.error(f"❌ Queued run {entry['id']} of `{pipeline_name}` failed: {str(e)}")
+    finally:
+        stop.set()
+        call_service("/complete", dict(claim, status=status))
+        logging.info(f"Queued run {entry['id']} of `{pipeline_name}` {status}.")
+
+
+def run_worker(queue_url, creds, concurrency=DEFAULT_CONCURRENCY):
+    """
+    Pull runs from the queue service and execute them, up to `concurrency` at a time. All
+    run state goes through the service, so any number of workers can share one queue.
+    """
+    os.environ[QUEUE_URL_ENV] = queue_url
+    worker_id = new_holder_id()
+    running = []
+    logging.info(f"Worker {worker_id} polling {queue_url} ({concurrency} slots).")
+    while True:
+        running = [t for t in running if t.is_alive()]
+        claimed = False
+        if len(running) < concurrency:
+            try:
+                claimed_run = call_service("/claim", {"worker_id": worker_id})
+            except Exception as e:
+                logging.warning(f"Could not reach the queue service: {str(e)}")
+                claimed_run = {}
+            entry = claimed_run.get("entry")
+            if entry:
+                entry = {key: decode_value(value) for key, value in entry.items()}
+                store_config(entry["pipeline_name"], claimed_run.get("config"))
+                thread = threading.Thread(
+                    target=execute_claimed_run, args=(entry, worker_id, creds),
+                    name=f"run-{entry['id']}", daemon=True
+                )
+                thread.start()
+                running.append(thread)
+                claimed = True
+        if not claimed:
+            time.sleep(POLL_SECONDS)
+
+
+if __name__ == "__main__":
+    # Snowflake credentials are read from the SNOWFLAKE_* environment variables
+    parser = argparse.ArgumentParser(description="Run queued pipelines pulled from a run queue service.")
+    parser.add_argument("--queue-url", default=os.environ.get(QUEUE_URL_ENV, "http://127.0.0.1:8765"))
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    from src.pipelines.dlt_pipeline import load_creds_from_env
+    run_worker(args.queue_url, load_creds_from_env(), args.concurrency)
@@ -0,0 +1,121 @@
+import json
+import logging
+import time
+from datetime import datetime
+from itertools import islice
+from src.db.duckdb_connection import execute_query
+from src.sources.engine_registry import source_key
+
+DEFAULT_TARGET_CHUNK_MB = 64      # serialized bytes we aim to hold per chunk
+DEFAULT_MIN_CHUNK_SIZE = 1000
+DEFAULT_MAX_CHUNK_SIZE = 500000
+DEFAULT_MAX_CHUNK_SECONDS = 30    # shrink chunks whose fetch takes longer than this
+SAMPLE_ROWS = 200                 # rows serialized per chunk to estimate its size
+MAX_GROWTH = 2                    # largest factor a chunk may grow or shrink by per step
+
+
+def _table_key(engine, schema_name, table_name):
+    return source_key(engine) + (schema_name or "", table_name)
+
+
+def load_learned_chunk_size(engine, schema_name, table_name):
+    """Return the chunk size learned for a table on a previous run, if any."""
+    try:
+        result = execute_query(
+            """
+            SELECT chunk_size FROM learned_chunk_sizes
+            WHERE hostname = ? AND database_name = ? AND schema_name = ? AND table_name = ?
+            """,
+            params=_table_key(engine, schema_name, table_name),
+            fetch=True
+        )
+        return result[0][0] if result else None
+    except Exception as e:
+        logging.warning(f"Could not load learned chunk size for `{table_name}`: {str(e)}")
+        return None
+
+
+def estimate_row_bytes(chunk):
+    """Estimate the serialized size of a row from an evenly spaced sample of the chunk."""
+    step = max(1, len(chunk) // SAMPLE_ROWS)
+    sample = chunk[::step][:SAMPLE_ROWS]
+    total = sum(len(json.dumps(row, default=str)) for row in sample)
+    return max(1.0, total / len(sample))
+
+
+class AdaptiveChunker:
+    """
+    Groups rows into chunks whose size follows a byte budget instead of a fixed row count.
+    After each chunk the serialized row size and fetch latency are measured and the next
+    chunk grows or shrinks (at most 2x per step) within the configured bounds.
+    """
+
+    def __init__(self, engine, db_config, schema_name, table_name, chunk_size):
+        self.engine = engine
+        self.schema_name = schema_name
+        self.table_name = table_name
+        self.target_bytes = db_config.get("target_chunk_mb", DEFAULT_TARGET_CHUNK_MB) * 1024 * 1024
+        self.min_size = db_config.get("min_chunk_size", DEFAULT_MIN_CHUNK_SIZE)
+        self.max_size = db_config.get("max_chunk_size", DEFAULT_MAX_CHUNK_SIZE)
+        self.max_seconds = db_config.get("max_chunk_seconds", DEFAULT_MAX_CHUNK_SECONDS)
+        learned = load_learned_chunk_size(engine, schema_name, table_name)
+        self.chunk_size = self._clamp(learned or chunk_size)
+        self.bytes_per_row = None
+        self.rows = 0
+        self.fetch_seconds = 0.0
+        if learned:
+            logging.info(f"Starting `{table_name}` from learned chunk size {self.chunk_size}.")
+
+    def _clamp(self, size):
+        return int(max(self.min_size, min(self.max_size, size)))
+
+    def next_size(self, chunk, fetch_seconds):
+        """Pick the next chunk size from the last chunk's measured size and latency."""
+        self.bytes_per_row = estimate_row_bytes(chunk)
+        target = self.target_bytes / self.bytes_per_row
+        if fetch_seconds > self.max_seconds:
+            # Slow fetches delay progress updates and cancellation; trade size for latency
+            target = min(target, len(chunk) * self.max_seconds / fetch_seconds)
+        current = self.chunk_size
+        target = max(current / MAX_GROWTH, min(current * MAX_GROWTH, target))
+        return self._clamp(target)
+
+    def chunks(self, gen):
+        """Yield lists of rows from `gen`, resizing after every chunk."""
+        gen = iter(gen)
+        while True:
+            start = time.time()
+            chunk = list(islice(gen, self.chunk_size))
+            if not chunk:
+                break
+            fetch_seconds = time.time() - start
+            self.rows += len(chunk)
+            self.fetch_seconds += fetch_seconds
+            new_size = self.next_size(chunk, fetch_seconds)
+            if new_size != self.chunk_size:
+                logging.info(
+                    f"Resizing `{self.table_name}` chunks {self.chunk_size} -> {new_size} "
+                    f"(~{self.bytes_per_row:.0f} bytes/row, fetch {fetch_seconds:.2f}s)"
+                )
+            yield chunk
+            self.chunk_size = new_size
+
+    def save(self):
+        """Record the learned chunk size so the next run starts from it."""
+        if not self.rows:
+            return
+        rows_per_second = self.rows / self.fetch_seconds if self.fetch_seconds > 0 else None
+        try:
+            execute_query(
+                """
+                INSERT OR REPLACE INTO learned_chunk_sizes (
+                    hostname, database_name, schema_name, table_name,
+                    chunk_size, bytes_per_row, rows_per_second, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                params=_table_key(self.engine, self.schema_name, self.table_name) + (
+                    self.chunk_size, self.bytes_per_row, rows_per_second, datetime.now()
+                )
+            )
+        except Exception as e:
+            logging.warning(f"Could not save learned chunk size for `{self.table_name}`: {str(e)}")
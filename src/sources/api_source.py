@@ -5,6 +5,8 @@ from datetime import datetime
 import pendulum
 import dlt
 from itertools import islice
+from src.sources.prefetch import prefetch_generator
+from src.pipelines.cancellation import check_cancelled
 from dlt.sources.helpers.rest_client import RESTClient
 from dlt.sources.helpers.rest_client.auth import BearerTokenAuth
 from dlt.sources.helpers.rest_client.paginators import PageNumberPaginator, OffsetPaginator, JSONResponseCursorPaginator
@@ -37,7 +39,8 @@ def load_api_config(pipeline_name):
             return json.load(f)
     return {}
 
-def fetch_data_from_api(api_url, pipeline_name):
+def iter_api_records(api_url, pipeline_name, run_id=None):
+    """Yield records page by page as the API returns them."""
     api_config = load_api_config(pipeline_name)
     
     # Get pagination settings from config
@@ -78,23 +81,25 @@ def fetch_data_from_api(api_url, pipeline_name):
         data_selector=api_config.get("data_selector")
     )
 
-    all_data = []
     try:
         # Use the client's paginate method to handle pagination
         for page in client.paginate(""):  # Empty string since we already have full URL
-            all_data.extend(page)
+            # Stop paging once the run has been cancelled
+            check_cancelled(run_id)
+            # Add extraction timestamp
+            extracted_at = datetime.utcnow().isoformat()
+            for item in page:
+                item["extracted_at"] = extracted_at
+                yield item
     except Exception as e:
         logging.error(f"Error fetching data: {str(e)}")
         raise
 
-    # Add extraction timestamp
-    for item in all_data:
-        item["extracted_at"] = datetime.utcnow().isoformat()
-    
-    return all_data
+def fetch_data_from_api(api_url, pipeline_name, run_id=None):
+    return list(iter_api_records(api_url, pipeline_name, run_id))
 
 # For API, we'll simply yield chunks in the resource functions.
-def get_api_resource(pipeline_name, table_name, api_url):
+def get_api_resource(pipeline_name, table_name, api_url, run_id=None):
     api_config = load_api_config(pipeline_name)
     incremental_config = api_config.get("incremental", {})
     
@@ -106,9 +111,13 @@ def get_api_resource(pipeline_name, table_name, api_url):
         retry_count=3  # Add retry for resilience
     )
     def resource():
-        yield from paginate_generator(
-            fetch_data_from_api(api_url, pipeline_name),
-            chunk_size=api_config.get("pagination", {}).get("page_size", 50000)
+        # Optionally fetch the next pages on a background thread while dlt extracts (0 = off)
+        yield from prefetch_generator(
+            paginate_generator(
+                iter_api_records(api_url, pipeline_name, run_id),
+                chunk_size=api_config.get("pagination", {}).get("page_size", 50000)
+            ),
+            api_config.get("prefetch_chunks", 0)
         )
 
     if api_config.get("incremental_load", {}).get("enabled"):
@@ -0,0 +1,160 @@
+import logging
+import threading
+from datetime import datetime
+import dlt
+from sqlalchemy import text
+from src.db.duckdb_connection import execute_query
+from src.sources.engine_registry import source_key
+from src.pipelines.cancellation import check_cancelled
+
+# Marks rows deleted at the source; dlt removes them from the destination on merge
+DELETED_COLUMN = "_ct_deleted"
+
+# Sync versions read during a run, committed only once its load succeeds
+_pending_versions = {}
+_pending_lock = threading.Lock()
+
+
+def _table_key(engine, schema_name, table_name):
+    return source_key(engine) + (schema_name or "", table_name)
+
+
+def get_sync_version(engine, schema_name, table_name):
+    """Return the last change tracking version loaded for a table, or None."""
+    result = execute_query(
+        """
+        SELECT sync_version FROM change_tracking_versions
+        WHERE hostname = ? AND database_name = ? AND schema_name = ? AND table_name = ?
+        """,
+        params=_table_key(engine, schema_name, table_name),
+        fetch=True
+    )
+    return result[0][0] if result else None
+
+
+def stage_sync_version(run_id, engine, schema_name, table_name, version):
+    """Remember the version a run extracted up to; see `commit_sync_versions`."""
+    with _pending_lock:
+        _pending_versions.setdefault(run_id, {})[_table_key(engine, schema_name, table_name)] = version
+
+
+def commit_sync_versions(run_id):
+    """Persist the staged versions of a run after its load has succeeded."""
+    with _pending_lock:
+        staged = _pending_versions.pop(run_id, {})
+    for key, version in staged.items():
+        execute_query(
+            """
+            INSERT OR REPLACE INTO change_tracking_versions (
+                hostname, database_name, schema_name, table_name, sync_version, updated_at
+            ) VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            params=key + (version, datetime.now())
+        )
+        logging.info(f"Change tracking version for `{key[3]}` advanced to {version}.")
+
+
+def discard_sync_versions(run_id):
+    """Drop the staged versions of a failed run so its changes are read again next time."""
+    with _pending_lock:
+        _pending_versions.pop(run_id, None)
+
+
+def _qualified(schema_name, table_name):
+    return f"[{schema_name}].[{table_name}]" if schema_name else f"[{table_name}]"
+
+
+def resolve_sync_version(engine, schema_name, table_name):
+    """
+    Return the stored version to read changes from, or None when the table needs a full
+    snapshot: on its first run, or when the stored version fell behind the retention window.
+    """
+    qualified = _qualified(schema_name, table_name)
+    last_version = get_sync_version(engine, schema_name, table_name)
+    if last_version is None:
+        return None
+    with engine.connect() as conn:
+        min_valid = conn.execute(
+            text("SELECT CHANGE_TRACKING_MIN_VALID_VERSION(OBJECT_ID(:name))"),
+            {"name": qualified}
+        ).scalar()
+    if min_valid is None:
+        raise ValueError(f"Change tracking is not enabled on table {qualified}")
+    if last_version < min_valid:
+        logging.warning(
+            f"Stored version {last_version} for {qualified} is older than the retention "
+            f"window ({min_valid}); taking a full snapshot."
+        )
+        return None
+    return last_version
+
+
+def read_changes(engine, schema_name, table_name, primary_keys, last_version, chunk_size, run_id):
+    """
+    Yield chunks of upserts and deletes for one table from SQL Server Change Tracking since
+    `last_version`, or a full snapshot when it is None. The current version is read before
+    any data so changes committed during extraction are picked up again by the next run.
+    """
+    qualified = _qualified(schema_name, table_name)
+
+    with engine.connect() as conn:
+        current_version = conn.execute(text("SELECT CHANGE_TRACKING_CURRENT_VERSION()")).scalar()
+        if current_version is None:
+            raise ValueError(f"Change tracking is not enabled on the database for {qualified}")
+
+        if last_version is None:
+            logging.info(f"No change tracking version for {qualified}; loading full snapshot.")
+            query = text(f"SELECT * FROM {qualified}")
+            params = {}
+        else:
+            logging.info(f"Reading changes for {qualified} since version {last_version}.")
+            pk_select = ", ".join(f"ct.[{pk}] AS [_ct_pk_{i}]" for i, pk in enumerate(primary_keys))
+            pk_join = " AND ".join(f"t.[{pk}] = ct.[{pk}]" for pk in primary_keys)
+            query = text(f"""
+                SELECT ct.SYS_CHANGE_OPERATION AS _ct_operation, {pk_select}, t.*
+                FROM CHANGETABLE(CHANGES {qualified}, :last_version) AS ct
+                LEFT JOIN {qualified} AS t ON {pk_join}
+            """)
+            params = {"last_version": last_version}
+
+        result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(query, params)
+        upserts = deletes = 0
+        for partition in result.partitions(chunk_size):
+            check_cancelled(run_id)
+            chunk = []
+            for row in partition:
+                record = dict(row._mapping)
+                operation = record.pop("_ct_operation", None)
+                keys = [record.pop(f"_ct_pk_{i}", None) for i in range(len(primary_keys))]
+                if operation == "D":
+                    chunk.append({**dict(zip(primary_keys, keys)), DELETED_COLUMN: True})
+                    deletes += 1
+                else:
+                    record[DELETED_COLUMN] = False
+                    chunk.append(record)
+                    upserts += 1
+            yield chunk
+
+    logging.info(f"Change tracking for {qualified}: {upserts} upserts, {deletes} deletes.")
+    stage_sync_version(run_id, engine, schema_name, table_name, current_version)
+
+
+def change_tracking_resource(engine, schema_name, table_name, primary_keys, chunk_size, run_id):
+    """
+    Build a merge resource that applies Change Tracking upserts and deletes. Snapshot runs
+    replace the table instead, so rows deleted while no valid version was stored disappear.
+    """
+    last_version = resolve_sync_version(engine, schema_name, table_name)
+
+    @dlt.resource(
+        name=table_name,
+        write_disposition="merge" if last_version is not None else "replace",
+        primary_key=primary_keys,
+        columns={DELETED_COLUMN: {"data_type": "bool", "hard_delete": True}}
+    )
+    def changes():
+        yield from read_changes(
+            engine, schema_name, table_name, primary_keys, last_version, chunk_size, run_id
+        )
+
+    return changes
@@ -1,23 +1,45 @@
 import logging
 import json
 import os
-from sqlalchemy import create_engine, text
+from sqlalchemy import inspect, text
 import dlt
 import pendulum
 from dlt.sources.sql_database import sql_table, sql_database
 from itertools import islice
 import time
+from typing import Any, Optional
+from src.sources.engine_registry import get_engine, pool_settings_from_config
+from src.sources.reflection_cache import get_cached_metadata
+from src.sources.prefetch import prefetch_generator
+from src.sources.adaptive_chunking import AdaptiveChunker, load_learned_chunk_size
+from src.sources.change_tracking import change_tracking_resource
+from src.sources.diff_load import diff_load_resource
+from src.pipelines.cancellation import check_cancelled
+from src.pipelines.progress import publish as publish_progress
 
 CONFIG_DIR = os.path.join(os.path.dirname(__file__), "../../config")
 
 def paginate_generator(gen, chunk_size=50000):
     """Yield chunks (lists) of rows from the generator."""
+    # A dlt resource restarts from its first row on every iter(), so take one iterator
+    gen = iter(gen)
     while True:
         chunk = list(islice(gen, chunk_size))
         if not chunk:
             break
         yield chunk
 
+def chunk_rows(gen, engine, db_config, schema_name, table_name, chunk_size):
+    """Group rows into chunks, sized adaptively per table when `adaptive_chunking` is on."""
+    if not db_config.get("adaptive_chunking"):
+        yield from paginate_generator(gen, chunk_size)
+        return
+    chunker = AdaptiveChunker(engine, db_config, schema_name, table_name, chunk_size)
+    try:
+        yield from chunker.chunks(gen)
+    finally:
+        chunker.save()
+
 def load_db_config(pipeline_name):
     config_path = os.path.join(
         CONFIG_DIR, f"{pipeline_name.replace(' ', '_').lower()}_config.json"
@@ -27,11 +49,247 @@ def load_db_config(pipeline_name):
             return json.load(f)
     return {}
 
-def fetch_data_from_database(pipeline_name, run_id=None):
+def build_connection_string(db_config):
+    """Build the SQLAlchemy connection string for a db config."""
+    conn_str = db_config.get("credentials")
+    if conn_str:
+        logging.info(f"Using provided connection string: {conn_str}")
+        return conn_str
+
+    db_type = db_config.get("db_type", "").lower()
+    user = db_config.get("user", "loader")
+    password = db_config.get("password", "loader")
+    host = db_config.get("host", "localhost")
+    port = db_config.get("port", 1433 if db_type in ["mssql", "microsoft_sqlserver", "sql_server"] else 1521)
+    database = db_config.get("database", "dlt_data")
+    if db_type in ["mssql", "microsoft_sqlserver", "sql_server"]:
+        driver = db_config.get("driver", "ODBC+Driver+17+for+SQL+Server")
+        conn_str = (
+            f"mssql+pyodbc://{user}:{password}@{host}:{port}/{database}"
+            f"?TrustServerCertificate=yes&driver={driver}"
+        )
+        if db_config.get("packet_size"):
+            # Larger TDS packets mean fewer network round-trips on wide, long reads
+            conn_str += f"&PacketSize={int(db_config['packet_size'])}"
+        logging.info(f"Built SQL Server connection string: {conn_str}")
+    elif db_type == "oracle":
+        service_name = db_config.get("service_name", "orcl")
+        conn_str = f"oracle+oracledb://{user}:{password}@{host}:{port}/?service_name={service_name}"
+        logging.info(f"Built Oracle connection string: {conn_str}")
+    else:
+        conn_str = f"postgresql://{user}:{password}@{host}:{port}/{database}"
+        logging.info(f"Built PostgreSQL connection string: {conn_str}")
+    return conn_str
+
+DEFAULT_FETCH_SIZE = 10000  # rows per driver round-trip when streaming
+
+def make_streaming_adapter(db_config, chunk_size):
+    """
+    Build an engine adapter that streams results through a server-side cursor instead of
+    buffering them client-side, with driver fetch sizes taken from the db config.
+    """
+    if not db_config.get("stream_results", True):
+        return None
+    fetch_size = int(db_config.get("fetch_size") or min(chunk_size, DEFAULT_FETCH_SIZE))
+    prefetch_rows = int(db_config.get("prefetch_rows") or fetch_size)
+
+    def streaming_adapter(engine):
+        logging.info(f"Streaming results: yield_per={chunk_size}, fetch_size={fetch_size}, prefetch_rows={prefetch_rows}")
+        return engine.execution_options(
+            stream_results=True,
+            yield_per=chunk_size,
+            max_row_buffer=chunk_size,
+            fetch_size=fetch_size,
+            prefetch_rows=prefetch_rows
+        )
+
+    return streaming_adapter
+
+def get_table_metadata(engine, db_config, schema_name, table_names=None):
+    """Return cached table reflection, or None to let dlt reflect the tables itself."""
+    if not db_config.get("reflection_cache", True):
+        return None
+    try:
+        return get_cached_metadata(engine, db_config, schema_name, table_names)
+    except Exception as e:
+        logging.warning(f"Reflection cache unavailable, falling back to live reflection: {str(e)}")
+        return None
+
+def parse_column_list(columns):
+    """Accept a list or a comma-separated string of column names."""
+    if not columns:
+        return []
+    if isinstance(columns, str):
+        columns = columns.split(",")
+    return [c.strip() for c in columns if c and c.strip()]
+
+def get_primary_keys(db_config, table_name):
+    """A table's own primary key in multi-table configs, else the config-wide one."""
+    per_table = {name.lower(): pk for name, pk in (db_config.get("table_primary_keys") or {}).items()}
+    return parse_column_list(per_table.get((table_name or "").lower()) or db_config.get("primary_key"))
+
+def get_table_filters(db_config):
+    """
+    Collect per-table column projection and row filters, keyed by lower-cased table name.
+    Single-table configs use top-level `columns`/`where`; multi-table configs use
+    `table_filters: {table: {"columns": [...], "where": "..."}}`.
+    """
+    filters = {
+        name.lower(): spec
+        for name, spec in (db_config.get("table_filters") or {}).items()
+        if spec
+    }
+    if db_config.get("table") and (db_config.get("columns") or db_config.get("where")):
+        filters[db_config["table"].lower()] = {
+            "columns": db_config.get("columns"),
+            "where": db_config.get("where")
+        }
+    return filters
+
+def get_included_columns(engine, db_config, schema_name, table_name, metadata=None):
+    """
+    Columns to load from a table for dlt's `included_columns`, or None to load them all.
+    Key and cursor columns are always kept or merges and incremental loads break. dlt
+    matches names exactly, so they are resolved case-insensitively against the table.
+    """
+    spec = get_table_filters(db_config).get(table_name.lower()) or {}
+    columns = parse_column_list(spec.get("columns"))
+    if not columns:
+        return None
+    wanted = {c.lower() for c in columns + get_primary_keys(db_config, table_name)}
+    if db_config.get("delta_column"):
+        wanted.add(db_config["delta_column"].lower())
+    table = None
+    if metadata is not None:
+        table = next((t for t in metadata.tables.values() if t.name.lower() == table_name.lower()), None)
+    if table is not None:
+        names = [c.name for c in table.columns]
+    else:
+        names = [c["name"] for c in inspect(engine).get_columns(table_name, schema=schema_name)]
+    included = [name for name in names if name.lower() in wanted]
+    logging.info(f"Projecting `{table_name}` to columns: {included}")
+    return included
+
+def make_filter_adapter(db_config):
+    """
+    Build a dlt query adapter callback that pushes the configured row filters down to
+    the source as SQL, so unneeded rows never leave it.
+    """
+    filters = get_table_filters(db_config)
+
+    def query_adapter(query, table, incremental=None, engine=None):
+        spec = filters.get(table.name.lower()) or {}
+        if spec.get("where"):
+            logging.info(f"Filtering `{table.name}` with: {spec['where']}")
+            return query.where(text(spec["where"]))
+        return query
+
+    return query_adapter
+
+def get_checkpoint_column(db_config):
+    """
+    Return the column whose last loaded value marks a resume point, or None when the run
+    is not checkpointed. Incremental loads resume on their delta column, others on a
+    single-column primary key unless `checkpoint_column` names one explicitly.
+    """
+    if not db_config.get("checkpoint_chunks") or db_config.get("mode", "sql_table") != "sql_table":
+        return None
+    incremental_type = db_config.get("incremental_type", "FULL").upper()
+    if incremental_type in ("CDC", "DIFF"):
+        return None
+    if incremental_type == "INCREMENTAL" and db_config.get("delta_column"):
+        return db_config["delta_column"]
+    if db_config.get("checkpoint_column"):
+        return db_config["checkpoint_column"]
+    primary_keys = parse_column_list(db_config.get("primary_key"))
+    return primary_keys[0] if len(primary_keys) == 1 else None
+
+def make_checkpoint_adapter(query_adapter, db_config, column):
+    """
+    Wrap a query adapter so rows come back ordered by the checkpoint column, starting
+    after `resume_value` when a failed run is resumed.
+    """
+    resume_value = db_config.get("resume_value")
+    # Delta values are not unique, so incremental loads re-read the boundary and merge it
+    inclusive = db_config.get("incremental_type", "FULL").upper() == "INCREMENTAL"
+
+    def checkpoint_adapter(query, table, incremental=None, engine=None):
+        query = query_adapter(query, table, incremental, engine)
+        by_name = {c.name.lower(): c for c in table.columns}
+        checkpoint = by_name[column.lower()]
+        query = query.order_by(checkpoint)
+        if resume_value is not None:
+            logging.info(f"Resuming `{table.name}` from {column} {'>=' if inclusive else '>'} {resume_value}")
+            query = query.where(checkpoint >= resume_value if inclusive else checkpoint > resume_value)
+        return query
+
+    return checkpoint_adapter
+
+def make_delta_adapter(query_adapter, column, start_value):
+    """
+    Wrap a query adapter so only rows whose delta column is at or after `start_value` are
+    read, for resources whose incremental cursor is kept by a wrapping resource.
+    """
+    def delta_adapter(query, table, incremental=None, engine=None):
+        query = query_adapter(query, table, incremental, engine)
+        if start_value is None:
+            return query
+        by_name = {c.name.lower(): c for c in table.columns}
+        return query.where(by_name[column.lower()] >= start_value)
+
+    return delta_adapter
+
+def fetch_change_tracking(engine, db_config, mode, schema_name, chunk_size, run_id):
+    """Build Change Tracking (CDC) merge resources for SQL Server tables."""
+    if engine.dialect.name != "mssql":
+        logging.error("❌ CDC load type is only supported for SQL Server sources!")
+        return None
+    table_names = [db_config.get("table")] if mode == "sql_table" else db_config.get("tables")
+    if not table_names or not all(table_names):
+        logging.error("❌ CDC load type requires explicit table names!")
+        return None
+    missing_keys = [t for t in table_names if not get_primary_keys(db_config, t)]
+    if missing_keys:
+        logging.error(f"❌ CDC load type requires a primary key for tables: {missing_keys}")
+        return None
+
+    resources = [
+        change_tracking_resource(
+            engine, schema_name, table_name, get_primary_keys(db_config, table_name), chunk_size, run_id
+        )
+        for table_name in table_names
+    ]
+    logging.info(f"Configured change tracking for tables: {table_names}")
+    return resources[0] if len(resources) == 1 else resources
+
+def fetch_diff_load(engine, db_config, mode, schema_name, chunk_size, run_id):
+    """Build hash-based diff-load (DIFF) merge resources for tables without a delta column."""
+    table_names = [db_config.get("table")] if mode == "sql_table" else db_config.get("tables")
+    if not table_names or not all(table_names):
+        logging.error("❌ DIFF load type requires explicit table names!")
+        return None
+    missing_keys = [t for t in table_names if not get_primary_keys(db_config, t)]
+    if missing_keys:
+        logging.error(f"❌ DIFF load type requires a primary key for tables: {missing_keys}")
+        return None
+
+    filters = get_table_filters(db_config)
+    resources = []
+    for table_name in table_names:
+        spec = filters.get(table_name.lower()) or {}
+        resources.append(diff_load_resource(
+            engine, db_config, schema_name, table_name, get_primary_keys(db_config, table_name),
+            parse_column_list(spec.get("columns")), spec.get("where"), chunk_size, run_id
+        ))
+    logging.info(f"Configured diff load for tables: {table_names}")
+    return resources[0] if len(resources) == 1 else resources
+
+def fetch_data_from_database(pipeline_name, run_id=None, db_config=None):
     """
     Returns a DLT source/resource for SQL database access with progress tracking.
+    Metadata-driven pipelines pass their resolved `db_config`; otherwise it is loaded from file.
     """
-    db_config = load_db_config(pipeline_name)
+    db_config = db_config or load_db_config(pipeline_name)
     if not db_config:
         logging.error(f"❌ No database config found for `{pipeline_name}`!")
         return None
@@ -39,35 +297,12 @@ def fetch_data_from_database(pipeline_name, run_id=None):
     # Get performance settings from config
     use_parallel = db_config.get("use_parallel", True)
     chunk_size = db_config.get("chunk_size", 50000)
+    # Chunks read ahead on a background thread while dlt extracts the current one (0 = off)
+    prefetch_chunks = db_config.get("prefetch_chunks", 0)
 
-    # Build connection string.
-    conn_str = db_config.get("credentials")
-    if not conn_str:
-        db_type = db_config.get("db_type", "").lower()
-        user = db_config.get("user", "loader")
-        password = db_config.get("password", "loader")
-        host = db_config.get("host", "localhost")
-        port = db_config.get("port", 1433 if db_type in ["mssql", "microsoft_sqlserver"] else 1521)
-        database = db_config.get("database", "dlt_data")
-        if db_type in ["mssql", "microsoft_sqlserver"]:
-            driver = db_config.get("driver", "ODBC+Driver+17+for+SQL+Server")
-            conn_str = (
-                f"mssql+pyodbc://{user}:{password}@{host}:{port}/{database}"
-                f"?TrustServerCertificate=yes&driver={driver}"
-            )
-            logging.info(f"Built SQL Server connection string: {conn_str}")
-        elif db_type == "oracle":
-            service_name = db_config.get("service_name", "orcl")
-            conn_str = f"oracle+oracledb://{user}:{password}@{host}:{port}/?service_name={service_name}"
-            logging.info(f"Built Oracle connection string: {conn_str}")
-        else:
-            conn_str = f"postgresql://{user}:{password}@{host}:{port}/{database}"
-            logging.info(f"Built PostgreSQL connection string: {conn_str}")
-    else:
-        logging.info(f"Using provided connection string: {conn_str}")
-
-    engine = create_engine(conn_str)
-    logging.info("SQLAlchemy engine created.")
+    # Engines are pooled per connection string and shared across runs and pipelines.
+    conn_str = build_connection_string(db_config)
+    engine = get_engine(conn_str, **pool_settings_from_config(db_config))
 
     # Incremental settings.
     incremental_type = db_config.get("incremental_type", "FULL").upper()
@@ -77,6 +312,12 @@ def fetch_data_from_database(pipeline_name, run_id=None):
 
     mode = db_config.get("mode", "sql_table")
     schema_name = db_config.get("schema")
+    query_adapter = make_filter_adapter(db_config)
+
+    if incremental_type == "CDC":
+        return fetch_change_tracking(engine, db_config, mode, schema_name, chunk_size, run_id)
+    if incremental_type == "DIFF":
+        return fetch_diff_load(engine, db_config, mode, schema_name, chunk_size, run_id)
 
     if mode == "sql_table":
         table_name = db_config.get("table")
@@ -84,11 +325,23 @@ def fetch_data_from_database(pipeline_name, run_id=None):
             logging.error("❌ No table name specified in config for single table mode!")
             return None
 
+        # Checkpointed runs read in key order so the last loaded row is a resume point
+        checkpoint_column = get_checkpoint_column(db_config)
+        if checkpoint_column:
+            query_adapter = make_checkpoint_adapter(query_adapter, db_config, checkpoint_column)
+
+        # Start from the chunk size learned on previous runs so the cursor fetches match it
+        if db_config.get("adaptive_chunking"):
+            chunk_size = load_learned_chunk_size(engine, schema_name, table_name) or chunk_size
+        streaming_adapter = make_streaming_adapter(db_config, chunk_size)
+
         # Count total rows to calculate chunks
         if run_id:
             try:
                 # Create a fresh connection to count rows
                 count_query_str = f"SELECT COUNT(*) FROM {schema_name}.{table_name}" if schema_name else f"SELECT COUNT(*) FROM {table_name}"
+                if db_config.get("where"):
+                    count_query_str += f" WHERE {db_config['where']}"
                 count_query = text(count_query_str)
         
                 with engine.connect() as conn:
@@ -110,18 +363,25 @@ def fetch_data_from_database(pipeline_name, run_id=None):
                 WHERE id = {run_id}
                 """
                 execute_query(update_query)
+                publish_progress(run_id, total_rows=row_count, total_chunks=total_chunks)
                 
                 logging.info(f"Total rows: {row_count}, Total chunks: {total_chunks}")
             except Exception as e:
                 logging.error(f"Error counting rows: {str(e)}")
 
         logging.info(f"Configuring sql_table for {schema_name}.{table_name}" if schema_name else f"Configuring sql_table for {table_name}")
+        metadata = get_table_metadata(engine, db_config, schema_name, [table_name])
         if incremental_type == "INCREMENTAL" and delta_column and delta_value and primary_key:
             initial_dt = pendulum.parse(delta_value)
             res = sql_table(
                 engine,
                 table=table_name,
                 schema=schema_name,
+                metadata=metadata,
+                chunk_size=chunk_size,
+                included_columns=get_included_columns(engine, db_config, schema_name, table_name, metadata),
+                query_adapter_callback=query_adapter,
+                engine_adapter_callback=streaming_adapter,
                 incremental=dlt.sources.incremental(delta_column, initial_value=initial_dt)
             ).apply_hints(
                 primary_key=primary_key,
@@ -130,32 +390,49 @@ def fetch_data_from_database(pipeline_name, run_id=None):
             if use_parallel:
                 res = res.parallelize()
         else: 
-            res = sql_table(engine, table=table_name, schema=schema_name)
+            res = sql_table(
+                engine,
+                table=table_name,
+                schema=schema_name,
+                metadata=metadata,
+                chunk_size=chunk_size,
+                included_columns=get_included_columns(engine, db_config, schema_name, table_name, metadata),
+                query_adapter_callback=query_adapter,
+                engine_adapter_callback=streaming_adapter
+            )
             if use_parallel:
                 res = res.parallelize()
         
         # Create a wrapper around paginate_generator to report progress
-        def progress_tracked_generator(resource, chunk_size, total_rows, run_id):
+        def progress_tracked_generator(resource, chunk_size, total_rows, run_id, prefetch_chunks=0):
             """Wrap a generator with progress tracking."""
             chunk_counter = 0
             row_counter = 0
             max_rows = total_rows * 1.1 if total_rows else float('inf')  # Add a 10% buffer
             
-            # Get the generator
-            gen = resource
+            # Get the chunk generator, optionally reading ahead of extraction
+            chunks = prefetch_generator(
+                chunk_rows(resource, engine, db_config, schema_name, table_name, chunk_size),
+                prefetch_chunks
+            )
             total_chunks = (total_rows + chunk_size - 1) // chunk_size if total_rows else None
+            # Adaptive chunking varies the size, so compare against the previous chunk
+            previous_chunk_size = chunk_size
             
             logging.info(f"Starting chunked processing. Expected: {total_rows} rows, {total_chunks} chunks. Max rows set to: {max_rows}")
             
             while True:
                 start_time = time.time()
                 
+                # Stop between chunks once the run has been cancelled
+                check_cancelled(run_id)
+                
                 # Safety check - stop processing if we've exceeded max rows
                 if row_counter >= max_rows:
                     logging.warning(f"Reached maximum row limit ({max_rows}). Stopping processing to prevent infinite loop.")
                     break
                     
-                chunk = list(islice(gen, chunk_size))
+                chunk = next(chunks, None)
                 if not chunk:
                     logging.info("No more data from generator. Stopping processing.")
                     break
@@ -173,10 +450,11 @@ def fetch_data_from_database(pipeline_name, run_id=None):
                              (f" ({progress:.1f}%)" if progress else ""))
                 
                 # Additional safety check - if we get a very small chunk and are already over expected count
-                if chunk_size_actual < chunk_size * 0.1 and row_counter > total_rows:
+                if chunk_size_actual < previous_chunk_size * 0.1 and row_counter > total_rows:
                     logging.warning(f"Received small chunk ({chunk_size_actual} rows) after processing expected data volume. Likely end of data.")
                     yield chunk
                     break
+                previous_chunk_size = chunk_size_actual
                     
                 # Update progress in database if run_id is provided
                 if run_id:
@@ -206,11 +484,18 @@ def fetch_data_from_database(pipeline_name, run_id=None):
                         WHERE id = {run_id}
                         """
                         execute_query(update_query)
+                        publish_progress(
+                            run_id, processed_chunks=chunk_counter, processed_rows=row_counter,
+                            total_rows=current_total_rows, total_chunks=current_total_chunks
+                        )
                     except Exception as e:
                         logging.error(f"Error updating progress: {str(e)}")
                 
                 yield chunk
             
+            # Stop any background prefetch still reading from the source
+            chunks.close()
+            
             # Final update and logging
             logging.info(f"Processing complete. Total: {row_counter} rows in {chunk_counter} chunks.")
             if run_id:
@@ -227,42 +512,124 @@ def fetch_data_from_database(pipeline_name, run_id=None):
                     WHERE id = {run_id}
                     """
                     execute_query(final_update_query)
+                    publish_progress(
+                        run_id, processed_chunks=chunk_counter, processed_rows=row_counter, total_rows=row_counter
+                    )
                 except Exception as e:
                     logging.error(f"Error updating final progress: {str(e)}")
         
         # Return the progress-tracked generator instead
-        return progress_tracked_generator(res, chunk_size, row_count, run_id)
+        return progress_tracked_generator(res, chunk_size, row_count, run_id, prefetch_chunks)
 
     elif mode == "sql_database":
         if not schema_name:
             logging.error("❌ Schema is required in sql_database mode!")
             return None
         logging.info(f"Loading schema '{schema_name}' from database.")
-        source = sql_database(engine, schema=schema_name)
-        if use_parallel:
-            source = source.parallelize()
         table_list = db_config.get("tables")
+        metadata = get_table_metadata(engine, db_config, schema_name, table_list)
+        # Tables share one engine adapter; adaptive chunking still sizes each table's chunks
+        streaming_adapter = make_streaming_adapter(db_config, chunk_size)
+        source = sql_database(
+            engine,
+            schema=schema_name,
+            metadata=metadata,
+            table_names=table_list or None,
+            chunk_size=chunk_size,
+            query_adapter_callback=query_adapter,
+            engine_adapter_callback=streaming_adapter
+        )
         if table_list and len(table_list) > 0:
             logging.info(f"Selecting table subset: {table_list}")
             source = source.with_resources(*table_list)
         else:
             logging.info("No specific table subset provided; loading all tables in schema.")
 
-        if incremental_type == "INCREMENTAL" and delta_column and delta_value and primary_key:
-            initial_dt = pendulum.parse(delta_value)
-            for tbl in source.resources:
+        # sql_database takes no column projection, so projected tables are read with sql_table
+        tables = {}
+        for tbl, resource in source.resources.items():
+            included_columns = get_included_columns(engine, db_config, schema_name, tbl, metadata)
+            if included_columns:
+                resource = sql_table(
+                    engine,
+                    table=tbl,
+                    schema=schema_name,
+                    metadata=metadata,
+                    chunk_size=chunk_size,
+                    included_columns=included_columns,
+                    query_adapter_callback=query_adapter,
+                    engine_adapter_callback=streaming_adapter
+                )
+            tables[tbl] = resource
+
+        incremental = incremental_type == "INCREMENTAL" and delta_column and delta_value and primary_key
+        initial_dt = pendulum.parse(delta_value) if incremental else None
+
+        if not prefetch_chunks and not db_config.get("adaptive_chunking"):
+            # dlt extracts each table in its own pipe, which keeps incremental state and
+            # parallel reads intact; rows are only checked for cancellation on the way
+            resources = []
+            for tbl, resource in tables.items():
+                if incremental:
+                    logging.info(f"Applying incremental hint to table '{tbl}' on column '{delta_column}'")
+                    resource.apply_hints(
+                        primary_key=get_primary_keys(db_config, tbl) or primary_key,
+                        incremental=dlt.sources.incremental(delta_column, initial_value=initial_dt)
+                    )
+                resource.add_map(lambda row: (check_cancelled(run_id), row)[1])
+                resources.append(resource.parallelize() if use_parallel else resource)
+            return resources
+
+        # Re-chunk (and optionally prefetch) each table by wrapping it in a new resource that
+        # carries over its column and write disposition hints. The inner read may run on the
+        # prefetch thread, where dlt cannot keep incremental state, so the wrapper owns the
+        # cursor and pushes its start value down to the inner query. Wrappers are not
+        # parallelized: prefetching already overlaps each table's reads with extraction.
+        def table_resource(tbl, resource):
+            table_schema = resource.compute_table_schema()
+
+            # The annotation lets dlt pass the wrapper's incremental hint in as this argument
+            def rechunked(incremental: Optional[dlt.sources.incremental[Any]] = None):
+                reader = resource
+                if incremental is not None:
+                    reader = sql_table(
+                        engine,
+                        table=tbl,
+                        schema=schema_name,
+                        metadata=metadata,
+                        chunk_size=chunk_size,
+                        included_columns=get_included_columns(engine, db_config, schema_name, tbl, metadata),
+                        query_adapter_callback=make_delta_adapter(query_adapter, delta_column, incremental.start_value),
+                        engine_adapter_callback=streaming_adapter
+                    )
+                chunks = prefetch_generator(
+                    chunk_rows(reader, engine, db_config, schema_name, tbl, chunk_size),
+                    prefetch_chunks
+                )
+                try:
+                    for chunk in chunks:
+                        # Stop between chunks once the run has been cancelled
+                        check_cancelled(run_id)
+                        yield chunk
+                finally:
+                    chunks.close()
+
+            wrapped = dlt.resource(
+                rechunked,
+                name=resource.name,
+                table_name=table_schema["name"],
+                write_disposition=resource.write_disposition,
+                columns=table_schema.get("columns")
+            )
+            if incremental:
                 logging.info(f"Applying incremental hint to table '{tbl}' on column '{delta_column}'")
-                source.resources[tbl] = source.resources[tbl].apply_hints(
-                    primary_key=primary_key,
+                wrapped.apply_hints(
+                    primary_key=get_primary_keys(db_config, tbl) or primary_key,
                     incremental=dlt.sources.incremental(delta_column, initial_value=initial_dt)
                 )
-        # Instead of wrapping with a new function object, modify each resource's __call__ method in place.
-        for tbl, resource in source.resources.items():
-            original_call = resource.__call__
-            def new_call(*args, _orig=original_call, **kwargs):
-                return paginate_generator(_orig(*args, **kwargs), 50000)
-            resource.__call__ = new_call
-        return source
+            return wrapped
+
+        return [table_resource(tbl, resource) for tbl, resource in tables.items()]
 
     else:
         logging.error("❌ Unknown mode specified in db_config")
@@ -0,0 +1,345 @@
+import hashlib
+import json
+import logging
+import threading
+import pandas as pd
+import dlt
+from sqlalchemy import MetaData, Table, and_, or_, select, text
+from src.db.duckdb_connection import execute_query, get_connection
+from src.sources.engine_registry import source_key
+from src.sources.reflection_cache import get_cached_metadata
+from src.pipelines.cancellation import check_cancelled
+
+# Marks rows that disappeared from the source; dlt removes them from the destination on merge
+DELETED_COLUMN = "_diff_deleted"
+# Above this share of changed rows one filtered scan beats many key lookups
+DEFAULT_FULL_SCAN_RATIO = 0.5
+
+# Tables hashed during a run, whose index is only replaced once its load succeeds
+_pending_tables = {}
+_pending_lock = threading.Lock()
+
+
+def _table_key(engine, schema_name, table_name):
+    return source_key(engine) + (schema_name or "", table_name)
+
+
+def _encode_key(values):
+    return json.dumps(list(values), default=str)
+
+
+def hash_expression(engine, column_names):
+    """
+    Return a SQL expression hashing a row on the source, or None when the dialect has
+    no suitable hash function and rows are hashed locally instead.
+    """
+    quote = engine.dialect.identifier_preparer.quote
+    columns = [quote(c) for c in column_names]
+    dialect = engine.dialect.name
+    if dialect == "mssql":
+        # CONCAT would turn NULL into '', so non-NULL values get a 'v' prefix and NULLs become 'n'
+        concatenated = ", '|', ".join(f"COALESCE('v' + CAST({c} AS NVARCHAR(MAX)), 'n')" for c in columns)
+        return f"CONVERT(CHAR(32), HASHBYTES('MD5', CONCAT({concatenated}, '')), 2)"
+    if dialect == "oracle":
+        concatenated = " || '|' || ".join(columns)
+        return f"RAWTOHEX(STANDARD_HASH({concatenated}, 'MD5'))"
+    if dialect == "postgresql":
+        return f"md5(CAST(ROW({', '.join(columns)}) AS TEXT))"
+    return None
+
+
+def reflect_table(engine, db_config, schema_name, table_name):
+    """Reflect one source table, through the reflection cache when it is enabled."""
+    metadata = None
+    if db_config.get("reflection_cache", True):
+        try:
+            metadata = get_cached_metadata(engine, db_config, schema_name, [table_name])
+        except Exception as e:
+            logging.warning(f"Reflection cache unavailable, falling back to live reflection: {str(e)}")
+    table_key = f"{schema_name}.{table_name}" if schema_name else table_name
+    if metadata is not None and table_key in metadata.tables:
+        return metadata.tables[table_key]
+    return Table(table_name, MetaData(schema=schema_name), autoload_with=engine)
+
+
+def _pick_columns(table, names):
+    """Resolve column names case-insensitively against a reflected table."""
+    by_name = {c.name.lower(): c for c in table.columns}
+    missing = [n for n in names if n.lower() not in by_name]
+    if missing:
+        raise ValueError(f"Columns {missing} not found on table `{table.name}`")
+    return [by_name[n.lower()] for n in names]
+
+
+def stage_source_hashes(engine, table, key_columns, hash_columns, where, chunk_size, run_id):
+    """
+    Stream (key, row hash) pairs from the source into row_hash_staging.
+    Only keys and hashes cross the network when the source can hash rows itself.
+    """
+    table_key = _table_key(engine, table.schema, table.name)
+    expression = hash_expression(engine, [c.name for c in hash_columns])
+    if expression:
+        query = select(*key_columns, text(f"{expression} AS _row_hash")).select_from(table)
+    else:
+        logging.info(f"No source-side hash for dialect `{engine.dialect.name}`; hashing rows locally.")
+        query = select(*key_columns, *hash_columns)
+    if where:
+        query = query.where(text(where))
+
+    conn = get_connection()
+    staged = 0
+    try:
+        conn.execute(
+            """
+            DELETE FROM row_hash_staging
+            WHERE run_id = ? AND hostname = ? AND database_name = ? AND schema_name = ? AND table_name = ?
+            """,
+            (run_id,) + table_key
+        )
+        with engine.connect() as source:
+            result = source.execution_options(stream_results=True, yield_per=chunk_size).execute(query)
+            for partition in result.partitions(chunk_size):
+                check_cancelled(run_id)
+                rows = []
+                for row in partition:
+                    keys = row[:len(key_columns)]
+                    if expression:
+                        row_hash = row[-1]
+                    else:
+                        row_hash = hashlib.md5(_encode_key(row[len(key_columns):]).encode()).hexdigest()
+                    rows.append((_encode_key(keys), row_hash))
+                if hasattr(conn, "register"):
+                    hash_chunk = pd.DataFrame(rows, columns=["key_json", "row_hash"])
+                    conn.register("hash_chunk", hash_chunk)
+                    conn.execute(
+                        """
+                        INSERT INTO row_hash_staging
+                        SELECT ?, ?, ?, ?, ?, key_json, row_hash FROM hash_chunk
+                        """,
+                        (run_id,) + table_key
+                    )
+                    conn.unregister("hash_chunk")
+                else:
+                    # Remote workers cannot register a DataFrame with the service's database
+                    conn.executemany(
+                        "INSERT INTO row_hash_staging VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        [(run_id,) + table_key + row for row in rows]
+                    )
+                staged += len(rows)
+        conn.commit()
+    finally:
+        conn.close()
+
+    with _pending_lock:
+        _pending_tables.setdefault(run_id, set()).add(table_key)
+    return staged
+
+
+DIFF_MATCH = """
+    i.hostname = s.hostname AND i.database_name = s.database_name
+    AND i.schema_name = s.schema_name AND i.table_name = s.table_name
+    AND i.key_json = s.key_json
+"""
+# Keys that are new or whose hash changed, and keys that are no longer on the source
+CHANGED_KEYS_SQL = f"""
+    FROM row_hash_staging s
+    LEFT JOIN row_hash_index i ON {DIFF_MATCH}
+    WHERE s.run_id = ? AND s.hostname = ? AND s.database_name = ? AND s.schema_name = ? AND s.table_name = ?
+      AND (i.row_hash IS NULL OR i.row_hash <> s.row_hash)
+"""
+DELETED_KEYS_SQL = f"""
+    FROM row_hash_index i
+    WHERE i.hostname = ? AND i.database_name = ? AND i.schema_name = ? AND i.table_name = ?
+      AND NOT EXISTS (
+          SELECT 1 FROM row_hash_staging s WHERE s.run_id = ? AND {DIFF_MATCH}
+      )
+"""
+
+
+def _diff_params(kind, table_key, run_id):
+    return (run_id,) + table_key if kind == "changed" else table_key + (run_id,)
+
+
+def compute_diff(engine, schema_name, table_name, run_id):
+    """
+    Compare staged hashes with the hash index; return (changed, deleted, indexed) row
+    counts. The keys themselves are streamed with `iter_diff_keys` when needed.
+    """
+    table_key = _table_key(engine, schema_name, table_name)
+    indexed = execute_query(
+        """
+        SELECT COUNT(*) FROM row_hash_index
+        WHERE hostname = ? AND database_name = ? AND schema_name = ? AND table_name = ?
+        """,
+        params=table_key,
+        fetch=True
+    )[0][0]
+    if not indexed:
+        # First run: everything is new and nothing can have been deleted
+        return None, 0, 0
+    changed = execute_query(
+        f"SELECT COUNT(*) {CHANGED_KEYS_SQL}", params=_diff_params("changed", table_key, run_id), fetch=True
+    )[0][0]
+    deleted = execute_query(
+        f"SELECT COUNT(*) {DELETED_KEYS_SQL}", params=_diff_params("deleted", table_key, run_id), fetch=True
+    )[0][0]
+    return changed, deleted, indexed
+
+
+def iter_diff_keys(kind, engine, schema_name, table_name, run_id, batch_size):
+    """Stream the `changed` or `deleted` keys of a table in batches of key_json strings."""
+    table_key = _table_key(engine, schema_name, table_name)
+    query = CHANGED_KEYS_SQL if kind == "changed" else DELETED_KEYS_SQL
+    alias = "s" if kind == "changed" else "i"
+    conn = get_connection()
+    try:
+        result = conn.execute(f"SELECT {alias}.key_json {query}", _diff_params(kind, table_key, run_id))
+        while True:
+            rows = result.fetchmany(batch_size)
+            if not rows:
+                break
+            yield [row[0] for row in rows]
+    finally:
+        conn.close()
+
+
+def commit_hash_index(run_id):
+    """Replace the hash index of every table hashed by a run once its load has succeeded."""
+    with _pending_lock:
+        tables = _pending_tables.pop(run_id, set())
+    if not tables:
+        return
+    conn = get_connection()
+    try:
+        conn.execute("BEGIN TRANSACTION")
+        for table_key in tables:
+            conn.execute(
+                """
+                DELETE FROM row_hash_index
+                WHERE hostname = ? AND database_name = ? AND schema_name = ? AND table_name = ?
+                """,
+                table_key
+            )
+            conn.execute(
+                """
+                INSERT INTO row_hash_index
+                SELECT hostname, database_name, schema_name, table_name, key_json, row_hash
+                FROM row_hash_staging
+                WHERE run_id = ? AND hostname = ? AND database_name = ? AND schema_name = ? AND table_name = ?
+                """,
+                (run_id,) + table_key
+            )
+        conn.execute("DELETE FROM row_hash_staging WHERE run_id = ?", (run_id,))
+        conn.execute("COMMIT")
+        logging.info(f"Hash index updated for tables: {[key[3] for key in tables]}")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def discard_hash_index(run_id):
+    """Drop the staged hashes of a failed run so its changes are detected again next time."""
+    with _pending_lock:
+        _pending_tables.pop(run_id, None)
+    execute_query("DELETE FROM row_hash_staging WHERE run_id = ?", params=(run_id,))
+
+
+def lookup_batch_size(key_columns, chunk_size):
+    # Keep well under SQL Server's 2100 bind parameter limit
+    return max(1, min(chunk_size, 2000 // len(key_columns)))
+
+
+def fetch_rows_by_key(engine, table, columns, key_columns, key_batches, where):
+    """Yield chunks of the rows whose keys changed, looked up one batch of keys at a time."""
+    with engine.connect() as conn:
+        for batch in key_batches:
+            values = [json.loads(key) for key in batch]
+            if len(key_columns) == 1:
+                condition = key_columns[0].in_([v[0] for v in values])
+            else:
+                condition = or_(*[
+                    and_(*[column == value for column, value in zip(key_columns, key)])
+                    for key in values
+                ])
+            query = select(*columns).where(condition)
+            if where:
+                query = query.where(text(where))
+            yield [dict(row._mapping) for row in conn.execute(query)]
+
+
+def scan_rows(engine, columns, where, chunk_size):
+    """Yield chunks of every row from one streamed scan."""
+    query = select(*columns)
+    if where:
+        query = query.where(text(where))
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(query)
+        for partition in result.partitions(chunk_size):
+            yield [dict(row._mapping) for row in partition]
+
+
+def read_diff(engine, db_config, schema_name, table_name, primary_keys, columns, where, chunk_size, run_id):
+    """
+    Yield chunks of inserted, updated and deleted rows for one table by comparing row
+    hashes computed on the source with the local hash index.
+    """
+    table = reflect_table(engine, db_config, schema_name, table_name)
+    key_columns = _pick_columns(table, primary_keys)
+    if columns:
+        wanted = primary_keys + [c for c in columns if c.lower() not in {k.lower() for k in primary_keys}]
+        selected = _pick_columns(table, wanted)
+    else:
+        selected = list(table.columns)
+    hash_columns = [c for c in selected if c not in key_columns]
+
+    staged = stage_source_hashes(engine, table, key_columns, hash_columns or key_columns, where, chunk_size, run_id)
+    changed, deleted, indexed = compute_diff(engine, schema_name, table_name, run_id)
+    logging.info(
+        f"Diff for `{table_name}`: {staged} source rows, "
+        f"{staged if changed is None else changed} inserted or updated, {deleted} deleted."
+    )
+
+    full_scan_ratio = db_config.get("diff_full_scan_ratio", DEFAULT_FULL_SCAN_RATIO)
+    if changed is None or changed:
+        if not indexed:
+            logging.info(f"No hash index for `{table_name}` yet; loading every row.")
+            chunks = scan_rows(engine, selected, where, chunk_size)
+        elif changed > staged * full_scan_ratio:
+            # Unchanged rows ride along; merging them again is harmless and cheaper than lookups
+            logging.info(f"Most of `{table_name}` changed; loading every row in one scan.")
+            chunks = scan_rows(engine, selected, where, chunk_size)
+        else:
+            key_batches = iter_diff_keys(
+                "changed", engine, schema_name, table_name, run_id, lookup_batch_size(key_columns, chunk_size)
+            )
+            chunks = fetch_rows_by_key(engine, table, selected, key_columns, key_batches, where)
+        for chunk in chunks:
+            check_cancelled(run_id)
+            for record in chunk:
+                record[DELETED_COLUMN] = False
+            yield chunk
+
+    if deleted:
+        for batch in iter_diff_keys("deleted", engine, schema_name, table_name, run_id, chunk_size):
+            yield [
+                {**dict(zip(primary_keys, json.loads(key))), DELETED_COLUMN: True}
+                for key in batch
+            ]
+
+
+def diff_load_resource(engine, db_config, schema_name, table_name, primary_keys, columns, where, chunk_size, run_id):
+    """Build a merge resource that ships only the rows whose hash changed since the last load."""
+    @dlt.resource(
+        name=table_name,
+        write_disposition="merge",
+        primary_key=primary_keys,
+        columns={DELETED_COLUMN: {"data_type": "bool", "hard_delete": True}}
+    )
+    def diff():
+        yield from read_diff(
+            engine, db_config, schema_name, table_name, primary_keys, columns, where, chunk_size, run_id
+        )
+
+    return diff
@@ -0,0 +1,129 @@
+import atexit
+import logging
+import threading
+import time
+from sqlalchemy import create_engine, event
+
+# Pool defaults, any of these can be overridden per pipeline in the db config JSON
+DEFAULT_POOL_SETTINGS = {
+    "pool_size": 5,
+    "max_overflow": 10,
+    "pool_pre_ping": True,
+    "pool_recycle": 1800,  # seconds before a pooled connection is replaced
+}
+DEFAULT_IDLE_TIMEOUT = 900  # seconds an unused engine is kept before it is disposed
+
+# Engines shared by every pipeline run in this process, keyed by connection string and pool settings
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def apply_cursor_options(conn, cursor, statement, parameters, context, executemany):
+    """
+    Tune the DBAPI cursor from the connection's execution options before each query.
+    `fetch_size` maps to cursor.arraysize (oracledb, pyodbc) and `prefetch_rows` to
+    oracledb's cursor.prefetchrows, so large reads take fewer round-trips.
+    """
+    options = conn.get_execution_options()
+    fetch_size = options.get("fetch_size")
+    prefetch_rows = options.get("prefetch_rows")
+    if fetch_size and hasattr(cursor, "arraysize"):
+        cursor.arraysize = fetch_size
+    if prefetch_rows and hasattr(cursor, "prefetchrows"):
+        cursor.prefetchrows = prefetch_rows
+
+
+def pool_settings_from_config(db_config):
+    """Pick the pool settings out of a db config, falling back to the defaults."""
+    settings = {
+        key: db_config.get(key, default)
+        for key, default in DEFAULT_POOL_SETTINGS.items()
+    }
+    settings["idle_timeout"] = db_config.get("pool_idle_timeout", DEFAULT_IDLE_TIMEOUT)
+    return settings
+
+
+def source_key(engine):
+    """
+    Return (host[:port], database) identifying the source behind an engine, for keying
+    per-table state. Taken from the parsed URL, so raw `credentials` strings are keyed
+    like connection strings built from host/database fields.
+    """
+    url = engine.url
+    return (
+        f"{url.host}:{url.port}" if url.host and url.port else url.host or "",
+        url.database or url.query.get("service_name") or "",
+    )
+
+
+def get_engine(conn_str, pool_size=5, max_overflow=10, pool_pre_ping=True,
+               pool_recycle=1800, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+    """
+    Return the shared SQLAlchemy engine for a connection string, creating it on first use.
+    Pipelines hitting the same host reuse one connection pool instead of paying a
+    full connect and handshake on every run; pipelines asking for different pool
+    settings get a pool of their own.
+    """
+    evict_idle_engines()
+
+    key = (conn_str, pool_size, max_overflow, pool_pre_ping, pool_recycle)
+    with _engines_lock:
+        entry = _engines.get(key)
+        if entry:
+            entry["last_used"] = time.time()
+            logging.info("Reusing pooled SQLAlchemy engine.")
+            return entry["engine"]
+
+        engine = create_engine(
+            conn_str,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_pre_ping=pool_pre_ping,
+            pool_recycle=pool_recycle,
+        )
+        event.listen(engine, "before_cursor_execute", apply_cursor_options)
+        _engines[key] = {
+            "engine": engine,
+            "last_used": time.time(),
+            "idle_timeout": idle_timeout,
+        }
+        logging.info(
+            f"SQLAlchemy engine created (pool_size={pool_size}, max_overflow={max_overflow}, "
+            f"pre_ping={pool_pre_ping}, recycle={pool_recycle}s)."
+        )
+        return engine
+
+
+def evict_idle_engines():
+    """Dispose engines that have not been used within their idle timeout."""
+    now = time.time()
+    with _engines_lock:
+        for key, entry in list(_engines.items()):
+            if now - entry["last_used"] < entry["idle_timeout"]:
+                continue
+            # Never pull the pool out from under a run that is still reading
+            if entry["engine"].pool.checkedout() > 0:
+                continue
+            entry["engine"].dispose()
+            del _engines[key]
+            logging.info("Disposed idle SQLAlchemy engine.")
+
+
+def dispose_engine(conn_str):
+    """Dispose the engines for a single connection string, whatever their pool settings."""
+    with _engines_lock:
+        entries = [_engines.pop(key) for key in list(_engines) if key[0] == conn_str]
+    for entry in entries:
+        entry["engine"].dispose()
+
+
+def dispose_all_engines():
+    """Dispose every registered engine, e.g. on shutdown."""
+    with _engines_lock:
+        entries = list(_engines.values())
+        _engines.clear()
+    for entry in entries:
+        entry["engine"].dispose()
+
+
+atexit.register(dispose_all_engines)
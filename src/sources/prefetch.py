@@ -0,0 +1,68 @@
+import logging
+import queue
+import threading
+
+# Sentinel marking the end of the source generator
+_END = object()
+
+
+class _PrefetchError:
+    """Carries an exception raised by the source over to the consuming thread."""
+    def __init__(self, error):
+        self.error = error
+
+
+def prefetch_generator(gen, depth=2):
+    """
+    Read up to `depth` items ahead of the consumer on a background thread.
+    The bounded queue applies backpressure, so at most `depth` chunks are held in memory
+    while the source keeps fetching as dlt processes the current chunk.
+    A depth of 0 disables prefetching and yields straight from `gen`.
+    """
+    if not depth or depth < 1:
+        yield from gen
+        return
+
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item):
+        # Wake up periodically so an abandoned consumer does not leave the thread blocked
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def producer():
+        try:
+            for item in gen:
+                if not put(item):
+                    break
+            else:
+                put(_END)
+                return
+        except BaseException as e:
+            put(_PrefetchError(e))
+            return
+        # The consumer stopped early; release the source (cursor, connection) on this thread
+        close = getattr(gen, "close", None)
+        if close:
+            close()
+
+    thread = threading.Thread(target=producer, name="prefetch", daemon=True)
+    thread.start()
+    logging.info(f"Prefetching up to {depth} chunks ahead of extraction.")
+
+    try:
+        while True:
+            item = buffer.get()
+            if item is _END:
+                break
+            if isinstance(item, _PrefetchError):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
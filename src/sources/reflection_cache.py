@@ -0,0 +1,161 @@
+import logging
+import pickle
+from datetime import datetime, timedelta
+from sqlalchemy import MetaData, inspect, text
+from src.db.duckdb_connection import execute_query, get_connection
+from src.sources.engine_registry import source_key
+
+DEFAULT_REFLECTION_TTL = 86400  # seconds a cached table definition is trusted
+
+# Cheap catalog queries returning (table_name, last DDL timestamp) for a whole schema.
+# Sources without a DDL timestamp fall back to the TTL alone.
+DDL_TIMESTAMP_QUERIES = {
+    "oracle": """
+        SELECT object_name, TO_CHAR(last_ddl_time, 'YYYY-MM-DD HH24:MI:SS')
+        FROM all_objects
+        WHERE owner = :schema_name AND object_type IN ('TABLE', 'VIEW')
+    """,
+    "mssql": """
+        SELECT o.name, CONVERT(VARCHAR(23), o.modify_date, 121)
+        FROM sys.objects o
+        JOIN sys.schemas s ON o.schema_id = s.schema_id
+        WHERE s.name = :schema_name AND o.type IN ('U', 'V')
+    """,
+}
+
+
+def fetch_ddl_timestamps(engine, schema_name):
+    """Return {lower table name: DDL timestamp} for a schema, or {} if the dialect has none."""
+    query = DDL_TIMESTAMP_QUERIES.get(engine.dialect.name)
+    if not query or not schema_name:
+        return {}
+    # Oracle stores unquoted identifiers in upper case
+    owner = schema_name.upper() if engine.dialect.name == "oracle" else schema_name
+    try:
+        with engine.connect() as conn:
+            rows = conn.execute(text(query), {"schema_name": owner}).fetchall()
+        return {row[0].lower(): row[1] for row in rows}
+    except Exception as e:
+        logging.warning(f"Could not read DDL timestamps for schema `{schema_name}`: {str(e)}")
+        return {}
+
+
+def _cache_key(engine, schema_name):
+    return source_key(engine) + (schema_name or "",)
+
+
+def load_cached_tables(engine, schema_name, table_names, ddl_timestamps, ttl):
+    """
+    Copy every fresh cached table definition into a new MetaData.
+    A cached definition is fresh when it is younger than the TTL and its DDL timestamp
+    still matches the source catalog. Returns the MetaData and the names that need reflecting.
+    """
+    hostname, database_name, schema_key = _cache_key(engine, schema_name)
+    metadata = MetaData(schema=schema_name)
+    if not table_names:
+        return metadata, []
+
+    placeholders = ", ".join(["?" for _ in table_names])
+    rows = execute_query(
+        f"""
+        SELECT table_name, table_metadata, ddl_timestamp, reflected_at
+        FROM reflection_cache
+        WHERE hostname = ? AND database_name = ? AND schema_name = ?
+          AND table_name IN ({placeholders})
+        """,
+        params=[hostname, database_name, schema_key] + list(table_names),
+        fetch=True
+    )
+
+    oldest_allowed = datetime.now() - timedelta(seconds=ttl)
+    fresh = set()
+    for table_name, table_metadata, ddl_timestamp, reflected_at in rows:
+        if reflected_at < oldest_allowed:
+            continue
+        current_ddl = ddl_timestamps.get(table_name.lower())
+        if current_ddl and current_ddl != ddl_timestamp:
+            logging.info(f"Schema drift detected on `{table_name}`; reflecting again.")
+            continue
+        try:
+            for table in pickle.loads(table_metadata).tables.values():
+                table.to_metadata(metadata)
+            fresh.add(table_name)
+        except Exception as e:
+            logging.warning(f"Discarding unreadable cached definition for `{table_name}`: {str(e)}")
+
+    stale = [name for name in table_names if name not in fresh]
+    return metadata, stale
+
+
+def store_reflected_tables(engine, schema_name, metadata, table_names, ddl_timestamps):
+    """Persist the definitions of freshly reflected tables in one transaction."""
+    hostname, database_name, schema_key = _cache_key(engine, schema_name)
+    reflected_at = datetime.now()
+    rows = []
+    for table_name in table_names:
+        table_key = f"{schema_name}.{table_name}" if schema_name else table_name
+        table = metadata.tables.get(table_key)
+        if table is None:
+            continue
+        # Pickle each table on its own so entries can be invalidated independently
+        standalone = MetaData(schema=schema_name)
+        table.to_metadata(standalone)
+        rows.append((
+            hostname, database_name, schema_key, table_name,
+            pickle.dumps(standalone), ddl_timestamps.get(table_name.lower()), reflected_at
+        ))
+    if not rows:
+        return
+
+    conn = get_connection()
+    try:
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO reflection_cache (
+                hostname, database_name, schema_name, table_name,
+                table_metadata, ddl_timestamp, reflected_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            rows
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def get_cached_metadata(engine, db_config, schema_name, table_names=None):
+    """
+    Return a MetaData holding the requested tables, reflecting only those whose cached
+    definition is missing, expired or drifted. Pass it to `sql_table`/`sql_database`
+    via `metadata=` so dlt skips its own reflection.
+    """
+    ttl = db_config.get("reflection_cache_ttl", DEFAULT_REFLECTION_TTL)
+    if not table_names:
+        # Listing table names is a single catalog query, unlike full reflection
+        table_names = inspect(engine).get_table_names(schema=schema_name)
+
+    ddl_timestamps = fetch_ddl_timestamps(engine, schema_name)
+    metadata, stale = load_cached_tables(engine, schema_name, table_names, ddl_timestamps, ttl)
+    logging.info(f"Reflection cache: {len(table_names) - len(stale)} cached, {len(stale)} to reflect.")
+
+    if stale:
+        metadata.reflect(bind=engine, only=stale, views=True, resolve_fks=False)
+        store_reflected_tables(engine, schema_name, metadata, stale, ddl_timestamps)
+    return metadata
+
+
+def invalidate_reflection_cache(hostname=None, database_name=None, schema_name=None, table_name=None):
+    """Drop cached definitions matching the given key parts; no arguments clears everything."""
+    query = "DELETE FROM reflection_cache WHERE 1=1"
+    params = []
+    for column, value in (
+        ("hostname", hostname),
+        ("database_name", database_name),
+        ("schema_name", schema_name),
+        ("table_name", table_name),
+    ):
+        if value is not None:
+            query += f" AND {column} = ?"
+            params.append(value)
+    execute_query(query, params=params if params else None)
+    logging.info("Reflection cache invalidated.")
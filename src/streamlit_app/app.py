@@ -1,6 +1,7 @@
 # app.py
 import sys
 import os
+import importlib
 import streamlit as st
 from streamlit_option_menu import option_menu
 # from styles.theme_manager import load_theme
@@ -16,24 +17,44 @@ st.set_page_config(
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
 sys.path.insert(0, project_root)
 
-# Import page modules after path is set
-from src.streamlit_app.page_modules.pipeline_creator import pipeline_creator_page
-from src.streamlit_app.page_modules.pipeline_list import pipeline_list_page
-from src.streamlit_app.page_modules.pipeline_runs import pipeline_runs_page
-from src.streamlit_app.page_modules.pipeline_editor import pipeline_editor_page
-from src.streamlit_app.page_modules.monitoring_dashboard import monitoring_dashboard
-from src.streamlit_app.page_modules.settings import settings_page
-from src.streamlit_app.page_modules.metadata_config import metadata_config_page
-from src.streamlit_app.page_modules.docs import docs_page
-from src.db.duckdb_connection import reinitialize_database
+# Page modules are imported on first visit, so start-up only pays for the page shown
+PAGES = {
+    "Create Pipeline": ("src.streamlit_app.page_modules.pipeline_creator", "pipeline_creator_page"),
+    "Pipelines": ("src.streamlit_app.page_modules.pipeline_list", "pipeline_list_page"),
+    "Pipeline Runs": ("src.streamlit_app.page_modules.pipeline_runs", "pipeline_runs_page"),
+    "Edit Pipeline": ("src.streamlit_app.page_modules.pipeline_editor", "pipeline_editor_page"),
+    "Monitoring": ("src.streamlit_app.page_modules.monitoring_dashboard", "monitoring_dashboard"),
+    "Settings": ("src.streamlit_app.page_modules.settings", "settings_page"),
+    "Metadata Config": ("src.streamlit_app.page_modules.metadata_config", "metadata_config_page"),
+    "Docs": ("src.streamlit_app.page_modules.docs", "docs_page"),
+}
+
+
+def load_page(name):
+    """Import a page module on demand and return its render function."""
+    module_name, function_name = PAGES[name]
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+from src.db.duckdb_connection import reinitialize_database, migrate_database
 
 
 # # Load theme before any other UI elements
 # load_theme()
 
-# Initialize database if it doesn't exist
+# Initialize database if it doesn't exist, otherwise add any tables and columns it is missing
 if not os.path.exists(os.path.join(project_root, "data", "EZMoveIt.duckdb")):
     reinitialize_database()
+else:
+    migrate_database()
+
+# Serve the run queue to remote workers from this process, which owns the DuckDB file
+if os.environ.get("EZMOVEIT_QUEUE_TOKEN"):
+    from src.pipelines.queue_service import start_queue_service
+    start_queue_service(
+        os.environ.get("EZMOVEIT_QUEUE_HOST", "127.0.0.1"),
+        int(os.environ.get("EZMOVEIT_QUEUE_PORT", 8765))
+    )
 
 from streamlit_option_menu import option_menu
 import streamlit as st
@@ -93,22 +114,8 @@ def main():
     if st.session_state.get('theme') == 'light':
         apply_custom_style()
     # Main content area
-    if selected == "Create Pipeline":
-        pipeline_creator_page()
-    elif selected == "Pipelines":
-        pipeline_list_page()
-    elif selected == "Pipeline Runs":
-        pipeline_runs_page()
-    elif selected == "Edit Pipeline":
-        pipeline_editor_page()
-    elif selected == "Monitoring":
-        monitoring_dashboard()
-    elif selected == "Settings":
-        settings_page()
-    elif selected == "Metadata Config":
-        metadata_config_page()
-    elif selected == "Docs":
-        docs_page()
+    if selected in PAGES:
+        load_page(selected)()
 
 if __name__ == "__main__":
     main()
@@ -2,13 +2,184 @@ import streamlit as st
 import pandas as pd
 import json
 from datetime import datetime
-from src.db.duckdb_connection import execute_query
+from src.db.duckdb_connection import execute_query, get_connection
+from src.db.query_cache import bump
 from io import StringIO
 
+CSV_COLUMNS = [
+    "SOURCE_TYPE", "DRIVER_TYPE", "LOGICAL_NAME", "HOSTNAME", "PORT",
+    "DATABASE_NAME", "SCHEMA_NAME", "TABLE_NAME", "SOURCE_URL", "ENDPOINT",
+    "LOAD_TYPE", "PRIMARY_KEY", "DELTA_COLUMN", "DELTA_VALUE", "LAST_LOAD_DT"
+]
+OPTIONAL_CSV_COLUMNS = ["COLUMN_LIST", "WHERE_CLAUSE"]
+LOAD_TYPES = ["full", "incremental", "CDC", "diff"]
+# Columns identifying a source object; a re-imported row with the same key updates it
+NATURAL_KEY = ["hostname", "database_name", "schema_name", "table_name", "source_url", "endpoint"]
+
 def get_next_config_id():
     result = execute_query("SELECT MAX(id) FROM metadata_config", fetch=True)
     return (result[0][0] + 1) if result and result[0][0] is not None else 1
 
+def import_metadata_csv(df, upsert=True):
+    """
+    Bulk-load a metadata CSV (read with dtype=str) in one transaction. Rows are staged and
+    validated in SQL; nothing is written if any row is invalid. With `upsert`, rows whose
+    natural key already exists update that config instead of adding a duplicate.
+    Returns (inserted, updated, errors) where errors is a list of (csv_line, message).
+    """
+    missing = [c for c in CSV_COLUMNS if c not in df.columns]
+    if missing:
+        return 0, 0, [(1, f"Missing columns: {', '.join(missing)}")]
+    upload = df.reindex(columns=CSV_COLUMNS + OPTIONAL_CSV_COLUMNS).astype("string")
+    upload.insert(0, "CSV_LINE", range(2, len(upload) + 2))  # line 1 is the header
+
+    text_columns = [c for c in CSV_COLUMNS + OPTIONAL_CSV_COLUMNS if c not in ("PORT", "LAST_LOAD_DT", "LOAD_TYPE")]
+    # Load types match case-insensitively and are stored in the spelling the forms use
+    load_type_sql = "CASE lower(trim(LOAD_TYPE)) " + " ".join(
+        f"WHEN '{t.lower()}' THEN '{t}'" for t in LOAD_TYPES
+    ) + " END"
+    key_match = " AND ".join(f"m.{c} IS NOT DISTINCT FROM s.{c}" for c in NATURAL_KEY)
+    conn = get_connection()
+    try:
+        conn.register("metadata_upload", upload)
+        conn.execute("BEGIN TRANSACTION")
+        conn.execute(
+            f"""
+            CREATE TEMP TABLE metadata_staging AS
+            SELECT CSV_LINE AS csv_line,
+                   {", ".join(f"NULLIF(trim({c}), '') AS {c.lower()}" for c in text_columns)},
+                   {load_type_sql} AS load_type,
+                   NULLIF(trim(PORT), '') AS port_text,
+                   TRY_CAST(NULLIF(trim(PORT), '') AS DECIMAL(4, 0)) AS port,
+                   NULLIF(trim(LAST_LOAD_DT), '') AS last_load_dt_text,
+                   TRY_CAST(COALESCE(NULLIF(trim(LAST_LOAD_DT), ''), '1900-01-01') AS TIMESTAMP) AS last_load_dt
+            FROM metadata_upload
+            """
+        )
+        errors = conn.execute(
+            f"""
+            SELECT csv_line, message FROM (
+                SELECT csv_line, 'SOURCE_TYPE is required' AS message FROM metadata_staging WHERE source_type IS NULL
+                UNION ALL
+                SELECT csv_line, 'LOGICAL_NAME is required' FROM metadata_staging WHERE logical_name IS NULL
+                UNION ALL
+                SELECT csv_line, 'LOAD_TYPE must be one of {", ".join(LOAD_TYPES)}'
+                FROM metadata_staging WHERE load_type IS NULL
+                UNION ALL
+                SELECT csv_line, 'PORT is not a number up to 4 digits' FROM metadata_staging
+                WHERE port_text IS NOT NULL AND port IS NULL
+                UNION ALL
+                SELECT csv_line, 'LAST_LOAD_DT is not a valid timestamp' FROM metadata_staging WHERE last_load_dt IS NULL
+                UNION ALL
+                SELECT csv_line, 'Duplicate of another row with the same host, database, schema, table, URL and endpoint'
+                FROM (
+                    SELECT csv_line, COUNT(*) OVER (PARTITION BY {", ".join(NATURAL_KEY)}) AS copies
+                    FROM metadata_staging
+                ) WHERE copies > 1
+            ) ORDER BY csv_line
+            """
+        ).fetchall()
+        if errors:
+            conn.execute("ROLLBACK")
+            return 0, 0, errors
+
+        source_json = """
+            json_object(
+                'source_type', lower(replace(s.source_type, ' ', '_')),
+                'driver_type', s.driver_type,
+                'connection', json_object(
+                    'host', s.hostname, 'port', s.port::INTEGER,
+                    'database', s.database_name, 'schema', s.schema_name
+                )
+            )::VARCHAR
+        """
+        config_columns = [
+            "source_type", "driver_type", "logical_name", "hostname", "port",
+            "database_name", "schema_name", "table_name", "source_url", "endpoint",
+            "load_type", "primary_key", "delta_column", "delta_value", "last_load_dt",
+            "column_list", "where_clause"
+        ]
+        updated = 0
+        if upsert:
+            updated = conn.execute(
+                f"""
+                UPDATE metadata_config AS m SET
+                    {", ".join(f"{c} = s.{c}" for c in config_columns)},
+                    source_json = {source_json}
+                FROM metadata_staging s
+                WHERE {key_match}
+                """
+            ).fetchone()[0]
+        inserted = conn.execute(
+            f"""
+            INSERT INTO metadata_config (id, {", ".join(config_columns)}, source_json)
+            SELECT (SELECT COALESCE(MAX(id), 0) FROM metadata_config) + row_number() OVER (ORDER BY s.csv_line),
+                   {", ".join(f"s.{c}" for c in config_columns)}, {source_json}
+            FROM metadata_staging s
+            {f"WHERE NOT EXISTS (SELECT 1 FROM metadata_config m WHERE {key_match})" if upsert else ""}
+            """
+        ).fetchone()[0]
+        conn.execute("COMMIT")
+        bump("metadata_config")
+        return inserted, updated, []
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+# Grid columns a user can change; ID, SOURCE_JSON and LAST_LOAD_DT are read-only
+EDITABLE_COLUMNS = [
+    "SOURCE_TYPE", "DRIVER_TYPE", "LOGICAL_NAME", "HOSTNAME", "PORT",
+    "DATABASE_NAME", "SCHEMA_NAME", "TABLE_NAME", "SOURCE_URL", "ENDPOINT",
+    "LOAD_TYPE", "PRIMARY_KEY", "DELTA_COLUMN", "DELTA_VALUE", "COLUMN_LIST", "WHERE_CLAUSE"
+]
+
+def get_changed_rows(original, edited):
+    """Rows of `edited` whose editable values differ from `original`, matched on ID."""
+    after = edited.set_index("ID")[EDITABLE_COLUMNS]
+    before = original.set_index("ID")[EDITABLE_COLUMNS].loc[after.index]
+    differs = (before != after) & ~(before.isna() & after.isna())
+    return after[differs.any(axis=1)].reset_index()
+
+def apply_metadata_edits(changed, delete_ids):
+    """Write changed grid rows with one UPDATE ... FROM and delete `delete_ids`, in one transaction."""
+    conn = get_connection()
+    try:
+        conn.execute("BEGIN TRANSACTION")
+        if len(changed):
+            edits = changed[["ID"] + EDITABLE_COLUMNS].astype({c: "string" for c in EDITABLE_COLUMNS})
+            edits["ID"] = edits["ID"].astype("int64")
+            conn.register("metadata_edits", edits)
+            assignments = [
+                f"{c.lower()} = e.{c}" for c in EDITABLE_COLUMNS
+                if c not in ("PORT", "COLUMN_LIST", "WHERE_CLAUSE")
+            ]
+            conn.execute(
+                f"""
+                UPDATE metadata_config AS m SET
+                    {", ".join(assignments)},
+                    port = CAST(e.PORT AS DECIMAL(4, 0)),
+                    column_list = NULLIF(trim(e.COLUMN_LIST), ''),
+                    where_clause = NULLIF(trim(e.WHERE_CLAUSE), '')
+                FROM metadata_edits e
+                WHERE m.id = e.ID
+                """
+            )
+            conn.unregister("metadata_edits")
+        if delete_ids:
+            conn.execute(
+                f"DELETE FROM metadata_config WHERE id IN ({', '.join(['?'] * len(delete_ids))})",
+                [int(config_id) for config_id in delete_ids]
+            )
+        conn.execute("COMMIT")
+        bump("metadata_config")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
 def get_source_defaults():
     """Get default database and schema values for each source type"""
     query = """
@@ -65,7 +236,7 @@ def metadata_config_page():
                     schema_name = st.text_input("Schema Name", value=defaults.get('schema', ''))
                 
                 # Load Configuration
-                load_type = st.selectbox("Load Type", ["full", "incremental", "CDC"])
+                load_type = st.selectbox("Load Type", ["full", "incremental", "CDC", "diff"])
                 primary_key = st.text_input("Primary Key")
                 
                 # Show delta fields only for incremental loads
@@ -75,6 +246,16 @@ def metadata_config_page():
                     delta_column = st.text_input("Delta Column")
                     delta_value = st.text_input("Delta Value", value="1900-01-01")
                 
+                # Optional column projection and row filter, applied at the source
+                column_list = st.text_input(
+                    "Columns (comma-separated, leave empty for all)",
+                    placeholder="id,region,amount"
+                )
+                where_clause = st.text_input(
+                    "Row Filter (SQL WHERE condition, optional)",
+                    placeholder="region = 'EU'"
+                )
+                
                 # Empty values for API fields
                 source_url = ""
                 endpoint = ""
@@ -99,8 +280,8 @@ def metadata_config_page():
                             id, source_type, driver_type, logical_name, hostname, port,
                             database_name, schema_name, table_name, source_url, endpoint,
                             load_type, primary_key, delta_column, delta_value, source_json,
-                            last_load_dt
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                            last_load_dt, column_list, where_clause
+                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                         """
                         
                         execute_query(
@@ -109,7 +290,8 @@ def metadata_config_page():
                                 get_next_config_id(), source_type, driver_type, logical_name,
                                 hostname, port, database_name, schema_name, table_name,
                                 source_url, endpoint, load_type, primary_key, delta_column,
-                                delta_value, json.dumps(source_json), "1900-01-01"
+                                delta_value, json.dumps(source_json), "1900-01-01",
+                                column_list or None, where_clause or None
                             )
                         )
                         
@@ -137,7 +319,7 @@ def metadata_config_page():
                     schema_name = st.text_input("Schema Name", value=defaults.get('schema', ''))
                 
                 # Load Configuration
-                load_type = st.selectbox("Load Type", ["full", "incremental", "CDC"])
+                load_type = st.selectbox("Load Type", ["full", "incremental", "CDC", "diff"])
                 primary_key = st.text_input("Primary Key")
                 
                 # Show delta fields only for incremental loads
@@ -147,6 +329,16 @@ def metadata_config_page():
                     delta_column = st.text_input("Delta Column")
                     delta_value = st.text_input("Delta Value", value="1900-01-01")
                 
+                # Optional column projection and row filter, applied at the source
+                column_list = st.text_input(
+                    "Columns (comma-separated, leave empty for all)",
+                    placeholder="id,region,amount"
+                )
+                where_clause = st.text_input(
+                    "Row Filter (SQL WHERE condition, optional)",
+                    placeholder="region = 'EU'"
+                )
+                
                 # Empty values for API fields
                 source_url = ""
                 endpoint = ""
@@ -173,8 +365,8 @@ def metadata_config_page():
                             id, source_type, driver_type, logical_name, hostname, port,
                             database_name, schema_name, table_name, source_url, endpoint,
                             load_type, primary_key, delta_column, delta_value, source_json,
-                            last_load_dt
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                            last_load_dt, column_list, where_clause
+                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                         """
                         
                         execute_query(
@@ -183,7 +375,8 @@ def metadata_config_page():
                                 get_next_config_id(), source_type, driver_type, logical_name,
                                 hostname, port, database_name, schema_name, table_name,
                                 source_url, endpoint, load_type, primary_key, delta_column,
-                                delta_value, json.dumps(source_json), "1900-01-01"
+                                delta_value, json.dumps(source_json), "1900-01-01",
+                                column_list or None, where_clause or None
                             )
                         )
                         
@@ -216,6 +409,8 @@ def metadata_config_page():
                     delta_value = st.text_input("Delta Value", value="1900-01-01")
                 
                 # Empty values for database fields
+                column_list = ""
+                where_clause = ""
                 hostname = ""
                 port = "0"
                 database_name = ""
@@ -239,8 +434,8 @@ def metadata_config_page():
                             id, source_type, driver_type, logical_name, hostname, port,
                             database_name, schema_name, table_name, source_url, endpoint,
                             load_type, primary_key, delta_column, delta_value, source_json,
-                            last_load_dt
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                            last_load_dt, column_list, where_clause
+                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                         """
                         
                         execute_query(
@@ -249,7 +444,8 @@ def metadata_config_page():
                                 get_next_config_id(), source_type, driver_type, logical_name,
                                 hostname, port, database_name, schema_name, table_name,
                                 source_url, endpoint, load_type, primary_key, delta_column,
-                                delta_value, json.dumps(source_json), "1900-01-01"
+                                delta_value, json.dumps(source_json), "1900-01-01",
+                                column_list or None, where_clause or None
                             )
                         )
                         
@@ -265,47 +461,24 @@ def metadata_config_page():
         
         if uploaded_file is not None:
             try:
-                df = pd.read_csv(uploaded_file)
+                # Read everything as text; types are checked in SQL during the import
+                df = pd.read_csv(uploaded_file, dtype=str)
                 st.write("Preview of uploaded data:")
                 st.dataframe(df.head())
                 
+                upsert = st.checkbox(
+                    "Update existing configurations with the same host, database, schema and table",
+                    value=True,
+                    help="Otherwise every row is added as a new configuration"
+                )
+                
                 if st.button("Import Configurations"):
-                    for _, row in df.iterrows():
-                        # Create source JSON for each row
-                        source_json = {
-                            "source_type": row['SOURCE_TYPE'].lower().replace(" ", "_"),
-                            "driver_type": row['DRIVER_TYPE'],
-                            "connection": {
-                                "host": row['HOSTNAME'],
-                                "port": row['PORT'],
-                                "database": row['DATABASE_NAME'],
-                                "schema": row['SCHEMA_NAME']
-                            }
-                        }
-                        
-                        # Insert configuration
-                        insert_query = """
-                        INSERT INTO metadata_config (
-                            id, source_type, driver_type, logical_name, hostname, port,
-                            database_name, schema_name, table_name, source_url, endpoint,
-                            load_type, primary_key, delta_column, delta_value, source_json,
-                            last_load_dt
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        """
-                        
-                        execute_query(
-                            insert_query,
-                            params=(
-                                get_next_config_id(), row['SOURCE_TYPE'], row['DRIVER_TYPE'],
-                                row['LOGICAL_NAME'], row['HOSTNAME'], row['PORT'],
-                                row['DATABASE_NAME'], row['SCHEMA_NAME'], row['TABLE_NAME'],
-                                row['SOURCE_URL'], row['ENDPOINT'], row['LOAD_TYPE'],
-                                row['PRIMARY_KEY'], row['DELTA_COLUMN'], row['DELTA_VALUE'],
-                                json.dumps(source_json), row['LAST_LOAD_DT']
-                            )
-                        )
-                    
-                    st.success("Configurations imported successfully!")
+                    inserted, updated, errors = import_metadata_csv(df, upsert=upsert)
+                    if errors:
+                        st.error(f"Nothing was imported: {len(errors)} problem(s) found.")
+                        st.dataframe(pd.DataFrame(errors, columns=["CSV Line", "Problem"]), hide_index=True)
+                    else:
+                        st.success(f"Imported {inserted} new and updated {updated} existing configurations.")
                     
             except Exception as e:
                 st.error(f"Error processing file: {str(e)}")
@@ -325,7 +498,7 @@ def metadata_config_page():
                     "ID", "SOURCE_TYPE", "DRIVER_TYPE", "LOGICAL_NAME", "HOSTNAME", "PORT",
                     "DATABASE_NAME", "SCHEMA_NAME", "TABLE_NAME", "SOURCE_URL", "ENDPOINT",
                     "LOAD_TYPE", "PRIMARY_KEY", "DELTA_COLUMN", "DELTA_VALUE", "SOURCE_JSON",
-                    "LAST_LOAD_DT"
+                    "LAST_LOAD_DT", "COLUMN_LIST", "WHERE_CLAUSE"
                 ])
                 
                 # Add selection column
@@ -352,6 +525,14 @@ def metadata_config_page():
                         "LAST_LOAD_DT": st.column_config.DatetimeColumn(
                             "LAST_LOAD_DT",
                             disabled=True
+                        ),
+                        "COLUMN_LIST": st.column_config.TextColumn(
+                            "COLUMN_LIST",
+                            help="Comma-separated columns to extract; empty for all"
+                        ),
+                        "WHERE_CLAUSE": st.column_config.TextColumn(
+                            "WHERE_CLAUSE",
+                            help="SQL condition applied at the source; empty for all rows"
                         )
                     }
                 )
@@ -359,38 +540,11 @@ def metadata_config_page():
                 # Add Save Changes button
                 if st.button("Save Changes"):
                     try:
-                        # Update all rows that weren't selected for deletion
-                        for _, row in edited_df[~edited_df["Select"]].iterrows():
-                            update_query = """
-                            UPDATE metadata_config
-                            SET source_type = ?, driver_type = ?, logical_name = ?,
-                                hostname = ?, port = ?, database_name = ?, schema_name = ?,
-                                table_name = ?, source_url = ?, endpoint = ?, load_type = ?,
-                                primary_key = ?, delta_column = ?, delta_value = ?
-                            WHERE id = ?
-                            """
-                            
-                            params = (
-                                str(row["SOURCE_TYPE"]),
-                                str(row["DRIVER_TYPE"]),
-                                str(row["LOGICAL_NAME"]),
-                                str(row["HOSTNAME"]),
-                                str(row["PORT"]),
-                                str(row["DATABASE_NAME"]),
-                                str(row["SCHEMA_NAME"]),
-                                str(row["TABLE_NAME"]),
-                                str(row["SOURCE_URL"]),
-                                str(row["ENDPOINT"]),
-                                str(row["LOAD_TYPE"]),
-                                str(row["PRIMARY_KEY"]),
-                                str(row["DELTA_COLUMN"]),
-                                str(row["DELTA_VALUE"]),
-                                int(row["ID"])
-                            )
-                            
-                            execute_query(update_query, params=params)
+                        # Only rows that were edited and not selected for deletion are written
+                        changed = get_changed_rows(df, edited_df[~edited_df["Select"]])
+                        apply_metadata_edits(changed, [])
                         
-                        st.success("Changes saved successfully!")
+                        st.success(f"Saved changes to {len(changed)} configuration(s).")
                         st.rerun()
                         
                     except Exception as e:
@@ -400,13 +554,8 @@ def metadata_config_page():
                 if edited_df['Select'].any():
                     if st.button("Delete Selected Rows", type="secondary"):
                         try:
-                            # Get IDs of selected rows and convert to Python int
-                            to_delete = [int(id) for id in edited_df[edited_df["Select"]]["ID"].tolist()]
-                            
-                            # Delete selected rows
-                            delete_query = "DELETE FROM metadata_config WHERE id = ?"
-                            for id in to_delete:
-                                execute_query(delete_query, params=(id,))
+                            to_delete = edited_df[edited_df["Select"]]["ID"].tolist()
+                            apply_metadata_edits(edited_df.iloc[0:0], to_delete)
                             
                             st.success("Selected rows deleted successfully!")
                             st.rerun()
@@ -4,14 +4,19 @@ import time
 import altair as alt
 from datetime import datetime, timedelta
 from src.db.duckdb_connection import execute_query
-from src.pipelines.dlt_pipeline import run_pipeline_with_creds
+from src.db.query_cache import cached
+from src.pipelines.rollups import build_rollup_filters, merge_histograms, histogram_quantile, duration_std
+from src.pipelines.run_queue import enqueue_run, ensure_dispatcher
 import threading
-import numpy as np
 
 REFRESH_INTERVAL = 10  # seconds
 
-def load_log_data():
-    query = """
+LOG_COLUMNS = ["id", "pipeline_id", "pipeline_name", "event", "log_message", "duration", "dataset_name", "table_name", "source_url", "timestamp", "rows_loaded"]
+LOG_TAIL_MAX_ROWS = 5000  # most recent log rows kept in the session
+
+def tail_log_data(last_seen_id=None, limit=LOG_TAIL_MAX_ROWS):
+    """Return log rows newer than `last_seen_id`, oldest first; the latest `limit` on first load."""
+    query = f"""
     SELECT
         l.id,
         l.pipeline_id,
@@ -22,18 +27,35 @@ def load_log_data():
         l.dataset_name,
         l.target_table AS table_name,
         l.source_url,
-        l.timestamp
+        l.timestamp,
+        l.rows_loaded
     FROM pipeline_logs l
+    WHERE l.id > ?
     ORDER BY l.id DESC
+    LIMIT {int(limit)}
+    """
+    rows = execute_query(query, (last_seen_id if last_seen_id is not None else -1,), fetch=True)
+    return list(reversed(rows))
+
+def load_log_data():
+    """
+    Return recent log rows, newest first. The frame lives in session state and each call
+    only fetches rows added since the last one.
     """
-    rows = execute_query(query, fetch=True)
-    columns = ["id", "pipeline_id", "pipeline_name", "event", "log_message", "duration", "dataset_name", "table_name", "source_url", "timestamp"]
-    df = pd.DataFrame(rows, columns=columns)
-    if not df.empty:
-        df["timestamp"] = pd.to_datetime(df["timestamp"])
-        df["duration"] = pd.to_numeric(df["duration"], errors="coerce")
-        df["row_estimate"] = df["log_message"].str.extract(r'Rows Loaded: (\d+)').astype(float)
-    return df
+    df = st.session_state.get("log_frame")
+    new_rows = tail_log_data(st.session_state.get("log_last_seen_id"))
+    if new_rows:
+        new_df = pd.DataFrame(new_rows, columns=LOG_COLUMNS)
+        new_df["timestamp"] = pd.to_datetime(new_df["timestamp"])
+        new_df["duration"] = pd.to_numeric(new_df["duration"], errors="coerce")
+        new_df["rows_loaded"] = pd.to_numeric(new_df["rows_loaded"], errors="coerce")
+        df = new_df if df is None or df.empty else pd.concat([df, new_df], ignore_index=True)
+        df = df.tail(LOG_TAIL_MAX_ROWS).reset_index(drop=True)
+        st.session_state.log_frame = df
+        st.session_state.log_last_seen_id = int(new_df["id"].iloc[-1])
+    if df is None:
+        return pd.DataFrame(columns=LOG_COLUMNS)
+    return df.iloc[::-1]
 
 def get_pipeline_configs():
     result = execute_query("SELECT id, name FROM pipelines ORDER BY id DESC", fetch=True)
@@ -43,7 +65,7 @@ def display_summary(df):
     total_runs = len(df)
     completed = df[df["event"] == "completed"]
     errors = df[df["event"] == "error"]
-    total_rows = completed["row_estimate"].sum()
+    total_rows = completed["rows_loaded"].sum()
     avg_duration = completed["duration"].mean()
 
     col1, col2, col3, col4 = st.columns(4)
@@ -58,17 +80,14 @@ def retry_button(row, pipeline_configs):
 
     key = f"retry_{row['id']}"
     if st.button(f"🔁 Retry `{row['pipeline_name']}`", key=key):
-        st.toast("Retrying pipeline...")
-
-        def rerun():
-            creds = st.session_state.get("snowflake_creds", {})
-            run_pipeline_with_creds(
-                pipeline_name=row["pipeline_name"],
-                dataset_name=row["dataset_name"],
-                table_name=row["table_name"],
-                creds=creds
-            )
-        threading.Thread(target=rerun, daemon=True).start()
+        creds = st.session_state.get("snowflake_creds")
+        if not creds:
+            st.error("No Snowflake credentials found. Please set them in the Settings page first.")
+            return
+        # Retries go through the run queue like every other trigger
+        ensure_dispatcher(dict(creds))
+        enqueue_run(row["pipeline_name"], trigger="retry")
+        st.toast("Retry queued...")
 
 def make_duration_chart(df):
     chart = alt.Chart(df).mark_line(point=True).encode(
@@ -82,52 +101,149 @@ def make_duration_chart(df):
 def make_rows_chart(df):
     chart = alt.Chart(df).mark_bar().encode(
         x="timestamp:T",
-        y="row_estimate:Q",
+        y="rows_loaded:Q",
         color="pipeline_name:N",
-        tooltip=["pipeline_name", "timestamp", "row_estimate"]
+        tooltip=["pipeline_name", "timestamp", "rows_loaded"]
     ).properties(title="Rows Loaded per Run", height=250)
     return chart
 
+@cached("run_rollups", ttl=300)
 def get_pipeline_names():
     """Get unique pipeline names for the dropdown."""
-    query = "SELECT DISTINCT pipeline_name FROM pipeline_runs ORDER BY pipeline_name"
+    query = "SELECT DISTINCT pipeline_name FROM run_rollups ORDER BY pipeline_name"
     results = execute_query(query, fetch=True)
     return [row[0] for row in results]
 
-def get_monitoring_data(filters=None):
-    """Fetch monitoring data with optional filters."""
-    query = """
-    SELECT 
-        pr.pipeline_name,
-        pr.start_time,
-        pr.end_time,
-        pr.status,
-        pr.duration,
-        pr.rows_processed,
-        pr.error_message,
-        pr.extract_status,
-        pr.normalize_status,
-        pr.load_status,
-        p.dataset_name,
-        p.target_table
-    FROM pipeline_runs pr
-    LEFT JOIN pipelines p ON pr.pipeline_id = p.id
-    WHERE 1=1
-    """
-    
+def build_run_filters(filters=None):
+    """Return the WHERE clause and parameters for the dashboard filters on pipeline_runs."""
+    where = "WHERE 1=1"
     params = []
     if filters:
         if filters.get('pipeline_name'):
-            query += " AND pr.pipeline_name = ?"
+            where += " AND pipeline_name = ?"
             params.append(filters['pipeline_name'])
         if filters.get('date_range'):
             start_date = datetime.combine(filters['date_range'][0], datetime.min.time())
-            end_date = datetime.combine(filters['date_range'][1], datetime.max.time())
-            query += " AND pr.start_time >= ? AND pr.start_time <= ?"
+            end_date = datetime.combine(filters['date_range'][-1], datetime.max.time())
+            where += " AND start_time >= ? AND start_time <= ?"
             params.extend([start_date, end_date])
-    
-    query += " ORDER BY pr.start_time DESC"
-    return execute_query(query, params=tuple(params) if params else None, fetch=True)
+    return where, tuple(params)
+
+def summarize_rollups(runs, successes, rows_sum, duration_count, duration_sum, duration_sq_sum, histograms):
+    """Success rate, duration mean/std and percentiles from summed rollup counters."""
+    histogram = merge_histograms(histograms)
+    return {
+        "success_rate": successes / runs * 100 if runs else None,
+        "avg_duration": duration_sum / duration_count if duration_count else None,
+        "duration_std": duration_std(duration_count, duration_sum, duration_sq_sum),
+        "p50": histogram_quantile(histogram, 0.5),
+        "p95": histogram_quantile(histogram, 0.95),
+        "p99": histogram_quantile(histogram, 0.99),
+        "avg_rows": rows_sum / runs if runs else None,
+    }
+
+@cached("run_rollups")
+def get_overall_health(filters=None):
+    """Run counts, success rate, totals and duration percentiles from the daily rollups."""
+    where, params = build_rollup_filters(filters)
+    query = f"""
+    SELECT
+        COALESCE(SUM(runs), 0), COALESCE(SUM(successes), 0), COALESCE(SUM(failures), 0),
+        COALESCE(SUM(rows_sum), 0), COALESCE(SUM(duration_count), 0),
+        COALESCE(SUM(duration_sum), 0), COALESCE(SUM(duration_sq_sum), 0),
+        list(duration_histogram)
+    FROM run_rollups
+    {where}
+    """
+    runs, successes, failures, rows_sum, duration_count, duration_sum, duration_sq_sum, histograms = \
+        execute_query(query, params, fetch=True)[0]
+    health = summarize_rollups(runs, successes, rows_sum, duration_count, duration_sum, duration_sq_sum, histograms)
+    health.update({"total_runs": runs, "failed_runs": failures, "total_rows": rows_sum})
+    return health
+
+@cached("run_rollups")
+def get_pipeline_summary(filters=None):
+    """Per-pipeline reliability and duration statistics from the daily rollups."""
+    where, params = build_rollup_filters(filters)
+    query = f"""
+    SELECT
+        pipeline_name, SUM(runs), SUM(successes), SUM(failures), SUM(rows_sum),
+        SUM(duration_count), SUM(duration_sum), SUM(duration_sq_sum), list(duration_histogram)
+    FROM run_rollups
+    {where}
+    GROUP BY pipeline_name
+    ORDER BY pipeline_name
+    """
+    summary = []
+    for name, runs, successes, failures, rows_sum, count, total, sq_total, histograms in execute_query(query, params, fetch=True):
+        stats = summarize_rollups(runs, successes, rows_sum, count, total, sq_total, histograms)
+        summary.append((
+            name, stats["success_rate"], stats["avg_duration"], stats["duration_std"],
+            stats["p50"], stats["p95"], stats["p99"], stats["avg_rows"], rows_sum, failures
+        ))
+    return pd.DataFrame(summary, columns=[
+        "pipeline_name", "Success Rate (%)", "Avg Duration (s)", "Duration Std (s)",
+        "p50 (s)", "p95 (s)", "p99 (s)", "Avg Rows", "Total Rows", "Failed Runs"
+    ])
+
+@cached("run_rollups")
+def get_duration_trend(filters=None):
+    """Daily mean and p95 duration per pipeline."""
+    where, params = build_rollup_filters(filters)
+    query = f"""
+    SELECT pipeline_name, bucket_start, duration_sum / duration_count, duration_histogram
+    FROM run_rollups
+    {where} AND duration_count > 0
+    ORDER BY bucket_start
+    """
+    rows = [
+        (name, day, avg_duration, histogram_quantile(histogram, 0.95))
+        for name, day, avg_duration, histogram in execute_query(query, params, fetch=True)
+    ]
+    return pd.DataFrame(rows, columns=["pipeline_name", "day", "avg_duration", "p95_duration"])
+
+@cached("run_rollups")
+def get_hourly_runs(filters=None, hours=48):
+    """Successful and failed runs per hour over the last `hours`, from the hourly rollups."""
+    where, params = build_rollup_filters({"pipeline_name": (filters or {}).get("pipeline_name")}, grain="hour")
+    query = f"""
+    SELECT bucket_start AS hour, SUM(successes) AS successes, SUM(failures) AS failures
+    FROM run_rollups
+    {where} AND bucket_start >= ?
+    GROUP BY bucket_start
+    ORDER BY bucket_start
+    """
+    rows = execute_query(query, params + (datetime.now() - timedelta(hours=hours),), fetch=True)
+    df = pd.DataFrame(rows, columns=["hour", "successes", "failures"])
+    return df.melt(id_vars="hour", var_name="outcome", value_name="runs")
+
+@cached("run_rollups")
+def get_stage_failures(filters=None):
+    where, params = build_rollup_filters(filters)
+    query = f"""
+    SELECT
+        COALESCE(SUM(extract_failures), 0),
+        COALESCE(SUM(normalize_failures), 0),
+        COALESCE(SUM(load_failures), 0)
+    FROM run_rollups
+    {where}
+    """
+    extract, normalize, load = execute_query(query, params, fetch=True)[0]
+    return pd.DataFrame({'Stage': ['Extract', 'Normalize', 'Load'], 'Failures': [extract, normalize, load]})
+
+@cached("pipeline_runs")
+def get_failed_runs(filters=None, limit=100):
+    """The most recent failed runs, for the failure table."""
+    where, params = build_run_filters(filters)
+    query = f"""
+    SELECT pipeline_name, strftime(start_time, '%Y-%m-%d %H:%M:%S') AS start_time, error_message
+    FROM pipeline_runs
+    {where} AND status = 'failed'
+    ORDER BY start_time DESC
+    LIMIT {int(limit)}
+    """
+    rows = execute_query(query, params or None, fetch=True)
+    return pd.DataFrame(rows, columns=["pipeline_name", "start_time", "error_message"])
 
 def monitoring_dashboard():
     st.title("📊 ETL Monitoring Dashboard")
@@ -159,55 +275,47 @@ def monitoring_dashboard():
     if date_range:
         filters['date_range'] = date_range
     
-    # Fetch monitoring data
+    # Only aggregated results leave DuckDB
     with st.spinner("Loading monitoring data..."):
-        data = get_monitoring_data(filters)
+        health = get_overall_health(filters)
     
-    if not data:
+    if not health["total_runs"]:
         st.info("No monitoring data found for the selected filters.")
         return
     
-    # Convert to DataFrame
-    df = pd.DataFrame(data, columns=[
-        "pipeline_name", "start_time", "end_time", "status", "duration",
-        "rows_processed", "error_message", "extract_status", "normalize_status",
-        "load_status", "dataset_name", "target_table"
-    ])
-    
     # Overall Health Metrics
     st.subheader("🎯 Overall Health")
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        success_rate = len(df[df['status'] == 'completed']) / len(df) * 100
-        st.metric("Success Rate", f"{success_rate:.1f}%")
+        st.metric("Success Rate", f"{health['success_rate']:.1f}%")
     
     with col2:
-        avg_duration = df[df['duration'].notna()]['duration'].mean()
-        st.metric("Avg Duration", f"{avg_duration:.1f}s")
+        avg_duration = health["avg_duration"]
+        st.metric("Avg Duration", f"{avg_duration:.1f}s" if avg_duration is not None else "N/A")
     
     with col3:
-        total_rows = df[df['rows_processed'].notna()]['rows_processed'].sum()
-        st.metric("Total Rows", f"{total_rows:,}")
+        st.metric("Total Rows", f"{int(health['total_rows']):,}")
     
     with col4:
-        failed_runs = len(df[df['status'] == 'failed'])
-        st.metric("Failed Runs", failed_runs)
+        st.metric("Failed Runs", health["failed_runs"])
+    
+    if health["p50"] is not None:
+        col1, col2, col3 = st.columns(3)
+        col1.metric("p50 Duration", f"{health['p50']:.1f}s")
+        col2.metric("p95 Duration", f"{health['p95']:.1f}s")
+        col3.metric("p99 Duration", f"{health['p99']:.1f}s")
     
     # Pipeline Performance
     st.subheader("⚡ Pipeline Performance")
     
-    # Success rate by pipeline
-    success_by_pipeline = df.groupby('pipeline_name').agg({
-        'status': lambda x: (x == 'completed').mean() * 100,
-        'duration': 'mean',
-        'rows_processed': 'mean'
-    }).reset_index()
+    summary_df = get_pipeline_summary(filters)
     
-    success_chart = alt.Chart(success_by_pipeline).mark_bar().encode(
+    # Success rate by pipeline
+    success_chart = alt.Chart(summary_df).mark_bar().encode(
         x='pipeline_name:N',
-        y='status:Q',
-        tooltip=['pipeline_name', alt.Tooltip('status:Q', format='.1f')]
+        y=alt.Y('Success Rate (%):Q', title='Success Rate (%)'),
+        tooltip=['pipeline_name', alt.Tooltip('Success Rate (%):Q', format='.1f')]
     ).properties(
         title='Success Rate by Pipeline',
         width='container'
@@ -215,28 +323,43 @@ def monitoring_dashboard():
     st.altair_chart(success_chart, use_container_width=True)
     
     # Duration trends
-    duration_df = df[['start_time', 'duration', 'pipeline_name']].dropna(subset=['duration'])
+    duration_df = get_duration_trend(filters)
     if not duration_df.empty:
-        duration_chart = alt.Chart(duration_df).mark_line().encode(
-            x='start_time:T',
-            y='duration:Q',
+        duration_chart = alt.Chart(duration_df).mark_line(point=True).encode(
+            x='day:T',
+            y=alt.Y('avg_duration:Q', title='Avg Duration (s)'),
             color='pipeline_name:N',
-            tooltip=['pipeline_name', 'start_time', alt.Tooltip('duration:Q', format='.1f')]
+            tooltip=['pipeline_name', 'day',
+                     alt.Tooltip('avg_duration:Q', format='.1f'),
+                     alt.Tooltip('p95_duration:Q', format='.1f')]
         ).properties(
-            title='Pipeline Duration Trends',
+            title='Pipeline Duration Trends (daily)',
             width='container'
         )
         st.altair_chart(duration_chart, use_container_width=True)
     
+    # Recent activity from the hourly rollups
+    hourly_df = get_hourly_runs(filters)
+    if not hourly_df.empty:
+        hourly_chart = alt.Chart(hourly_df).mark_bar().encode(
+            x='hour:T',
+            y='runs:Q',
+            color='outcome:N',
+            tooltip=['hour', 'outcome', 'runs']
+        ).properties(
+            title='Runs per Hour (last 48 hours)',
+            width='container'
+        )
+        st.altair_chart(hourly_chart, use_container_width=True)
+    
     # Failure Analysis
     st.subheader("⚠️ Failure Analysis")
     
     # Failed runs table
-    failed_runs = df[df['status'] == 'failed'].copy()
-    if not failed_runs.empty:
-        failed_runs['start_time'] = pd.to_datetime(failed_runs['start_time']).dt.strftime('%Y-%m-%d %H:%M:%S')
+    failed_df = get_failed_runs(filters)
+    if not failed_df.empty:
         st.dataframe(
-            failed_runs[['pipeline_name', 'start_time', 'error_message']],
+            failed_df,
             hide_index=True,
             column_config={
                 'pipeline_name': 'Pipeline',
@@ -248,14 +371,7 @@ def monitoring_dashboard():
         st.info("No failures found in the selected time period.")
     
     # Stage-wise failure analysis
-    stage_failures = pd.DataFrame({
-        'Stage': ['Extract', 'Normalize', 'Load'],
-        'Failures': [
-            len(df[df['extract_status'] == 'failed']),
-            len(df[df['normalize_status'] == 'failed']),
-            len(df[df['load_status'] == 'failed'])
-        ]
-    })
+    stage_failures = get_stage_failures(filters)
     
     stage_chart = alt.Chart(stage_failures).mark_bar().encode(
         x='Stage:N',
@@ -270,44 +386,41 @@ def monitoring_dashboard():
     # Pipeline Details
     st.subheader("📋 Pipeline Details")
     
-    # Define named functions for aggregation
-    def success_rate(x):
-        return (x == 'completed').mean() * 100
-    
-    def failed_count(x):
-        return (x == 'failed').sum()
-    
-    # Summary table
-    summary_df = df.groupby('pipeline_name').agg({
-        'status': [success_rate, failed_count],
-        'duration': ['mean', 'std'],
-        'rows_processed': ['mean', 'sum']
-    }).round(2)
-    
-    # Create a new DataFrame with the correct column names
-    summary_df_new = pd.DataFrame({
-        'pipeline_name': summary_df.index,
-        'Success Rate (%)': summary_df[('status', 'success_rate')],
-        'Avg Duration (s)': summary_df[('duration', 'mean')],
-        'Duration Std (s)': summary_df[('duration', 'std')],
-        'Avg Rows': summary_df[('rows_processed', 'mean')],
-        'Total Rows': summary_df[('rows_processed', 'sum')],
-        'Failed Runs': summary_df[('status', 'failed_count')]
-    })
-    
     st.dataframe(
-        summary_df_new,
+        summary_df,
         hide_index=True,
         column_config={
             'pipeline_name': 'Pipeline',
             'Success Rate (%)': st.column_config.NumberColumn(format='%.1f'),
             'Avg Duration (s)': st.column_config.NumberColumn(format='%.1f'),
             'Duration Std (s)': st.column_config.NumberColumn(format='%.1f'),
+            'p50 (s)': st.column_config.NumberColumn(format='%.1f'),
+            'p95 (s)': st.column_config.NumberColumn(format='%.1f'),
+            'p99 (s)': st.column_config.NumberColumn(format='%.1f'),
             'Avg Rows': st.column_config.NumberColumn(format='%.0f'),
             'Total Rows': st.column_config.NumberColumn(format='%.0f'),
             'Failed Runs': st.column_config.NumberColumn(format='%.0f')
         }
     )
 
+    # Recent log events, tailed incrementally into session state
+    st.subheader("📜 Recent Log Events")
+    log_df = load_log_data()
+    if not log_df.empty:
+        st.dataframe(
+            log_df[["timestamp", "pipeline_name", "event", "rows_loaded", "duration", "log_message"]].head(50),
+            hide_index=True,
+            column_config={
+                'timestamp': 'Time',
+                'pipeline_name': 'Pipeline',
+                'event': 'Event',
+                'rows_loaded': st.column_config.NumberColumn('Rows Loaded', format='%.0f'),
+                'duration': st.column_config.NumberColumn('Duration (s)', format='%.1f'),
+                'log_message': 'Message'
+            }
+        )
+    else:
+        st.info("No log events yet.")
+
 if __name__ == "__main__":
     monitoring_dashboard()
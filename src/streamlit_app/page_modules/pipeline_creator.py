@@ -1,15 +1,12 @@
 import streamlit as st
-import threading
 import logging
 import json
 import os
 import time
 from datetime import datetime
 import pandas as pd
-from src.pipelines.dlt_pipeline import run_pipeline_with_creds
 from src.db.duckdb_connection import execute_query
-import dlt
-from sqlalchemy import text
+from src.pipelines.run_queue import enqueue_run, ensure_dispatcher
 
 CONFIG_DIR = "config"
 os.makedirs(CONFIG_DIR, exist_ok=True)
@@ -65,11 +62,17 @@ def save_source_config(source_key, config_data):
         json.dump(config_data, f, indent=2, default=str)
 
 
-@dlt.source
 def selected_tables_source(engine, schema: str, table_names: list[str]):
-    logging.info(f"Creating source from tables: {table_names} in schema: {schema}")
-    resources = {tbl: dlt.sources.sql_database.sql_table(engine, table=tbl, schema=schema) for tbl in table_names}
-    return resources
+    # dlt is imported here so opening the page does not load it
+    import dlt
+    from dlt.sources.sql_database import sql_table
+
+    @dlt.source(name="selected_tables_source")
+    def source():
+        logging.info(f"Creating source from tables: {table_names} in schema: {schema}")
+        return {tbl: sql_table(engine, table=tbl, schema=schema) for tbl in table_names}
+
+    return source()
 
 
 def get_source_configs():
@@ -141,7 +144,8 @@ def generate_pipeline_config(selected_metadata_ids, load_type):
     SELECT 
         id, source_type, driver_type, logical_name, hostname, port,
         database_name, schema_name, table_name, source_url, endpoint,
-        load_type, primary_key, delta_column, delta_value
+        load_type, primary_key, delta_column, delta_value,
+        column_list, where_clause
     FROM metadata_config
     WHERE id IN ({id_placeholders})
     ORDER BY source_type, logical_name, database_name, schema_name, table_name
@@ -178,7 +182,9 @@ def generate_pipeline_config(selected_metadata_ids, load_type):
             "table_name": record[8],
             "primary_key": record[12],
             "delta_column": record[13],
-            "delta_value": record[14]
+            "delta_value": record[14],
+            "columns": record[15],
+            "where": record[16]
         })
     
     # Generate configuration for each source group
@@ -196,12 +202,17 @@ def generate_pipeline_config(selected_metadata_ids, load_type):
                 "schema": group["schema_name"],
                 "incremental_type": group["load_type"].upper(),
                 "use_parallel": True,
-                "chunk_size": 100000
+                "chunk_size": 100000,
+                "adaptive_chunking": True,
+                "stream_results": True,
+                "fetch_size": 10000
             }
             
             if config["mode"] == "sql_table":
                 # Single table mode
                 config["table"] = group["tables"][0]["table_name"]
+                config["columns"] = group["tables"][0]["columns"]
+                config["where"] = group["tables"][0]["where"]
                 if group["load_type"] == "incremental":
                     config["primary_key"] = group["tables"][0]["primary_key"]
                     config["delta_column"] = group["tables"][0]["delta_column"]
@@ -209,6 +220,11 @@ def generate_pipeline_config(selected_metadata_ids, load_type):
             else:
                 # Multiple tables mode
                 config["tables"] = [t["table_name"] for t in group["tables"]]
+                config["table_filters"] = {
+                    t["table_name"]: {"columns": t["columns"], "where": t["where"]}
+                    for t in group["tables"]
+                    if t["columns"] or t["where"]
+                }
                 
                 # For incremental loads, we need to handle the incremental settings
                 if group["load_type"] == "incremental":
@@ -216,6 +232,10 @@ def generate_pipeline_config(selected_metadata_ids, load_type):
                     config["primary_key"] = group["tables"][0]["primary_key"]
                     config["delta_column"] = group["tables"][0]["delta_column"]
                     config["delta_value"] = group["tables"][0]["delta_value"]
+            
+            # Change tracking and diff loads merge on the primary key
+            if group["load_type"].lower() in ("cdc", "diff"):
+                config["primary_key"] = group["tables"][0]["primary_key"]
         else:
             # API source configuration
             config = {
@@ -494,6 +514,9 @@ def pipeline_creator_page():
                         "mode": "sql_table",  # default mode
                         "use_parallel": True,
                         "chunk_size": 100000,
+                        "adaptive_chunking": True,
+                        "stream_results": True,
+                        "fetch_size": 10000,
                         "incremental_type": "FULL"
                     }
                     
@@ -564,6 +587,18 @@ def pipeline_creator_page():
                         db_config["table"] = table_name
                         if schema_name:
                             db_config["schema"] = schema_name
+                        columns = st.text_input(
+                            "Columns (comma-separated, leave empty for all)",
+                            placeholder="id,region,amount"
+                        )
+                        where = st.text_input(
+                            "Row Filter (SQL WHERE condition, optional)",
+                            placeholder="region = 'EU'"
+                        )
+                        if columns:
+                            db_config["columns"] = [c.strip() for c in columns.split(",")]
+                        if where:
+                            db_config["where"] = where
                     else:
                         db_config["mode"] = "sql_database"
                         schema_name = st.text_input("Schema Name", placeholder="public")
@@ -768,17 +803,10 @@ def pipeline_creator_page():
                             )
                         )
                         
-                        # Start the pipeline run in a separate thread
-                        thread = threading.Thread(
-                            target=run_pipeline_with_creds,
-                            args=(
-                                st.session_state.pipeline_name,
-                                st.session_state.dataset_name,
-                                st.session_state.target_table,
-                                load_snowflake_credentials()
-                            )
-                        )
-                        thread.start()
+                        # Queue the first run like any other; dlt is only loaded now
+                        from src.pipelines.dlt_pipeline import load_snowflake_credentials
+                        ensure_dispatcher(load_snowflake_credentials())
+                        enqueue_run(st.session_state.pipeline_name, trigger="created")
                         
                         st.success("Pipeline created and started successfully!")
                         time.sleep(1)  # Brief pause for user feedback
@@ -815,7 +843,7 @@ def pipeline_creator_page():
         # Load Type Selection - this applies to all objects in the pipeline
         load_type = st.selectbox(
             "Load Type", 
-            ["FULL", "INCREMENTAL", "CDC"],
+            ["FULL", "INCREMENTAL", "CDC", "DIFF"],
             help="Select the load type for this pipeline. All objects must use the same load strategy."
         )
         
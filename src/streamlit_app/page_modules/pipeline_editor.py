@@ -2,6 +2,8 @@ import streamlit as st
 import json
 import os
 from src.db.duckdb_connection import execute_query
+from src.db.query_cache import cached
+from src.pipelines.dag import get_dependencies, set_dependencies
 
 CONFIG_DIR = "config"
 os.makedirs(CONFIG_DIR, exist_ok=True)
@@ -11,6 +13,7 @@ def save_source_config(source_key, config_data):
     with open(config_path, "w") as f:
         json.dump(config_data, f, indent=2, default=str)
 
+@cached("pipelines", ttl=300)
 def get_pipeline_names():
     """Get all pipeline names for the dropdown."""
     query = "SELECT id, name FROM pipelines ORDER BY name"
@@ -20,7 +23,7 @@ def get_pipeline_names():
 def get_pipeline_details(pipeline_id):
     """Get pipeline details by ID."""
     query = """
-    SELECT name, dataset_name, target_table, source_url, source_config
+    SELECT name, dataset_name, target_table, source_url, source_config, priority, owner_group
     FROM pipelines
     WHERE id = ?
     """
@@ -31,7 +34,9 @@ def get_pipeline_details(pipeline_id):
             'dataset_name': result[0][1],
             'target_table': result[0][2],
             'source_url': result[0][3],
-            'source_config': result[0][4]
+            'source_config': result[0][4],
+            'priority': result[0][5],
+            'owner_group': result[0][6]
         }
     return None
 
@@ -90,12 +95,40 @@ def pipeline_editor_page():
                 "Authorization": f"Bearer {bearer_token}"
             }
     
+    # Queueing
+    st.subheader("📥 Queueing")
+    col1, col2 = st.columns(2)
+    with col1:
+        priority = st.slider(
+            "Priority", min_value=1, max_value=10, value=pipeline_details['priority'] or 5,
+            help="Higher priority runs are dispatched first when many runs are due at once."
+        )
+    with col2:
+        owner_group = st.text_input(
+            "Owner Group", value=pipeline_details['owner_group'] or "default",
+            help="Groups share dispatch capacity according to their weights in Settings."
+        )
+    
+    # Dependencies
+    st.subheader("🔗 Dependencies")
+    other_pipelines = {p[1]: p[0] for p in pipelines if p[0] != pipeline_id}
+    current_upstreams = get_dependencies().get(pipeline_id, set())
+    upstream_names = st.multiselect(
+        "Runs after",
+        options=list(other_pipelines.keys()),
+        default=[n for n, pid in other_pipelines.items() if pid in current_upstreams],
+        help="In a DAG run this pipeline starts as soon as all of these have succeeded."
+    )
+    
     # Action buttons
     col1, col2 = st.columns(2)
     
     with col1:
         if st.button("💾 Save Changes"):
             try:
+                # Rejects cycles before anything is saved
+                set_dependencies(pipeline_id, [other_pipelines[n] for n in upstream_names])
+                
                 # Update pipeline record
                 execute_query(
                     """
@@ -104,10 +137,13 @@ def pipeline_editor_page():
                         dataset_name = ?, 
                         target_table = ?,
                         source_url = ?,
-                        source_config = ?
+                        source_config = ?,
+                        priority = ?,
+                        owner_group = ?
                     WHERE id = ?
                     """,
-                    (name, dataset_name, target_table, source_url, json.dumps(source_config), pipeline_id)
+                    (name, dataset_name, target_table, source_url, json.dumps(source_config),
+                     priority, owner_group.strip() or "default", pipeline_id)
                 )
                 
                 # Update source config JSON file
@@ -4,7 +4,9 @@ import json
 import threading
 from datetime import datetime
 from src.db.duckdb_connection import execute_query
-from src.pipelines.dlt_pipeline import run_pipeline_with_creds
+from src.db.query_cache import cached
+from src.pipelines.dag import run_dag
+from src.pipelines.run_queue import enqueue_run, ensure_dispatcher, get_queue
 import logging
 
 def update_job_status(job_id, status, message=""):
@@ -12,26 +14,9 @@ def update_job_status(job_id, status, message=""):
     status_key = f"pipeline_{job_id}_status"
     st.session_state[status_key] = f"{status.capitalize()}: {message}" if message else status.capitalize()
 
-def run_pipeline_thread(pipeline_name, dataset_name, target_table, job_id, creds):
-    try:
-        # Update status to running
-        update_job_status(job_id, "running", "Pipeline started")
-        
-        # Run the pipeline with passed credentials
-        run_pipeline_with_creds(pipeline_name, dataset_name, target_table, creds)
-        
-        # Update status to success
-        update_job_status(job_id, "success", "Pipeline completed successfully")
-    except Exception as e:
-        error_msg = str(e)
-        logging.error(f"Pipeline failed: {error_msg}")
-        update_job_status(job_id, "failed", error_msg)
-
-def pipeline_list_page():
-    st.title("Pipeline Management")
-    st.caption("View and manage all created pipelines")
-    
-    # Fetch all pipelines from the database
+@cached("pipelines", ttl=300)
+def get_pipelines():
+    """Fetch all pipelines, newest first."""
     query = """
     SELECT 
         id, 
@@ -45,12 +30,51 @@ def pipeline_list_page():
     FROM pipelines
     ORDER BY created_at DESC
     """
-    pipelines = execute_query(query, fetch=True)
+    return execute_query(query, fetch=True)
+
+def pipeline_list_page():
+    st.title("Pipeline Management")
+    st.caption("View and manage all created pipelines")
+    
+    # Fetch all pipelines from the database
+    pipelines = get_pipelines()
     
     if not pipelines:
         st.info("No pipelines found. Create a pipeline first.")
         return
     
+    # Run every pipeline in dependency order, independent branches in parallel
+    if st.button("▶️ Run All in Dependency Order"):
+        creds = st.session_state.get("snowflake_creds")
+        if not creds:
+            st.error("No Snowflake credentials found. Please enter them above.")
+        else:
+            threading.Thread(target=run_dag, args=(dict(creds),), daemon=True).start()
+            st.success("DAG run started. Progress is shown per pipeline in Pipeline Runs.")
+    
+    last_dag = execute_query(
+        "SELECT id, status, duration, critical_path, critical_path_seconds FROM dag_runs ORDER BY id DESC LIMIT 1",
+        fetch=True
+    )
+    if last_dag and last_dag[0][3]:
+        dag_id, dag_status, dag_duration, path, path_seconds = last_dag[0]
+        st.caption(
+            f"Last DAG run #{dag_id}: {dag_status} in {dag_duration}s. "
+            f"Critical path ({path_seconds}s): {' → '.join(json.loads(path))}"
+        )
+    
+    # Runs waiting for the dispatcher
+    queue = get_queue()
+    if queue:
+        with st.expander(f"📥 Run Queue ({len(queue)})"):
+            st.dataframe(
+                pd.DataFrame(queue, columns=[
+                    "ID", "Pipeline", "Group", "Priority", "Status", "Trigger", "Queued At", "Started At"
+                ]),
+                hide_index=True,
+                use_container_width=True
+            )
+    
     # Group pipelines by schedule type
     scheduled_pipelines = []
     ad_hoc_pipelines = []
@@ -211,17 +235,10 @@ def pipeline_list_page():
                             if not creds:
                                 st.error("No Snowflake credentials found. Please enter them above.")
                             else:
-                                threading.Thread(
-                                    target=run_pipeline_thread,
-                                    args=(
-                                        pipeline['name'],
-                                        pipeline['dataset_name'],
-                                        pipeline['target_table'],
-                                        pipeline['id'],
-                                        creds
-                                    ),
-                                    daemon=True
-                                ).start()
+                                # The dispatcher starts it by priority and group fair share
+                                ensure_dispatcher(dict(creds))
+                                enqueue_run(pipeline['name'])
+                                update_job_status(pipeline['id'], "running", "Queued")
                                 st.rerun()
                         
                         # Show status
@@ -295,17 +312,10 @@ def pipeline_list_page():
                             if not creds:
                                 st.error("No Snowflake credentials found. Please enter them above.")
                             else:
-                                threading.Thread(
-                                    target=run_pipeline_thread,
-                                    args=(
-                                        pipeline['name'],
-                                        pipeline['dataset_name'],
-                                        pipeline['target_table'],
-                                        pipeline['id'],
-                                        creds
-                                    ),
-                                    daemon=True
-                                ).start()
+                                # The dispatcher starts it by priority and group fair share
+                                ensure_dispatcher(dict(creds))
+                                enqueue_run(pipeline['name'])
+                                update_job_status(pipeline['id'], "running", "Queued")
                                 st.rerun()
                         
                         # Show status
@@ -2,35 +2,68 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
 from src.db.duckdb_connection import execute_query
+from src.db.query_cache import cached
 import altair as alt
 import time
-from src.pipelines.dlt_pipeline import run_pipeline_with_creds
+from src.pipelines.cancellation import cancel_run
+from src.pipelines.progress import latest_run
+from src.pipelines.rollups import build_rollup_filters
+from src.pipelines.run_queue import enqueue_run, ensure_dispatcher
 import json
 import os
-import threading
 import logging
 
 REFRESH_INTERVAL = 10  # seconds
+PROGRESS_REFRESH_SECONDS = 1
+RUNS_PAGE_SIZE = 25
 
 def get_progress_for_status(status):
     if status == 'completed':
         return 100
     elif status == 'running':
         return 50
-    elif status == 'failed':
+    elif status in ('failed', 'cancelled'):
         return 100  # Still show full bar but in error styling
     else:  # pending or None
         return 0
 
+@cached("pipeline_runs", ttl=300)
 def get_pipeline_names():
     """Get unique pipeline names for the dropdown."""
     query = "SELECT DISTINCT pipeline_name FROM pipeline_runs ORDER BY pipeline_name"
     results = execute_query(query, fetch=True)
     return [row[0] for row in results]
 
-def get_pipeline_runs(filters=None):
-    """Fetch pipeline runs with optional filters."""
-    query = """
+def build_run_filters(filters=None):
+    """Return the WHERE clause and parameters for the page filters on pipeline_runs (alias pr)."""
+    where = "WHERE 1=1"
+    params = []
+    if filters:
+        if filters.get('pipeline_name'):
+            where += " AND pr.pipeline_name = ?"
+            params.append(filters['pipeline_name'])
+        if filters.get('status'):
+            where += " AND pr.status = ?"
+            params.append(filters['status'])
+        if filters.get('date_range'):
+            start_date = datetime.combine(filters['date_range'][0], datetime.min.time())
+            end_date = datetime.combine(filters['date_range'][-1], datetime.max.time())
+            where += " AND pr.start_time >= ? AND pr.start_time <= ?"
+            params.extend([start_date, end_date])
+    return where, params
+
+@cached("pipeline_runs", "pipelines", "run_checkpoints", ttl=10)
+def get_pipeline_runs(filters=None, cursor=None, page_size=RUNS_PAGE_SIZE):
+    """
+    Fetch one page of runs, newest first. `cursor` is the (start_time, id) of the last run
+    on the previous page; keyset paging keeps every page as cheap as the first.
+    Returns page_size + 1 rows at most, so callers can tell whether a next page exists.
+    """
+    where, params = build_run_filters(filters)
+    if cursor:
+        where += " AND (pr.start_time < ? OR (pr.start_time = ? AND pr.id < ?))"
+        params.extend([cursor[0], cursor[0], cursor[1]])
+    query = f"""
     SELECT 
         pr.id,
         pr.pipeline_name,
@@ -40,39 +73,270 @@ def get_pipeline_runs(filters=None):
         pr.duration,
         pr.rows_processed,
         pr.error_message,
-        pr.extract_status,
-        pr.normalize_status,
-        pr.load_status,
         p.dataset_name,
         p.target_table,
         p.source_url,
-        pr.total_rows,
-        pr.total_chunks,
-        pr.processed_chunks,
-        pr.processed_rows,
-        pr.current_chunk,
-        pr.estimated_completion
+        rc.processed_rows AS checkpoint_rows
     FROM pipeline_runs pr
     LEFT JOIN pipelines p ON pr.pipeline_id = p.id
-    WHERE 1=1
+    LEFT JOIN run_checkpoints rc ON rc.run_id = pr.id
+    {where}
+    ORDER BY pr.start_time DESC, pr.id DESC
+    LIMIT {int(page_size) + 1}
+    """
+    return execute_query(query, params=tuple(params) if params else None, fetch=True)
+
+@cached("pipeline_runs", "run_rollups", ttl=10)
+def get_run_counts(filters=None):
     """
+    Number of runs per status matching the filters. Finished runs are summed from the daily
+    rollups; only the few runs still in progress are counted on pipeline_runs.
+    """
+    where, params = build_rollup_filters(filters)
+    completed, failed, cancelled = execute_query(
+        f"""
+        SELECT COALESCE(SUM(successes), 0), COALESCE(SUM(failures), 0), COALESCE(SUM(cancellations), 0)
+        FROM run_rollups
+        {where}
+        """,
+        params=params,
+        fetch=True
+    )[0]
+    where, params = build_run_filters(filters)
+    running = execute_query(
+        f"SELECT COUNT(*) FROM pipeline_runs pr {where} AND pr.status = 'running'",
+        params=tuple(params) if params else None,
+        fetch=True
+    )[0][0]
+    counts = {"running": running, "completed": completed, "failed": failed, "cancelled": cancelled}
+    if filters and filters.get('status'):
+        counts = {filters['status']: counts.get(filters['status'], 0)}
+    return counts
+
+@cached("pipeline_runs", "run_checkpoints", ttl=10)
+def get_run_details(run_id):
+    """Stage and chunk progress of a single run, loaded when its details are opened."""
+    result = execute_query(
+        """
+        SELECT extract_status, normalize_status, load_status, total_rows, total_chunks,
+               processed_chunks, processed_rows, current_chunk, estimated_completion, resumed_from
+        FROM pipeline_runs
+        WHERE id = ?
+        """,
+        (run_id,),
+        fetch=True
+    )
+    if not result:
+        return None
+    return dict(zip([
+        "extract_status", "normalize_status", "load_status", "total_rows", "total_chunks",
+        "processed_chunks", "processed_rows", "current_chunk", "estimated_completion", "resumed_from"
+    ], result[0]))
+
+@cached("pipeline_logs", ttl=10)
+def get_run_logs(run_id, limit=20):
+    return execute_query(
+        f"""
+        SELECT timestamp, event, log_message
+        FROM pipeline_logs
+        WHERE run_id = ?
+        ORDER BY id DESC
+        LIMIT {int(limit)}
+        """,
+        (run_id,),
+        fetch=True
+    )
+
+@cached("pipeline_runs", "pipelines", ttl=5)
+def get_running_runs():
+    """Runs still in progress, with their chunk progress."""
+    return execute_query(
+        """
+        SELECT 
+            pr.id, pr.pipeline_name, pr.start_time, pr.rows_processed,
+            pr.extract_status, pr.normalize_status, pr.load_status,
+            pr.total_rows, pr.total_chunks, pr.processed_chunks, pr.processed_rows,
+            pr.estimated_completion, p.dataset_name, p.target_table
+        FROM pipeline_runs pr
+        LEFT JOIN pipelines p ON pr.pipeline_id = p.id
+        WHERE pr.status = 'running'
+        ORDER BY pr.start_time DESC
+        """,
+        fetch=True
+    )
+
+def render_stage_progress(state):
+    for stage in ("extract", "normalize", "load"):
+        status = state.get(f"{stage}_status") or "pending"
+        st.progress(get_progress_for_status(status))
+        st.markdown(f"**{stage.capitalize()}:** {status}")
+
+@st.fragment(run_every=PROGRESS_REFRESH_SECONDS)
+def live_progress(pipeline_name, since):
+    """Follow a run started from this page; reads only the in-process progress bus."""
+    state = latest_run(pipeline_name, since=since)
+    if not state:
+        st.info(f"`{pipeline_name}` is starting, or queued behind a run already in progress...")
+        return
     
-    params = []
-    if filters:
-        if filters.get('pipeline_name'):
-            query += " AND pr.pipeline_name = ?"
-            params.append(filters['pipeline_name'])
-        if filters.get('status'):
-            query += " AND pr.status = ?"
-            params.append(filters['status'])
-        if filters.get('date_range'):
-            start_date = datetime.combine(filters['date_range'][0], datetime.min.time())
-            end_date = datetime.combine(filters['date_range'][1], datetime.max.time())
-            query += " AND pr.start_time >= ? AND pr.start_time <= ?"
-            params.extend([start_date, end_date])
+    st.markdown(f"**{pipeline_name}** - run {state['run_id']}")
+    render_stage_progress(state)
+    if state.get("total_chunks"):
+        st.progress(min(1.0, (state.get("processed_chunks") or 0) / state["total_chunks"]))
+        st.caption(f"Chunk {state.get('processed_chunks') or 0} of {state['total_chunks']} | "
+                   f"{state.get('processed_rows') or 0:,} rows extracted")
     
-    query += " ORDER BY pr.start_time DESC"
-    return execute_query(query, params=tuple(params) if params else None, fetch=True)
+    status = state.get("status")
+    if status == "completed":
+        duration, rows = state.get("duration"), state.get("rows_processed")
+        st.success(f"Pipeline completed: {rows:,} rows loaded in {duration:.2f} seconds"
+                   + (f" ({rows / duration:.2f} rows/sec)." if duration else "."))
+    elif status == "failed":
+        st.error(f"Pipeline failed: {state.get('error_message', 'check logs')}")
+    elif status == "cancelled":
+        st.warning("Pipeline was cancelled.")
+    else:
+        st.info(f"**Status:** {status} | running for {time.time() - state['started_at']:.0f} seconds")
+    
+    if status in ("completed", "failed", "cancelled"):
+        if st.button("Dismiss", key=f"dismiss_{pipeline_name}"):
+            st.session_state.live_runs.pop(pipeline_name, None)
+            st.rerun()
+
+@st.fragment(run_every=REFRESH_INTERVAL)
+def running_pipelines_section():
+    """Progress of in-flight runs; only this fragment reruns every REFRESH_INTERVAL seconds."""
+    running_pipelines = pd.DataFrame(get_running_runs(), columns=[
+        "id", "pipeline_name", "start_time", "rows_processed", "extract_status",
+        "normalize_status", "load_status", "total_rows", "total_chunks",
+        "processed_chunks", "processed_rows", "estimated_completion",
+        "dataset_name", "target_table"
+    ])
+    if not running_pipelines.empty:
+        st.subheader("🏃‍♂️ Currently Running Pipelines")
+        
+        # Custom styling for progress bars
+        st.markdown("""
+            <style>
+            .stProgress > div > div > div > div {
+                background-color: #1f77b4;  /* Extract color */
+            }
+            .stProgress > div > div > div > div:nth-child(2) {
+                background-color: #2ca02c;  /* Normalize color */
+            }
+            .stProgress > div > div > div > div:nth-child(3) {
+                background-color: #ff7f0e;  /* Load color */
+            }
+            </style>
+        """, unsafe_allow_html=True)
+        
+        # Create a progress tracker for each running pipeline
+        for _, row in running_pipelines.iterrows():
+            with st.expander(f"🔄 {row['pipeline_name']} - Running", expanded=True):
+                st.markdown(f"**Dataset:** `{row['dataset_name']}` | **Target Table:** `{row['target_table']}`")
+                
+                # Add chunk progress information
+                if row['total_chunks'] and row['total_chunks'] > 0:
+                    # Calculate percentage and ensure it's between 0-100
+                    chunk_percent = min(100, int((row['processed_chunks'] / row['total_chunks']) * 100))
+                    
+                    # Display progress bar
+                    progress_container = st.container()
+                    with progress_container:
+                        st.progress(chunk_percent / 100)
+                        
+                        # Create two columns for metrics
+                        col1, col2 = st.columns(2)
+                        with col1:
+                            st.metric("Progress", f"{chunk_percent}%")
+                            st.metric("Chunks", f"{row['processed_chunks']} of {row['total_chunks']}")
+                        
+                        with col2:
+                            st.metric("Rows Processed", f"{row['processed_rows']:,} of {row['total_rows']:,}")
+                            
+                            # Calculate and show rate if we have processed rows
+                            if row['processed_rows'] > 0 and row['start_time']:
+                                start_time = pd.to_datetime(row['start_time'])
+                                elapsed_seconds = (datetime.now() - start_time).total_seconds()
+                                if elapsed_seconds > 0:
+                                    rate = row['processed_rows'] / elapsed_seconds
+                                    st.metric("Rows/Second", f"{rate:.1f}")
+                    
+                    # Show estimated completion time if available
+                    if row['estimated_completion']:
+                        est_time = pd.to_datetime(row['estimated_completion'])
+                        time_remaining = (est_time - datetime.now()).total_seconds()
+                        if time_remaining > 0:
+                            minutes, seconds = divmod(int(time_remaining), 60)
+                            hours, minutes = divmod(minutes, 60)
+                            time_str = f"{hours}h {minutes}m {seconds}s" if hours > 0 else f"{minutes}m {seconds}s"
+                            st.info(f"⏱️ Estimated completion in: {time_str}")
+                
+                # Extract progress
+                extract_status = row['extract_status'] or 'pending'
+                extract_container = st.empty()
+                extract_progress = get_progress_for_status(extract_status)
+                extract_container.progress(extract_progress)
+                st.markdown(f"**Extract:** {extract_status}")
+                
+                # Normalize progress
+                normalize_status = row['normalize_status'] or 'pending'
+                normalize_container = st.empty()
+                normalize_progress = get_progress_for_status(normalize_status)
+                normalize_container.progress(normalize_progress)
+                st.markdown(f"**Normalize:** {normalize_status}")
+                
+                # Load progress
+                load_status = row['load_status'] or 'pending'
+                load_container = st.empty()
+                load_progress = get_progress_for_status(load_status)
+                load_container.progress(load_progress)
+                st.markdown(f"**Load:** {load_status}")
+                
+                # Show start time and running duration
+                if row['start_time']:
+                    start_time = pd.to_datetime(row['start_time'])
+                    current_time = datetime.now()
+                    running_duration = (current_time - start_time).total_seconds()
+                    st.markdown(f"**Started at:** {start_time.strftime('%Y-%m-%d %H:%M:%S')} | **Running for:** {running_duration:.2f} seconds")
+                
+                # Show any rows processed so far if available
+                if row['rows_processed']:
+                    st.markdown(f"**Rows processed so far:** {row['rows_processed']:,}")
+
+@st.fragment(run_every=REFRESH_INTERVAL)
+def recent_failures_section(limit=10):
+    """Latest failures, fetching only runs that ended since the previous refresh."""
+    failures = st.session_state.setdefault("recent_failures", [])
+    last_seen = st.session_state.get("recent_failures_seen")
+    new_failures = execute_query(
+        f"""
+        SELECT id, pipeline_name, end_time, error_message
+        FROM pipeline_runs
+        WHERE status = 'failed' AND end_time > ?
+        ORDER BY end_time DESC
+        LIMIT {int(limit)}
+        """,
+        (last_seen or datetime.now() - timedelta(days=1),),
+        fetch=True
+    )
+    if new_failures:
+        failures[:0] = new_failures
+        del failures[limit:]
+        st.session_state.recent_failures_seen = new_failures[0][2]
+    elif last_seen is None:
+        st.session_state.recent_failures_seen = datetime.now() - timedelta(days=1)
+    # Failures kept from earlier refreshes age out of the 24 hour window
+    cutoff = datetime.now() - timedelta(days=1)
+    failures[:] = [f for f in failures if f[2] >= cutoff]
+    
+    if failures:
+        st.subheader("⚠️ Recent Failures (last 24 hours)")
+        st.dataframe(
+            pd.DataFrame(failures, columns=["Run", "Pipeline", "Failed At", "Error"]),
+            hide_index=True,
+            use_container_width=True
+        )
 
 def pipeline_runs_page():
     # Clear any unnecessary session state data
@@ -97,14 +361,17 @@ def pipeline_runs_page():
     # Add a refresh button at the top right
     col1, col2 = st.columns([5, 1])
     with col1:
-        st.caption("Track pipeline execution status and performance. Auto-refresh is on.")
+        st.caption("Track pipeline execution status and performance. Running and failed runs refresh automatically.")
     with col2:
         if st.button("🔄 Refresh Now", key="manual_refresh"):
             st.rerun()
     
-    # Refresh timer
-    st_autorefresh = st.empty()
-    st_autorefresh.write("")
+    # Runs started from this page, followed live
+    if st.session_state.get("live_runs"):
+        st.subheader("🚀 Live Progress")
+        for live_pipeline, started in list(st.session_state.live_runs.items()):
+            with st.container(border=True):
+                live_progress(live_pipeline, started)
     
     # Filters
     st.subheader("🔍 Filters")
@@ -121,7 +388,7 @@ def pipeline_runs_page():
     with col2:
         status_filter = st.selectbox(
             "Status",
-            ["All", "running", "completed", "failed"],
+            ["All", "running", "completed", "failed", "cancelled"],
             index=0
         )
     
@@ -141,43 +408,61 @@ def pipeline_runs_page():
     if date_range:
         filters['date_range'] = date_range
     
-    # Fetch and display runs
+    # Paging restarts whenever the filters change
+    filter_key = repr(sorted(filters.items()))
+    if st.session_state.get("runs_filter_key") != filter_key:
+        st.session_state.runs_filter_key = filter_key
+        st.session_state.runs_page_cursors = [None]
+    cursors = st.session_state.runs_page_cursors
+    
+    # Fetch and display one page of runs
     with st.spinner("Loading pipeline runs..."):
-        runs = get_pipeline_runs(filters)
+        runs = get_pipeline_runs(filters, cursor=cursors[-1])
+        counts = get_run_counts(filters)
     
     if not runs:
         st.info("No pipeline runs found matching the filters.")
         return
     
+    has_next_page = len(runs) > RUNS_PAGE_SIZE
+    runs = runs[:RUNS_PAGE_SIZE]
+    
     # Convert to DataFrame
     df = pd.DataFrame(runs, columns=[
         "id", "pipeline_name", "start_time", "end_time", "status",
-        "duration", "rows_processed", "error_message", "extract_status",
-        "normalize_status", "load_status", "dataset_name", "target_table",
-        "source_url", "total_rows", "total_chunks", "processed_chunks",
-        "processed_rows", "current_chunk", "estimated_completion"
+        "duration", "rows_processed", "error_message", "dataset_name",
+        "target_table", "source_url", "checkpoint_rows"
     ])
     
-    # Debug info for chart data
-    st.caption(f"Showing data for {len(df)} runs")
+    st.caption(f"Showing page {len(cursors)} ({len(df)} of {sum(counts.values())} runs)")
     if pipeline_name != "All":
         st.caption(f"Filtered by pipeline: {pipeline_name}")
-        st.caption(f"Available data points: {len(df[df['duration'].notna()])} duration records, {len(df[df['rows_processed'].notna()])} rows records")
     
     # Display summary metrics
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        st.metric("Total Runs", len(df))
+        st.metric("Total Runs", sum(counts.values()))
     with col2:
-        st.metric("Running", len(df[df['status'] == 'running']))
+        st.metric("Running", counts.get('running', 0))
     with col3:
-        st.metric("Completed", len(df[df['status'] == 'completed']))
+        st.metric("Completed", counts.get('completed', 0))
     with col4:
-        st.metric("Failed", len(df[df['status'] == 'failed']))
+        st.metric("Failed", counts.get('failed', 0))
     
     # Display runs table
     st.subheader("📋 Past Pipeline Runs")
     
+    col1, col2, _ = st.columns([1, 1, 4])
+    with col1:
+        if st.button("⬅️ Newer", disabled=len(cursors) == 1, key="runs_prev_page"):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        if st.button("Older ➡️", disabled=not has_next_page, key="runs_next_page"):
+            last = df.iloc[-1]
+            cursors.append((last['start_time'].to_pydatetime(), int(last['id'])))
+            st.rerun()
+    
     # Format the DataFrame for display
     display_df = df.copy()
     display_df['start_time'] = pd.to_datetime(display_df['start_time']).dt.strftime('%Y-%m-%d %H:%M:%S')
@@ -188,162 +473,78 @@ def pipeline_runs_page():
     display_df['status'] = display_df['status'].map({
         'running': '🔄 Running',
         'completed': '✅ Completed',
-        'failed': '❌ Failed'
+        'failed': '❌ Failed',
+        'cancelled': '⏹️ Cancelled'
     })
     
     # Display the table with expandable rows
     for _, row in display_df.iterrows():
         with st.expander(f"{row['pipeline_name']} - {row['status']} ({row['start_time']})"):
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.markdown("**Pipeline Details**")
-                st.markdown(f"- **Dataset:** `{row['dataset_name']}`")
-                st.markdown(f"- **Target Table:** `{row['target_table']}`")
-                st.markdown(f"- **Duration:** {row['duration']} seconds" if row['duration'] else "- **Duration:** N/A")
-                st.markdown(f"- **Rows Processed:** {row['rows_processed']:,}" if row['rows_processed'] else "- **Rows Processed:** N/A")
+            st.markdown(
+                f"**Dataset:** `{row['dataset_name']}` | **Target Table:** `{row['target_table']}` | "
+                + (f"**Duration:** {row['duration']} seconds | " if row['duration'] else "**Duration:** N/A | ")
+                + (f"**Rows Processed:** {int(row['rows_processed']):,}" if pd.notna(row['rows_processed']) else "**Rows Processed:** N/A")
+            )
             
-            with col2:
-                st.markdown("**Stage Status**")
-                st.markdown(f"- **Extract:** {row['extract_status'] or 'N/A'}")
-                st.markdown(f"- **Normalize:** {row['normalize_status'] or 'N/A'}")
-                st.markdown(f"- **Load:** {row['load_status'] or 'N/A'}")
+            # Stage, chunk and log detail is only queried for runs the user opens
+            if st.toggle("Show details", key=f"details_{row['id']}"):
+                details = get_run_details(int(row['id']))
+                if details:
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.markdown("**Stage Status**")
+                        st.markdown(f"- **Extract:** {details['extract_status'] or 'N/A'}")
+                        st.markdown(f"- **Normalize:** {details['normalize_status'] or 'N/A'}")
+                        st.markdown(f"- **Load:** {details['load_status'] or 'N/A'}")
+                    with col2:
+                        st.markdown("**Chunk Progress**")
+                        if details['total_chunks']:
+                            st.markdown(f"- **Chunks:** {details['processed_chunks']} of {details['total_chunks']}")
+                            st.markdown(f"- **Rows:** {details['processed_rows'] or 0:,} of {details['total_rows'] or 0:,}")
+                        else:
+                            st.markdown("- Not chunked")
+                        if details['resumed_from']:
+                            st.markdown(f"- **Resumed from run:** {details['resumed_from']}")
+                logs = get_run_logs(int(row['id']))
+                if logs:
+                    st.markdown("**Logs**")
+                    st.dataframe(
+                        pd.DataFrame(logs, columns=["Time", "Event", "Message"]),
+                        hide_index=True,
+                        use_container_width=True
+                    )
             
             if row['error_message']:
                 st.error(f"**Error:** {row['error_message']}")
             
+            # Failed or cancelled checkpointed runs can continue from their last loaded segment
+            if row['status'] in ('❌ Failed', '⏹️ Cancelled') and pd.notna(row['checkpoint_rows']) and row['checkpoint_rows'] > 0:
+                st.caption(f"Checkpoint: {int(row['checkpoint_rows']):,} rows already loaded.")
+                if st.button("⏯️ Resume Run", key=f"resume_{row['id']}"):
+                    if "snowflake_creds" not in st.session_state:
+                        st.error("No Snowflake credentials found. Please set them in the Settings page first.")
+                    else:
+                        ensure_dispatcher(dict(st.session_state.snowflake_creds))
+                        enqueue_run(row['pipeline_name'], trigger="resume", resume_from=int(row['id']))
+                        st.success(f"Resuming run {row['id']} of {row['pipeline_name']}...")
+            
             # Action buttons
             col1, col2 = st.columns(2)
             with col1:
-                if row['status'] == 'running':
-                    st.button("Running...", key=f"disabled_{row['id']}", disabled=True)
+                if row['status'] == '🔄 Running':
+                    if st.button("⏹️ Cancel Run", key=f"cancel_{row['id']}"):
+                        cancel_run(int(row['id']))
+                        st.warning("Cancellation requested; the run stops after its current chunk.")
                 else:
                     if st.button(f"Run {row['pipeline_name']}", key=f"trigger_{row['id']}"):
-                        # Create a container for pipeline progress
-                        progress_container = st.container()
-                        
-                        # Capture credentials before starting the thread
                         if "snowflake_creds" not in st.session_state:
                             st.error("No Snowflake credentials found. Please set them in the Settings page first.")
                             return
-                            
-                        # Make a deep copy of credentials to ensure thread safety
-                        thread_creds = {
-                            'username': st.session_state.snowflake_creds['username'],
-                            'password': st.session_state.snowflake_creds['password'],
-                            'host': st.session_state.snowflake_creds['host'],
-                            'role': st.session_state.snowflake_creds['role'],
-                            'database': st.session_state.snowflake_creds['database'],
-                            'session_keep_alive': st.session_state.snowflake_creds.get('session_keep_alive', True)
-                        }
-                        
-                        with progress_container:
-                            st.markdown("### Pipeline Progress")
-                            
-                            # Extract stage
-                            extract_container = st.empty()
-                            extract_status_text = st.empty()
-                            
-                            # Normalize stage
-                            normalize_container = st.empty()
-                            normalize_status_text = st.empty()
-                            
-                            # Load stage
-                            load_container = st.empty()
-                            load_status_text = st.empty()
-                            
-                            # Overall status and metrics
-                            status_container = st.empty()
-                            metrics_container = st.empty()
-                            
-                            result_container = {"status": "Pipeline started...", "result": None}
-
-                            def run_pipeline_thread(creds):
-                                result_container["status"] = "Pipeline started..."
-                                logging.info("Thread using credentials: %s", 
-                                           {k: v for k, v in creds.items() if k != 'password'})
-                                res = run_pipeline_with_creds(row['pipeline_name'], row['dataset_name'], 
-                                                           row['target_table'], creds)
-                                if res is not None:
-                                    result_container["status"] = f"Pipeline completed: {res} rows loaded."
-                                    result_container["result"] = res
-                                else:
-                                    result_container["status"] = "Pipeline failed. Check logs."
-
-                            pipeline_thread = threading.Thread(target=run_pipeline_thread, args=(thread_creds,), daemon=True)
-                            pipeline_thread.start()
-
-                            # Update UI with progress
-                            while pipeline_thread.is_alive():
-                                run_status = execute_query(
-                                    """
-                                    SELECT status, extract_status, normalize_status, load_status, 
-                                           duration, rows_processed
-                                    FROM pipeline_runs 
-                                    WHERE pipeline_name = ? 
-                                    ORDER BY start_time DESC 
-                                    LIMIT 1
-                                    """,
-                                    (row['pipeline_name'],),
-                                    fetch=True
-                                )
-                                
-                                if run_status:
-                                    status, extract_status, normalize_status, load_status, duration, rows = run_status[0]
-                                    
-                                    # Update extract progress
-                                    extract_container.progress(get_progress_for_status(extract_status))
-                                    extract_status_text.markdown(f"**Extract:** {extract_status}")
-                                    
-                                    # Update normalize progress
-                                    normalize_container.progress(get_progress_for_status(normalize_status))
-                                    normalize_status_text.markdown(f"**Normalize:** {normalize_status}")
-                                    
-                                    # Update load progress
-                                    load_container.progress(get_progress_for_status(load_status))
-                                    load_status_text.markdown(f"**Load:** {load_status}")
-                                    
-                                    # Update overall status
-                                    status_container.info(f"**Status:** {status}")
-                                    
-                                    # Update metrics if available
-                                    if duration and rows:
-                                        metrics_container.markdown(f"""
-                                            ### 📊 Current Metrics
-                                            - **Duration:** {duration:.2f} seconds
-                                            - **Rows Processed:** {rows:,}
-                                        """)
-                                
-                                time.sleep(0.5)
-
-                            # Final update
-                            if result_container["result"] is not None:
-                                extract_status_text.markdown("✅ **Extraction complete**")
-                                normalize_status_text.markdown("✅ **Normalization complete**")
-                                load_status_text.markdown("✅ **Load complete**")
-                                status_container.success(result_container["status"])
-                                
-                                # Show final metrics
-                                final_metrics = execute_query(
-                                    """
-                                    SELECT duration, rows_processed
-                                    FROM pipeline_runs 
-                                    WHERE pipeline_name = ? 
-                                    ORDER BY start_time DESC 
-                                    LIMIT 1
-                                    """,
-                                    (row['pipeline_name'],),
-                                    fetch=True
-                                )
-                                
-                                if final_metrics:
-                                    duration, rows = final_metrics[0]
-                                    metrics_container.markdown(f"""
-                                        ### 📊 Final Metrics
-                                        - **Duration:** {duration:.2f} seconds
-                                        - **Rows Processed:** {rows:,}
-                                        - **Rows/Second:** {rows/duration:.2f}
-                                    """)
+                        ensure_dispatcher(dict(st.session_state.snowflake_creds))
+                        enqueue_run(row['pipeline_name'])
+                        # Progress is followed in the Live Progress section at the top of the page
+                        st.session_state.setdefault("live_runs", {})[row['pipeline_name']] = time.time()
+                        st.rerun()
             
             with col2:
                 if st.button("✏️ Edit Pipeline", key=f"edit_{row['id']}"):
@@ -360,6 +561,7 @@ def pipeline_runs_page():
     
     # Add charts
     st.subheader("📊 Run Statistics")
+    st.caption("Runs on this page; see the Monitoring dashboard for full history.")
     
     # Duration over time chart
     duration_df = df[['start_time', 'duration', 'pipeline_name']].dropna(subset=['duration'])
@@ -391,108 +593,7 @@ def pipeline_runs_page():
     else:
         st.info("No rows processed data available for the selected filters.")
     
-    # After the metrics section, add this special section for running pipelines
-    running_pipelines = df[df['status'] == 'running']
-    if not running_pipelines.empty:
-        st.subheader("🏃‍♂️ Currently Running Pipelines")
-        
-        # Custom styling for progress bars
-        st.markdown("""
-            <style>
-            .stProgress > div > div > div > div {
-                background-color: #1f77b4;  /* Extract color */
-            }
-            .stProgress > div > div > div > div:nth-child(2) {
-                background-color: #2ca02c;  /* Normalize color */
-            }
-            .stProgress > div > div > div > div:nth-child(3) {
-                background-color: #ff7f0e;  /* Load color */
-            }
-            </style>
-        """, unsafe_allow_html=True)
-        
-        # Create a progress tracker for each running pipeline
-        for _, row in running_pipelines.iterrows():
-            with st.expander(f"🔄 {row['pipeline_name']} - Running", expanded=True):
-                st.markdown(f"**Dataset:** `{row['dataset_name']}` | **Target Table:** `{row['target_table']}`")
-                
-                # Add chunk progress information
-                if row['total_chunks'] and row['total_chunks'] > 0:
-                    # Calculate percentage and ensure it's between 0-100
-                    chunk_percent = min(100, int((row['processed_chunks'] / row['total_chunks']) * 100))
-                    
-                    # Display progress bar
-                    progress_container = st.container()
-                    with progress_container:
-                        st.progress(chunk_percent / 100)
-                        
-                        # Create two columns for metrics
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            st.metric("Progress", f"{chunk_percent}%")
-                            st.metric("Chunks", f"{row['processed_chunks']} of {row['total_chunks']}")
-                        
-                        with col2:
-                            st.metric("Rows Processed", f"{row['processed_rows']:,} of {row['total_rows']:,}")
-                            
-                            # Calculate and show rate if we have processed rows
-                            if row['processed_rows'] > 0 and row['start_time']:
-                                start_time = pd.to_datetime(row['start_time'])
-                                elapsed_seconds = (datetime.now() - start_time).total_seconds()
-                                if elapsed_seconds > 0:
-                                    rate = row['processed_rows'] / elapsed_seconds
-                                    st.metric("Rows/Second", f"{rate:.1f}")
-                    
-                    # Show estimated completion time if available
-                    if row['estimated_completion']:
-                        est_time = pd.to_datetime(row['estimated_completion'])
-                        time_remaining = (est_time - datetime.now()).total_seconds()
-                        if time_remaining > 0:
-                            minutes, seconds = divmod(int(time_remaining), 60)
-                            hours, minutes = divmod(minutes, 60)
-                            time_str = f"{hours}h {minutes}m {seconds}s" if hours > 0 else f"{minutes}m {seconds}s"
-                            st.info(f"⏱️ Estimated completion in: {time_str}")
-                
-                # Extract progress
-                extract_status = row['extract_status'] or 'pending'
-                extract_container = st.empty()
-                extract_progress = get_progress_for_status(extract_status)
-                extract_container.progress(extract_progress)
-                st.markdown(f"**Extract:** {extract_status}")
-                
-                # Normalize progress
-                normalize_status = row['normalize_status'] or 'pending'
-                normalize_container = st.empty()
-                normalize_progress = get_progress_for_status(normalize_status)
-                normalize_container.progress(normalize_progress)
-                st.markdown(f"**Normalize:** {normalize_status}")
-                
-                # Load progress
-                load_status = row['load_status'] or 'pending'
-                load_container = st.empty()
-                load_progress = get_progress_for_status(load_status)
-                load_container.progress(load_progress)
-                st.markdown(f"**Load:** {load_status}")
-                
-                # Show start time and running duration
-                if row['start_time']:
-                    start_time = pd.to_datetime(row['start_time'])
-                    current_time = datetime.now()
-                    running_duration = (current_time - start_time).total_seconds()
-                    st.markdown(f"**Started at:** {start_time.strftime('%Y-%m-%d %H:%M:%S')} | **Running for:** {running_duration:.2f} seconds")
-                
-                # Show any rows processed so far if available
-                if row['rows_processed']:
-                    st.markdown(f"**Rows processed so far:** {row['rows_processed']:,}")
-    
-    # Auto-refresh using JavaScript to avoid flickering
-    st.markdown(
-        f"""
-        <script>
-            setTimeout(function() {{
-                window.location.reload();
-            }}, {REFRESH_INTERVAL * 1000});
-        </script>
-        """,
-        unsafe_allow_html=True
-    ) 
\ No newline at end of file
+    # Live sections refresh on their own; the rest of the page only reruns on interaction
+    running_pipelines_section()
+    recent_failures_section()
+ 
\ No newline at end of file
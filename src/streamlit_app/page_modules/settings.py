@@ -1,6 +1,7 @@
 import streamlit as st
 import os
 import json
+import pandas as pd
 from src.db.duckdb_connection import execute_query
 
 # Add utility functions if not already in utils.py
@@ -136,6 +137,35 @@ def settings_page():
                     st.success("Database reinitialized successfully!")
                 except Exception as e:
                     st.error(f"Error reinitializing database: {str(e)}")
+    with col2:
+        if st.button("Clear Reflection Cache", help="Force source table metadata to be reflected again on the next run"):
+            try:
+                from src.sources.reflection_cache import invalidate_reflection_cache
+                invalidate_reflection_cache()
+                st.success("Reflection cache cleared!")
+            except Exception as e:
+                st.error(f"Error clearing reflection cache: {str(e)}")
+    
+    # Run Queue
+    st.subheader("📥 Run Queue Groups")
+    st.caption("Owner groups share dispatch capacity in proportion to their weight (default 1).")
+    from src.pipelines.run_queue import get_group_weights, set_group_weight
+    groups = execute_query("SELECT DISTINCT owner_group FROM pipelines WHERE owner_group IS NOT NULL", fetch=True)
+    weights = get_group_weights()
+    weights_df = pd.DataFrame(
+        [(g[0], weights.get(g[0], 1.0)) for g in groups],
+        columns=["Group", "Weight"]
+    )
+    edited_weights = st.data_editor(
+        weights_df,
+        disabled=["Group"],
+        hide_index=True,
+        key="group_weights_editor"
+    )
+    if st.button("Save Group Weights"):
+        for _, row in edited_weights.iterrows():
+            set_group_weight(row["Group"], row["Weight"])
+        st.success("Group weights saved!")
     
     # Application Settings
     st.subheader("⚙️ Application Settings")